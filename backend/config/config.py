@@ -31,7 +31,70 @@ EMBEDDING_MODEL: Optional[str] = os.getenv("EMBEDDING_MODEL")
 
 # === Configurações de Performance ===
 PERFORMANCE_LEVEL: str = os.getenv("PERFORMANCE_LEVEL", "auto")
-EMBEDDINGS_PATH: Path = PROJETO_RAIZ / "data" / "embeddings_cidades.npz"
+# recurso que falhou ao carregar (modelo, Pinecone): espera antes de nova
+# tentativa, dobrando a cada falha seguida
+RESOURCE_RETRY_SECONDS: float = float(os.getenv("RESOURCE_RETRY_SECONDS", "30"))
+CITY_EMBEDDING_MODEL: str = "BAAI/bge-small-en-v1.5"
+EMBEDDINGS_PATH: Path = PROJETO_RAIZ / "data" / "embeddings_cidades.emb"
+EMBEDDINGS_LEGACY_PATH: Path = PROJETO_RAIZ / "data" / "embeddings_cidades.npz"
+EMBEDDINGS_PRECISION: str = os.getenv("EMBEDDINGS_PRECISION", "float32")
+VECTOR_INDEX_BACKEND: str = os.getenv("VECTOR_INDEX_BACKEND", "exato")  # exato | ivf
+IVF_LISTAS: int = int(os.getenv("IVF_LISTAS", "64"))
+IVF_SONDAS: int = int(os.getenv("IVF_SONDAS", "8"))
+# intervalo mínimo entre verificações da versão dos dados (0 desativa)
+DATA_VERSION_CHECK_SECONDS: int = int(os.getenv("DATA_VERSION_CHECK_SECONDS", "30"))
+# backend de inferência dos embeddings: torch | onnx | onnx-int8
+EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_THREADS: int = int(os.getenv("ONNX_THREADS", "1"))
+ONNX_DIR: Path = PROJETO_RAIZ / "data" / "onnx"
+# classificação de tema por centroides quando nenhuma regra casa: similaridade
+# mínima com o melhor tema e vantagem mínima sobre o segundo
+TEMA_VETORIAL_LIMIAR: float = float(os.getenv("TEMA_VETORIAL_LIMIAR", "0.75"))
+TEMA_VETORIAL_MARGEM: float = float(os.getenv("TEMA_VETORIAL_MARGEM", "0.02"))
+# cache de decisões de roteamento (forma canônica → agente, tema, cidades)
+ROUTE_CACHE_SIZE: int = int(os.getenv("ROUTE_CACHE_SIZE", "2048"))
+ROUTE_CACHE_TTL_SECONDS: int = int(os.getenv("ROUTE_CACHE_TTL_SECONDS", "3600"))
+# cache persistente das respostas do LLM (SQLite): limite em MB e TTL (0 = sem TTL)
+LLM_CACHE_PATH: Path = PROJETO_RAIZ / "cache" / "llm.sqlite3"
+LLM_CACHE_LEGACY_DIR: Path = PROJETO_RAIZ / "cache" / "llm"
+LLM_CACHE_MAX_MB: int = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "604800"))
+# camada em memória na frente do SQLite (MB; 0 desativa)
+LLM_CACHE_L1_MB: int = int(os.getenv("LLM_CACHE_L1_MB", "16"))
+# espera máxima por uma chamada idêntica já em andamento (0 = sem limite)
+LLM_SINGLE_FLIGHT_TIMEOUT_SECONDS: int = int(
+    os.getenv("LLM_SINGLE_FLIGHT_TIMEOUT_SECONDS", "120")
+)
+# reaproveitamento de respostas para paráfrases sobre os mesmos dados (opt-in)
+SEMANTIC_CACHE_ENABLED: bool = (
+    os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+)
+SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_BUCKETS: int = int(os.getenv("SEMANTIC_CACHE_MAX_BUCKETS", "1024"))
+SEMANTIC_CACHE_MAX_PER_BUCKET: int = int(
+    os.getenv("SEMANTIC_CACHE_MAX_PER_BUCKET", "32")
+)
+# concorrência por worker no caminho assíncrono, limitada pelas cotas externas:
+# chamadas simultâneas ao LLM e conexões ao Postgres/Mongo
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT_SECONDS: int = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+# orçamento (tokens estimados) da tabela de dados enviada ao LLM
+PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "800"))
+# resposta sem LLM para uma cidade + uma métrica (frase pronta com o valor)
+DIRECT_ANSWER_ENABLED: bool = (
+    os.getenv("DIRECT_ANSWER_ENABLED", "true").lower() == "true"
+)
+# telemetria das chamadas ao LLM: retentativas feitas pelo engine (contadas),
+# preço por milhão de tokens (USD) e ledger append-only opcional
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS: float = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+LLM_PRICE_INPUT_PER_MTOK: float = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0.20"))
+LLM_PRICE_OUTPUT_PER_MTOK: float = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "0.20"))
+LLM_TELEMETRY_LEDGER: bool = (
+    os.getenv("LLM_TELEMETRY_LEDGER", "false").lower() == "true"
+)
 
 # === Diretórios utilizados ===
 PROMPT_DIR: Path = PROJETO_RAIZ / "core" / "prompts"
@@ -69,6 +69,22 @@ METRICAS_VALIDAS: Dict[str, str] = {
     "matriculas_eja": "Matrículas - Cursos EJA",
 }
 
+# Famílias de colunas por radical (termos genéricos, ex.: "quantas matrículas"),
+# usadas para podar as tabelas enviadas ao LLM quando nenhuma métrica exata casa
+FAMILIAS_COLUNAS: Dict[str, List[str]] = {
+    "matricula": ["matriculas_", "qt_mat_"],
+    "turma": ["turmas_"],
+    "professor": ["docentes_"],
+    "docente": ["docentes_"],
+    "escola": ["escolas_"],
+    "infraestrutura": ["escolas_com_"],
+    "profissiona": ["profissionais_"],
+    "curso": ["cursos_", "qt_curso_"],
+    "populac": ["populacao"],
+    "habitante": ["populacao"],
+    "pib": ["pib_"],
+}
+
 # — seus padrões comparativos fixos —
 COMPARATIVE_PATTERNS: List[str] = [
     r"\bcompare\b",
@@ -80,6 +96,23 @@ COMPARATIVE_PATTERNS: List[str] = [
     r"\bmenor desigualdade\b",
 ]
 
+# — conectores que, entre duas cidades, também indicam comparação —
+CONECTORES_COMPARATIVOS: List[str] = [",", "e", "ou", "x"]
+
+# — radicais que pedem análise além do valor atual (casam como prefixo) —
+MARCADORES_ANALITICOS: List[str] = [
+    "variaç",
+    "variou",
+    "cresc",
+    "evolu",
+    "tendênc",
+    "históric",
+    "aument",
+    "diminu",
+    "queda",
+    "caiu",
+]
+
 # — heurísticas mapeando termo de busca → coluna do banco —
 HEURISTICAS: Dict[str, str] = {
     # População
@@ -300,6 +333,60 @@ THEME_KEYWORDS: Dict[str, List[str]] = {
 # lista final de temas válidos
 TEMAS_VALIDOS = ["populacao", "economia", "educacao", "tecnica", "comparative"]
 
+# Prioridade explícita para desempate entre temas com o mesmo score (maior vence)
+PRIORIDADE_TEMAS: Dict[str, int] = {
+    "institucional": 5,
+    "educacao": 4,
+    "tecnica": 3,
+    "economia": 2,
+    "populacao": 1,
+}
+
+# Perguntas rotuladas (paráfrases sem as palavras-chave) para os centroides de
+# tema usados quando nenhuma regra casa; somam-se ao vocabulário de cada tema
+EXEMPLOS_TEMAS: Dict[str, List[str]] = {
+    "populacao": [
+        "quantas pessoas vivem na cidade",
+        "quantos moram no município",
+        "qual o tamanho da cidade em número de pessoas",
+        "a cidade é grande ou pequena",
+        "quantos cidadãos tem o município",
+        "crescimento demográfico do município",
+    ],
+    "economia": [
+        "qual a riqueza gerada por pessoa na cidade",
+        "como está a economia do município",
+        "a cidade é rica ou pobre",
+        "qual a renda dos moradores",
+        "quanto o município produz por ano",
+        "desenvolvimento econômico da cidade",
+    ],
+    "educacao": [
+        "quantos alunos estudam nas escolas da cidade",
+        "quantos professores dão aula no município",
+        "como está o ensino na cidade",
+        "quantas salas de aula existem na rede",
+        "as escolas têm estrutura adequada",
+        "quantas crianças estão na creche",
+    ],
+    "tecnica": [
+        "quais cursos profissionalizantes a cidade oferece",
+        "quantos estudantes fazem ensino profissional",
+        "tem formação técnica no município",
+        "cursos de qualificação profissional na cidade",
+        "educação profissional e tecnológica do município",
+        "quantas vagas de curso técnico existem",
+    ],
+    "institucional": [
+        "quem é a houer",
+        "o que a empresa faz",
+        "quais serviços vocês oferecem",
+        "onde a empresa atua",
+        "quais obras a companhia já realizou",
+        "como contratar a consultoria",
+    ],
+}
+
 ESTADOS: Dict[str, List[str]] = {
     "AC": ["acre", "ac"],
     "AL": ["alagoas", "al"],
@@ -330,6 +417,46 @@ ESTADOS: Dict[str, List[str]] = {
     "TO": ["tocantins", "to"],
 }
 
+# === DIREÇÃO DA COMPARAÇÃO (cache semântico: "maior" ≠ "menor") ===
+DIRECAO_POR_TERMO: Dict[str, str] = {
+    "maior": "maior",
+    "maiores": "maior",
+    "mais": "maior",
+    "maximo": "maior",
+    "maxima": "maior",
+    "melhor": "maior",
+    "melhores": "maior",
+    "superior": "maior",
+    "alto": "maior",
+    "alta": "maior",
+    "altos": "maior",
+    "altas": "maior",
+    "lidera": "maior",
+    "menor": "menor",
+    "menores": "menor",
+    "menos": "menor",
+    "minimo": "menor",
+    "minima": "menor",
+    "pior": "menor",
+    "piores": "menor",
+    "inferior": "menor",
+    "baixo": "menor",
+    "baixa": "menor",
+    "baixos": "menor",
+    "baixas": "menor",
+}
+
+# Frases da resposta direta (sem LLM); "padrao" vale para as demais métricas
+TEMPLATES_RESPOSTA_DIRETA: Dict[str, str] = {
+    "populacao_total": (
+        "{cidade} tem população de {valor} habitantes, segundo dados de {ano}."
+    ),
+    "pib_per_capita": (
+        "O PIB per capita de {cidade} é de R$ {valor}, segundo dados de {ano}."
+    ),
+    "padrao": "{rotulo} em {cidade}: {valor}, segundo dados de {ano}.",
+}
+
 # TEMPLATE para 1 única cidade (single-city agent)
 TEMPLATE_SINGLE_CITY: str = """
 Você é um analista de dados especialista em políticas públicas municipais.
@@ -439,6 +566,8 @@ llm = ChatGroq(
     groq_api_key=GROQ_API_KEY,
     temperature=0.3,
     max_tokens=1024,
+    # retentativas feitas pelo engine, para aparecerem na telemetria
+    max_retries=0,
 )
 
 NOMES_AGENTES: Dict[str, str] = {
@@ -1,11 +1,15 @@
 # chatbot-llm/backend/core/agents/comparative_agent.py
+import asyncio
+
 import pandas as pd
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from sqlalchemy import text
-from database.connection import get_engine
+from database.connection import consultar_df, get_engine
+from core.router.analise_pergunta import AnalisePergunta
 from core.router.semantic_city import detectar_cidades
 from core.router.semantic_metric import classificar_metrica
-from core.llm.engine import gerar_resposta
+from core.engine import agerar_resposta, gerar_resposta
+from core.montagem_prompt import montar_tabela
 from config.dicionarios import TEMPLATE_COMPARATIVE
 from utils.logger import get_logger
 from utils.export_utils import exportar_csv_base64, exportar_pdf_base64
@@ -13,6 +17,61 @@ from utils.export_utils import exportar_csv_base64, exportar_pdf_base64
 logger = get_logger(__name__)
 RespostaTipo = Dict[str, Union[str, List[Dict[str, Any]], Dict[str, Any], None]]
 
+CONSULTAS_COMPARATIVO = (
+    # 🔹 Base: população e PIB
+    text(
+        """
+        SELECT codigo_ibge, cidade, populacao_total, pib_per_capita
+        FROM municipios
+        WHERE codigo_ibge = ANY(:codigos)
+        """
+    ),
+    # 🔹 Educação básica
+    text(
+        """
+        SELECT m.codigo_ibge, m.cidade,
+            e.matriculas_ensino_fundamental,
+            e.matriculas_ensino_medio,
+            e.docentes_ensino_fundamental,
+            e.docentes_ensino_medio,
+            e.escolas_ensino_fundamental,
+            e.escolas_ensino_medio
+        FROM municipios m
+        LEFT JOIN educacao_basica e ON e.codigo_ibge = m.codigo_ibge
+        WHERE m.codigo_ibge = ANY(:codigos)
+        """
+    ),
+    # 🔹 Infraestrutura
+    text(
+        """
+        SELECT m.codigo_ibge, m.cidade,
+            i.escolas_com_biblioteca,
+            i.escolas_com_laboratorio_ciencias,
+            i.escolas_com_quadra_esportes,
+            i.profissionais_com_formacao_pedagogia
+        FROM municipios m
+        LEFT JOIN infraestrutura_basica i ON i.codigo_ibge = m.codigo_ibge
+        WHERE m.codigo_ibge = ANY(:codigos)
+        """
+    ),
+    # 🔹 Cursos técnicos (último ano disponível)
+    text(
+        """
+        SELECT m.codigo_ibge, m.cidade,
+            t.qt_curso_tec,
+            t.qt_mat_curso_tec
+        FROM municipios m
+        LEFT JOIN (
+            SELECT DISTINCT ON (codigo_ibge)
+                codigo_ibge, qt_curso_tec, qt_mat_curso_tec
+            FROM educacao_tecnica
+            ORDER BY codigo_ibge, ano_censo DESC
+        ) t ON t.codigo_ibge = m.codigo_ibge
+        WHERE m.codigo_ibge = ANY(:codigos)
+        """
+    ),
+)
+
 
 class ComparativeAgent:
     def __init__(self) -> None:
@@ -23,107 +82,92 @@ class ComparativeAgent:
         self,
         pergunta: str,
         cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
     ) -> RespostaTipo:
         cidades = cidades_detectadas or detectar_cidades(pergunta, max_cidades=2)
         if not cidades or len(cidades) < 2:
-            return {
-                "tipo": "erro",
-                "mensagem": "Mencione pelo menos duas cidades para comparar.",
-                "dados": None,
-            }
-        return self._comparar_cidades(cidades, pergunta)
+            return self._sem_cidades()
+        return self._comparar_cidades(cidades, pergunta, analise)
 
-    def _comparar_cidades(
-        self, cidades: List[Dict[str, Any]], pergunta: str
+    async def aget_dados(
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
     ) -> RespostaTipo:
-        nomes = [c["nome"] for c in cidades]
-        engine = get_engine()
-
-        # 🔹 Base: população e PIB
-        df_mun = pd.read_sql(
-            text(
-                """
-                SELECT cidade, populacao_total, pib_per_capita
-                FROM municipios
-                WHERE cidade = ANY(:nomes)
-                """
-            ),
-            con=engine,
-            params={"nomes": nomes},
+        cidades = cidades_detectadas or await asyncio.to_thread(
+            detectar_cidades, pergunta, max_cidades=2
         )
+        if not cidades or len(cidades) < 2:
+            return self._sem_cidades()
 
-        # 🔹 Educação básica
-        df_edu = pd.read_sql(
-            text(
-                """
-                SELECT m.cidade,
-                    e.matriculas_ensino_fundamental,
-                    e.matriculas_ensino_medio,
-                    e.docentes_ensino_fundamental,
-                    e.docentes_ensino_medio,
-                    e.escolas_ensino_fundamental,
-                    e.escolas_ensino_medio
-                FROM municipios m
-                LEFT JOIN educacao_basica e ON e.codigo_ibge = m.codigo_ibge
-                WHERE m.cidade = ANY(:nomes)
-                """
-            ),
-            con=engine,
-            params={"nomes": nomes},
+        codigos = [c["codigo_ibge"] for c in cidades]
+        # consultas independentes: em paralelo, limitadas pelo pool assíncrono
+        dfs = await asyncio.gather(
+            *(consultar_df(q, {"codigos": codigos}) for q in CONSULTAS_COMPARATIVO)
         )
-
-        # 🔹 Infraestrutura
-        df_infra = pd.read_sql(
-            text(
-                """
-                SELECT m.cidade,
-                    i.escolas_com_biblioteca,
-                    i.escolas_com_laboratorio_ciencias,
-                    i.escolas_com_quadra_esportes,
-                    i.profissionais_com_formacao_pedagogia
-                FROM municipios m
-                LEFT JOIN infraestrutura_basica i ON i.codigo_ibge = m.codigo_ibge
-                WHERE m.cidade = ANY(:nomes)
-                """
-            ),
-            con=engine,
-            params={"nomes": nomes},
+        # merge e exportação CSV/PDF: fora do event loop
+        resultado, argumentos = await asyncio.to_thread(
+            self._preparar, pergunta, cidades, dfs, analise
         )
+        resultado["mensagem"] = await agerar_resposta(**argumentos)
+        return resultado
 
-        # 🔹 Cursos técnicos (último ano disponível)
-        df_tec = pd.read_sql(
-            text(
-                """
-                SELECT m.cidade,
-                    t.qt_curso_tec,
-                    t.qt_mat_curso_tec
-                FROM municipios m
-                LEFT JOIN (
-                    SELECT DISTINCT ON (codigo_ibge)
-                        codigo_ibge, qt_curso_tec, qt_mat_curso_tec
-                    FROM educacao_tecnica
-                    ORDER BY codigo_ibge, ano_censo DESC
-                ) t ON t.codigo_ibge = m.codigo_ibge
-                WHERE m.cidade = ANY(:nomes)
-                """
-            ),
-            con=engine,
-            params={"nomes": nomes},
-        )
+    def _sem_cidades(self) -> RespostaTipo:
+        return {
+            "tipo": "erro",
+            "mensagem": "Mencione pelo menos duas cidades para comparar.",
+            "dados": None,
+        }
+
+    def _comparar_cidades(
+        self,
+        cidades: List[Dict[str, Any]],
+        pergunta: str,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> RespostaTipo:
+        codigos = [c["codigo_ibge"] for c in cidades]
+        engine = get_engine()
+
+        dfs = [
+            pd.read_sql(q, con=engine, params={"codigos": codigos})
+            for q in CONSULTAS_COMPARATIVO
+        ]
+        resultado, argumentos = self._preparar(pergunta, cidades, dfs, analise)
+        resultado["mensagem"] = gerar_resposta(**argumentos)
+        return resultado
+
+    def _preparar(
+        self,
+        pergunta: str,
+        cidades: List[Dict[str, Any]],
+        dfs: List[pd.DataFrame],
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Tuple[RespostaTipo, Dict[str, Any]]:
+        # Resultado (sem a mensagem) e argumentos do LLM
+        df_mun, df_edu, df_infra, df_tec = dfs
 
-        # 🔁 Merge final por cidade
-        df = df_mun.merge(df_edu, on="cidade", how="outer")
-        df = df.merge(df_infra, on="cidade", how="outer")
-        df = df.merge(df_tec, on="cidade", how="outer")
+        # 🔁 Merge final por município (homônimos são linhas distintas)
+        chaves = ["codigo_ibge", "cidade"]
+        df = df_mun.merge(df_edu, on=chaves, how="outer")
+        df = df.merge(df_infra, on=chaves, how="outer")
+        df = df.merge(df_tec, on=chaves, how="outer")
         df = df.fillna(0)
 
-        # 🔎 Contexto formatado
-        contextos = "\n".join(
-            [
-                f"- **{row['cidade']}**: {', '.join(f'{k}={v:,}' for k, v in row.items() if k != 'cidade')}"
-                for _, row in df.iterrows()
-            ]
-        )
+        # Homônimos ("Palmas" no PR e no TO) levam a UF no nome
+        nomes = [c["nome"] for c in cidades]
+        rotulos = {
+            c["codigo_ibge"]: (
+                f"{c['nome']}/{c['uf']}" if nomes.count(c["nome"]) > 1 else c["nome"]
+            )
+            for c in cidades
+        }
+        nomes = list(rotulos.values())
+        df["cidade"] = df["codigo_ibge"].map(rotulos).fillna(df["cidade"])
+        df = df.drop(columns="codigo_ibge")
+
+        # 🔎 Contexto: só as cidades (os números já vão na tabela de dados)
+        contextos = "\n".join(f"- **{cidade}**" for cidade in df["cidade"])
 
         # 📊 Gráfico e estrutura para resposta
         chart_data = {
@@ -135,23 +179,28 @@ class ComparativeAgent:
             },
         }
 
-        # 🧠 LLM
-        mensagem = gerar_resposta(
-            pergunta=pergunta,
-            dados=df.to_dict(orient="records"),
-            tema=self.tema,
-            fontes=["PostgreSQL"],
-            prompt_template=TEMPLATE_COMPARATIVE,
-            dados_formatados=df.to_markdown(index=False),
-            contextos=contextos,
-            comparacoes=None,
-        )
+        # 🧠 LLM: só as colunas relevantes à pergunta
+        registros = df.to_dict(orient="records")
+        argumentos = {
+            "pergunta": pergunta,
+            "dados": registros,
+            "tema": self.tema,
+            "fontes": ["PostgreSQL"],
+            "prompt_template": TEMPLATE_COMPARATIVE,
+            "dados_formatados": montar_tabela(
+                pergunta, registros, analise=analise
+            ).texto,
+            "contextos": contextos,
+            "comparacoes": None,
+            "analise": analise,
+        }
 
-        return {
+        resultado: RespostaTipo = {
             "tipo": "comparativo",
-            "mensagem": mensagem,
-            "dados": df.to_dict(orient="records"),
+            "mensagem": "",  # preenchida com a resposta do LLM
+            "dados": registros,
             "chart_data": chart_data,
             "csv_base64": exportar_csv_base64(df),
             "pdf_base64": exportar_pdf_base64(df, titulo="Comparativo Multivariável"),
         }
+        return resultado, argumentos
@@ -1,17 +1,36 @@
 # chatbot-llm/backend/core/agents/economia_agent.py
 from __future__ import annotations
+
+import asyncio
 import pandas as pd
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy import text
 
-from database.connection import get_engine
+from database.connection import consultar_df, get_engine
+from core.router.analise_pergunta import AnalisePergunta
 from core.router.semantic_city import detectar_cidades
-from core.llm.engine import gerar_resposta
+from core.engine import agerar_resposta, gerar_resposta
+from core.montagem_prompt import montar_tabela
+from core.resposta_direta import resposta_direta
 from config.dicionarios import TEMPLATE_SINGLE_CITY
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+CONSULTA_ECONOMIA = text(
+    """
+    SELECT
+      m.cidade,
+      e.nome          AS estado,
+      m.pib_per_capita,
+      m.ano_pib
+    FROM public.municipios m
+    JOIN public.estados e
+      ON e.sigla = m.sigla_estado
+    WHERE m.codigo_ibge = :codigo_ibge
+    """
+)
+
 
 class EconomiaAgent:
     def __init__(self) -> None:
@@ -19,73 +38,125 @@ class EconomiaAgent:
         logger.debug(f"🧠 {self.__class__.__name__} inicializado.")
 
     def get_dados(
-        self, pergunta: str, cidades_detectadas: Optional[List[Dict[str, Any]]] = None
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
     ) -> Dict[str, Any]:
         logger.info(f"💰 Analisando pergunta econômica: {pergunta}")
         cidades = cidades_detectadas or detectar_cidades(pergunta, max_cidades=1)
         if not cidades:
-            return {
-                "tipo": "erro",
-                "mensagem": "Não foi possível identificar uma cidade válida para análise econômica.",
-                "dados": None,
-                "fontes": [],
-            }
+            return self._sem_cidade()
 
         nome = cidades[0]["nome"]
         logger.debug(f"📍 Cidade identificada: {nome}")
 
         try:
-            query = text(
-                """
-                SELECT
-                  m.cidade,
-                  e.nome          AS estado,
-                  m.pib_per_capita,
-                  m.ano_pib
-                FROM public.municipios m
-                JOIN public.estados e
-                  ON e.sigla = m.sigla_estado
-                WHERE m.cidade = :cidade
-                """
-            )
-            df = pd.read_sql(query, con=get_engine(), params={"cidade": nome})
-
-            if df.empty:
-                logger.warning(f"⚠️ Nenhum dado econômico encontrado para {nome}.")
-                return {
-                    "tipo": "erro",
-                    "mensagem": f"Não foram encontrados dados econômicos para {nome}.",
-                    "dados": None,
-                    "fontes": [],
-                }
-
-            # formata só as colunas de interesse
-            cols = ["cidade", "estado", "pib_per_capita", "ano_pib"]
-            dados_df = df[cols]
-            dados_md = dados_df.to_markdown(index=False)
-
-            resposta = gerar_resposta(
-                pergunta=pergunta,
-                dados=dados_df.to_dict(orient="records"),
-                tema=self.tema,
-                fontes=["PostgreSQL"],
-                prompt_template=TEMPLATE_SINGLE_CITY,
-                dados_formatados=dados_md,
+            df = pd.read_sql(
+                CONSULTA_ECONOMIA,
+                con=get_engine(),
+                params={"codigo_ibge": cidades[0]["codigo_ibge"]},
             )
+            resultado, argumentos = self._preparar(pergunta, cidades, df, analise)
+            if argumentos is not None:
+                resultado["mensagem"] = gerar_resposta(**argumentos)
+            return resultado
 
-            return {
-                "tipo": "resposta",
-                "mensagem": resposta,
-                "dados": dados_df.to_dict(orient="records"),
-                "fontes": ["PostgreSQL"],
-            }
+        except Exception as e:
+            return self._erro_consulta(e)
+
+    async def aget_dados(
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Dict[str, Any]:
+        logger.info(f"💰 Analisando pergunta econômica: {pergunta}")
+        cidades = cidades_detectadas or await asyncio.to_thread(
+            detectar_cidades, pergunta, max_cidades=1
+        )
+        if not cidades:
+            return self._sem_cidade()
+
+        nome = cidades[0]["nome"]
+        logger.debug(f"📍 Cidade identificada: {nome}")
+
+        try:
+            df = await consultar_df(
+                CONSULTA_ECONOMIA, {"codigo_ibge": cidades[0]["codigo_ibge"]}
+            )
+            resultado, argumentos = await asyncio.to_thread(
+                self._preparar, pergunta, cidades, df, analise
+            )
+            if argumentos is not None:
+                resultado["mensagem"] = await agerar_resposta(**argumentos)
+            return resultado
 
         except Exception as e:
-            logger.error(f"❌ Erro ao consultar dados econômicos: {e}")
-            return {
+            return self._erro_consulta(e)
+
+    def _sem_cidade(self) -> Dict[str, Any]:
+        return {
+            "tipo": "erro",
+            "mensagem": "Não foi possível identificar uma cidade válida para análise econômica.",
+            "dados": None,
+            "fontes": [],
+        }
+
+    def _erro_consulta(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"❌ Erro ao consultar dados econômicos: {e}")
+        return {
+            "tipo": "erro",
+            "mensagem": "Ocorreu um erro ao consultar os dados econômicos.",
+            "dados": None,
+            "fontes": [],
+            "erro": str(e),
+        }
+
+    def _preparar(
+        self,
+        pergunta: str,
+        cidades: List[Dict[str, Any]],
+        df: pd.DataFrame,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        # Resultado e argumentos do LLM (None: sem dados ou resposta direta)
+        nome = cidades[0]["nome"]
+        if df.empty:
+            logger.warning(f"⚠️ Nenhum dado econômico encontrado para {nome}.")
+            erro: Dict[str, Any] = {
                 "tipo": "erro",
-                "mensagem": "Ocorreu um erro ao consultar os dados econômicos.",
+                "mensagem": f"Não foram encontrados dados econômicos para {nome}.",
                 "dados": None,
                 "fontes": [],
-                "erro": str(e),
             }
+            return erro, None
+
+        # só as colunas de interesse
+        registros = df[["cidade", "estado", "pib_per_capita", "ano_pib"]].to_dict(
+            orient="records"
+        )
+        resultado = {
+            "tipo": "resposta",
+            "mensagem": "",  # preenchida com a resposta direta ou a do LLM
+            "dados": registros,
+            "fontes": ["PostgreSQL"],
+        }
+        # Uma cidade e uma métrica: frase pronta, sem chamar o LLM
+        direta = resposta_direta.responder(pergunta, cidades, registros, analise)
+        if direta is not None:
+            resultado["mensagem"] = direta
+            return resultado, None
+
+        # Só as colunas relevantes à pergunta, em formato compacto
+        tabela = montar_tabela(pergunta, registros, analise=analise)
+        argumentos = {
+            "pergunta": pergunta,
+            "dados": registros,
+            "tema": self.tema,
+            "fontes": ["PostgreSQL"],
+            "prompt_template": TEMPLATE_SINGLE_CITY,
+            "dados_formatados": tabela.texto,
+            "analise": analise,
+        }
+        return resultado, argumentos
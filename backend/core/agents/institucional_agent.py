@@ -4,7 +4,8 @@ from __future__ import annotations
 from typing import Any, Dict, Optional, List
 from utils.logger import get_logger
 from utils.retriever import buscar_contexto
-from core.llm.engine import gerar_resposta
+from core.engine import gerar_resposta
+from core.router.analise_pergunta import AnalisePergunta
 from config.dicionarios import TEMPLATE_INSTITUCIONAL
 
 logger = get_logger(__name__)
@@ -16,7 +17,10 @@ class InstitucionalAgent:
         logger.debug(f"🧠 {self.__class__.__name__} inicializado.")
 
     def get_dados(
-        self, pergunta: str, cidades_detectadas: Optional[List[Dict[str, Any]]] = None
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
     ) -> Dict[str, Any]:
         logger.info(f"🏢 Processando pergunta institucional: {pergunta}")
 
@@ -1,18 +1,34 @@
 # chatbot-llm/backend/core/agents/populacao_agent.py
 from __future__ import annotations
 
-from typing import Optional, Dict, Any, List
+import asyncio
+
+from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy import text
 import pandas as pd
 
-from database.connection import get_engine
+from database.connection import consultar_df, get_engine
+from core.router.analise_pergunta import AnalisePergunta
 from core.router.semantic_city import detectar_cidades
-from core.llm.engine import gerar_resposta
+from core.engine import agerar_resposta, gerar_resposta
+from core.montagem_prompt import montar_tabela
+from core.resposta_direta import resposta_direta
 from config.dicionarios import TEMPLATE_SINGLE_CITY
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+CONSULTA_POPULACAO = text(
+    """
+    SELECT
+      m.cidade,
+      m.populacao_total AS populacao,
+      m.ano_populacao
+    FROM public.municipios m
+    WHERE m.codigo_ibge = :codigo_ibge
+"""
+)
+
 
 class PopulacaoAgent:
     def __init__(self) -> None:
@@ -20,57 +36,98 @@ class PopulacaoAgent:
         logger.debug(f"🧠 {self.__class__.__name__} inicializado.")
 
     def get_dados(
-        self, pergunta: str, cidades_detectadas: Optional[List[Dict[str, Any]]] = None
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
     ) -> Dict[str, Any]:
         logger.info(f"👥 Analisando pergunta sobre população: {pergunta}")
         cidades = cidades_detectadas or detectar_cidades(pergunta, max_cidades=1)
         if not cidades:
-            return {
-                "tipo": "erro",
-                "mensagem": "Não foi possível identificar uma cidade válida.",
-                "dados": None,
-                "fontes": [],
-            }
+            return self._sem_cidade()
 
-        nome = cidades[0]["nome"]
+        codigo_ibge = cidades[0]["codigo_ibge"]
         df = pd.read_sql(
-            text(
-                """
-                SELECT
-                  m.cidade,
-                  m.populacao_total AS populacao,
-                  m.ano_populacao
-                FROM public.municipios m
-                WHERE m.cidade = :nome
-            """
-            ),
+            CONSULTA_POPULACAO,
             con=get_engine(),
-            params={"nome": nome},
+            params={"codigo_ibge": codigo_ibge},
+        )
+        resultado, argumentos = self._preparar(pergunta, cidades, df, analise)
+        if argumentos is not None:
+            resultado["mensagem"] = gerar_resposta(**argumentos)
+        return resultado
+
+    async def aget_dados(
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Dict[str, Any]:
+        logger.info(f"👥 Analisando pergunta sobre população: {pergunta}")
+        cidades = cidades_detectadas or await asyncio.to_thread(
+            detectar_cidades, pergunta, max_cidades=1
+        )
+        if not cidades:
+            return self._sem_cidade()
+
+        codigo_ibge = cidades[0]["codigo_ibge"]
+        df = await consultar_df(CONSULTA_POPULACAO, {"codigo_ibge": codigo_ibge})
+        resultado, argumentos = await asyncio.to_thread(
+            self._preparar, pergunta, cidades, df, analise
         )
+        if argumentos is not None:
+            resultado["mensagem"] = await agerar_resposta(**argumentos)
+        return resultado
+
+    def _sem_cidade(self) -> Dict[str, Any]:
+        return {
+            "tipo": "erro",
+            "mensagem": "Não foi possível identificar uma cidade válida.",
+            "dados": None,
+            "fontes": [],
+        }
+
+    def _preparar(
+        self,
+        pergunta: str,
+        cidades: List[Dict[str, Any]],
+        df: pd.DataFrame,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        # Resultado e argumentos do LLM (None: sem dados ou resposta direta)
+        nome = cidades[0]["nome"]
         if df.empty:
-            return {
+            erro: Dict[str, Any] = {
                 "tipo": "erro",
                 "mensagem": f"Sem dados de população para {nome}.",
                 "dados": None,
                 "fontes": [],
             }
+            return erro, None
 
-        # Dados formatados como markdown
-        dados_md = df.to_markdown(index=False)
-
-        # CHAMA SEMPRE O TEMPLATE ÚNICO
-        resposta = gerar_resposta(
-            pergunta=pergunta,
-            dados=[df.to_dict(orient="records")[0]],
-            tema=self.tema,
-            fontes=["PostgreSQL"],
-            prompt_template=TEMPLATE_SINGLE_CITY,
-            dados_formatados=dados_md,
-        )
-
-        return {
+        # Registros da consulta (o LLM recebe só o primeiro)
+        registros = df.to_dict(orient="records")
+        resultado = {
             "tipo": "resposta",
-            "mensagem": resposta,
-            "dados": df.to_dict(orient="records"),
+            "mensagem": "",  # preenchida com a resposta direta ou a do LLM
+            "dados": registros,
+            "fontes": ["PostgreSQL"],
+        }
+        # Uma cidade e uma métrica: frase pronta, sem chamar o LLM
+        direta = resposta_direta.responder(pergunta, cidades, registros, analise)
+        if direta is not None:
+            resultado["mensagem"] = direta
+            return resultado, None
+
+        # Só as colunas relevantes à pergunta, em formato compacto
+        tabela = montar_tabela(pergunta, registros, analise=analise)
+        argumentos = {
+            "pergunta": pergunta,
+            "dados": registros[:1],
+            "tema": self.tema,
             "fontes": ["PostgreSQL"],
+            "prompt_template": TEMPLATE_SINGLE_CITY,
+            "dados_formatados": tabela.texto,
+            "analise": analise,
         }
+        return resultado, argumentos
@@ -1,17 +1,59 @@
 # chatbot-llm/backend/core/agents/tecnica_agent.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy import text
 import pandas as pd
 
-from database.connection import get_engine
+from database.connection import consultar_df, get_engine
+from core.router.analise_pergunta import AnalisePergunta
 from core.router.semantic_city import detectar_cidades
-from core.llm.engine import gerar_resposta
+from core.engine import agerar_resposta, gerar_resposta
+from core.montagem_prompt import montar_tabela
+from core.resposta_direta import resposta_direta
 from config.dicionarios import TEMPLATE_SINGLE_CITY
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+CONSULTA_TECNICA = text(
+    """
+    WITH et_latest AS (
+      SELECT
+        codigo_ibge,
+        MAX(ano_censo) AS ano_tecnica
+      FROM public.educacao_tecnica
+      GROUP BY codigo_ibge
+    )
+    SELECT
+      m.cidade,
+      e.nome                      AS estado,
+      et.ano_censo                AS ano_censo,
+      et.qt_curso_tec,
+      et.qt_mat_curso_tec,
+      et.cursos_integrados_ct,
+      et.matriculas_integrados_ct,
+      et.cursos_nivel_medio_nm,
+      et.matriculas_nivel_medio_nm,
+      et.cursos_concomitantes,
+      et.matriculas_concomitantes,
+      et.cursos_subsequentes,
+      et.matriculas_subsequentes,
+      et.cursos_eja,
+      et.matriculas_eja
+    FROM public.municipios m
+    JOIN public.estados e
+      ON e.sigla = m.sigla_estado
+    JOIN et_latest el
+      ON el.codigo_ibge = m.codigo_ibge
+    JOIN public.educacao_tecnica et
+      ON et.codigo_ibge = m.codigo_ibge
+     AND et.ano_censo = el.ano_tecnica
+    WHERE m.codigo_ibge = :codigo_ibge
+"""
+)
+
 
 class TecnicaAgent:
     def __init__(self) -> None:
@@ -19,84 +61,105 @@ class TecnicaAgent:
         logger.debug(f"🧠 {self.__class__.__name__} inicializado.")
 
     def get_dados(
-        self, pergunta: str, cidades_detectadas: Optional[List[Dict[str, Any]]] = None
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
     ) -> Dict[str, Any]:
         logger.info(f"🔧 Analisando pergunta de educação técnica: {pergunta}")
         cidades = cidades_detectadas or detectar_cidades(pergunta, max_cidades=1)
         if not cidades:
-            return {
-                "tipo": "erro",
-                "mensagem": "Não foi possível identificar uma cidade válida para educação técnica.",
-                "dados": None,
-                "fontes": [],
-            }
+            return self._sem_cidade()
 
         nome = cidades[0]["nome"]
         logger.debug(f"📍 Cidade reconhecida: {nome}")
 
-        query = text(
-            """
-            WITH et_latest AS (
-              SELECT
-                codigo_ibge,
-                MAX(ano_censo) AS ano_tecnica
-              FROM public.educacao_tecnica
-              GROUP BY codigo_ibge
-            )
-            SELECT
-              m.cidade,
-              e.nome                      AS estado,
-              et.ano_censo                AS ano_censo,
-              et.qt_curso_tec,
-              et.qt_mat_curso_tec,
-              et.cursos_integrados_ct,
-              et.matriculas_integrados_ct,
-              et.cursos_nivel_medio_nm,
-              et.matriculas_nivel_medio_nm,
-              et.cursos_concomitantes,
-              et.matriculas_concomitantes,
-              et.cursos_subsequentes,
-              et.matriculas_subsequentes,
-              et.cursos_eja,
-              et.matriculas_eja
-            FROM public.municipios m
-            JOIN public.estados e
-              ON e.sigla = m.sigla_estado
-            JOIN et_latest el
-              ON el.codigo_ibge = m.codigo_ibge
-            JOIN public.educacao_tecnica et
-              ON et.codigo_ibge = m.codigo_ibge
-             AND et.ano_censo = el.ano_tecnica
-            WHERE m.cidade = :cidade
-        """
+        df = pd.read_sql(
+            CONSULTA_TECNICA,
+            con=get_engine(),
+            params={"codigo_ibge": cidades[0]["codigo_ibge"]},
         )
+        resultado, argumentos = self._preparar(pergunta, cidades, df, analise)
+        if argumentos is not None:
+            resultado["mensagem"] = gerar_resposta(**argumentos)
+        return resultado
 
-        df = pd.read_sql(query, con=get_engine(), params={"cidade": nome})
+    async def aget_dados(
+        self,
+        pergunta: str,
+        cidades_detectadas: Optional[List[Dict[str, Any]]] = None,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Dict[str, Any]:
+        logger.info(f"🔧 Analisando pergunta de educação técnica: {pergunta}")
+        cidades = cidades_detectadas or await asyncio.to_thread(
+            detectar_cidades, pergunta, max_cidades=1
+        )
+        if not cidades:
+            return self._sem_cidade()
+
+        nome = cidades[0]["nome"]
+        logger.debug(f"📍 Cidade reconhecida: {nome}")
+
+        df = await consultar_df(
+            CONSULTA_TECNICA, {"codigo_ibge": cidades[0]["codigo_ibge"]}
+        )
+        resultado, argumentos = await asyncio.to_thread(
+            self._preparar, pergunta, cidades, df, analise
+        )
+        if argumentos is not None:
+            resultado["mensagem"] = await agerar_resposta(**argumentos)
+        return resultado
+
+    def _sem_cidade(self) -> Dict[str, Any]:
+        return {
+            "tipo": "erro",
+            "mensagem": "Não foi possível identificar uma cidade válida para educação técnica.",
+            "dados": None,
+            "fontes": [],
+        }
+
+    def _preparar(
+        self,
+        pergunta: str,
+        cidades: List[Dict[str, Any]],
+        df: pd.DataFrame,
+        analise: Optional[AnalisePergunta] = None,
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        # Resultado e argumentos do LLM (None: sem dados ou resposta direta)
+        nome = cidades[0]["nome"]
         if df.empty:
             logger.warning(f"⚠️ Sem dados de educação técnica para {nome}.")
-            return {
+            erro: Dict[str, Any] = {
                 "tipo": "erro",
                 "mensagem": f"Não foram encontrados dados de educação técnica para {nome}.",
                 "dados": None,
                 "fontes": [],
             }
+            return erro, None
 
-        # prepara markdown e lista de registros
-        dados_md = df.to_markdown(index=False)
+        # prepara lista de registros
         registros = df.to_dict(orient="records")
-
-        resposta = gerar_resposta(
-            pergunta=pergunta,
-            dados=registros,
-            tema=self.tema,
-            fontes=["PostgreSQL"],
-            prompt_template=TEMPLATE_SINGLE_CITY,
-            dados_formatados=dados_md,
-        )
-
-        return {
+        resultado = {
             "tipo": "resposta",
-            "mensagem": resposta,
+            "mensagem": "",  # preenchida com a resposta direta ou a do LLM
+            "dados": registros,
+            "fontes": ["PostgreSQL"],
+        }
+        # Uma cidade e uma métrica: frase pronta, sem chamar o LLM
+        direta = resposta_direta.responder(pergunta, cidades, registros, analise)
+        if direta is not None:
+            resultado["mensagem"] = direta
+            return resultado, None
+
+        # Só as colunas relevantes à pergunta, em formato compacto
+        tabela = montar_tabela(pergunta, registros, analise=analise)
+        argumentos = {
+            "pergunta": pergunta,
             "dados": registros,
+            "tema": self.tema,
             "fontes": ["PostgreSQL"],
+            "prompt_template": TEMPLATE_SINGLE_CITY,
+            "dados_formatados": tabela.texto,
+            "analise": analise,
         }
+        return resultado, argumentos
@@ -1,17 +1,54 @@
 # chatbot-llm/backend/core/engine.py
-import json
+import asyncio
 import hashlib
-import os
-from typing import Optional, List, Dict, Any
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any,
+    ContextManager,
+    FrozenSet,
+    Generator,
+    Iterator,
+    NamedTuple,
+    Tuple,
+)
 
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage
+from config.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_SECONDS,
+    LLM_SINGLE_FLIGHT_TIMEOUT_SECONDS,
+    SEMANTIC_CACHE_ENABLED,
+)
 from config.dicionarios import llm
+from core.montagem_prompt import compilar_template, estimar_tokens
+from core.router.analise_pergunta import AnalisePergunta
+from utils.cache_llm import obter_cache_llm
+from utils.cache_semantico import BuscaSemantica, cache_semantico
+from utils.chamada_unica import ChamadaUnica
 from utils.formatters import formatar_dados
 from utils.logger import get_logger
+from utils.telemetria_llm import (
+    Medicao,
+    nome_template,
+    telemetria_llm,
+    tokens_informados,
+)
 
 logger = get_logger(__name__)
-CACHE_DIR = "cache/llm"
-os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Perguntas idênticas simultâneas (mesma chave de cache) geram uma só chamada
+chamadas_llm: ChamadaUnica[str] = ChamadaUnica(
+    "llm", timeout=LLM_SINGLE_FLIGHT_TIMEOUT_SECONDS or None
+)
+# Cota de chamadas simultâneas ao LLM no caminho assíncrono
+limite_llm = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
 
 
 def gerar_chave_cache(texto_unico: str) -> str:
@@ -19,20 +56,281 @@ def gerar_chave_cache(texto_unico: str) -> str:
 
 
 def carregar_do_cache(chave: str) -> Optional[str]:
-    path = os.path.join(CACHE_DIR, f"{chave}.json")
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        # garante que retornamos Optional[str], não Any
-        raw = data.get("resposta")
-        return raw if isinstance(raw, str) else None
-    return None
+    return obter_cache_llm().obter(chave)
 
 
 def salvar_em_cache(chave: str, resposta: str) -> None:
-    path = os.path.join(CACHE_DIR, f"{chave}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump({"resposta": resposta}, f, ensure_ascii=False)
+    obter_cache_llm().guardar(chave, resposta)
+
+
+class Geracao(NamedTuple):
+    """Tudo o que define uma resposta do LLM (prompt e chave de cache)."""
+
+    pergunta: str
+    chave: str
+    prompt_template: str
+    dados_formatados: str
+    fontes_str: str
+    template_vars: Dict[str, Any]
+    metricas: Optional[FrozenSet[str]] = None  # da análise da pergunta
+
+    def prompt(self) -> List[BaseMessage]:
+        # usa estritamente o template passado pelo agent (compilado uma vez)
+        return compilar_template(self.prompt_template).format_messages(
+            pergunta=self.pergunta,
+            dados_formatados=self.dados_formatados,
+            fontes=self.fontes_str,
+            **self.template_vars,
+        )
+
+
+def _medir(
+    geracao: Geracao, modo: str, requisicao: bool = True
+) -> ContextManager[Medicao]:
+    return telemetria_llm.medir(
+        str(geracao.template_vars.get("tema") or "desconhecido"),
+        nome_template(geracao.prompt_template),
+        modo,
+        geracao.chave,
+        requisicao,
+    )
+
+
+def _texto(conteudo: Any) -> str:
+    # cast para str para garantir retorno do tipo correto
+    return conteudo if isinstance(conteudo, str) else str(conteudo)
+
+
+def _retentavel(erro: Exception) -> bool:
+    # as mesmas falhas que o SDK do Groq retentaria: conexão, timeout, 408,
+    # 409, 429 e 5xx (o cliente é criado com max_retries=0)
+    status = getattr(erro, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    nome = type(erro).__name__
+    return isinstance(erro, (ConnectionError, TimeoutError)) or (
+        "Connection" in nome or "Timeout" in nome
+    )
+
+
+def _tentar_de_novo(medicao: Medicao, erro: Exception) -> Optional[float]:
+    """Espera antes da próxima tentativa ou None para desistir."""
+    if medicao.tentativas > LLM_MAX_RETRIES or not _retentavel(erro):
+        return None
+    espera = LLM_RETRY_BACKOFF_SECONDS * 2.0 ** (medicao.tentativas - 1)
+    logger.warning(
+        f"🔁 Falha no LLM ({type(erro).__name__}); tentativa "
+        f"{medicao.tentativas + 1} em {espera:.1f}s."
+    )
+    return espera
+
+
+def _contar_tokens(
+    medicao: Medicao,
+    mensagens: List[BaseMessage],
+    resposta: str,
+    informados: Optional[Tuple[int, int]],
+) -> None:
+    if informados is None:
+        # sem usage do provedor: mesma estimativa do orçamento do prompt
+        informados = (
+            sum(estimar_tokens(_texto(m.content)) for m in mensagens),
+            estimar_tokens(resposta),
+        )
+        medicao.tokens_estimados = True
+    medicao.tokens_prompt, medicao.tokens_resposta = informados
+
+
+# Gerações adiadas pelo streaming (ver `adiar_geracao`)
+_adiadas: ContextVar[Optional[List[Geracao]]] = ContextVar("_adiadas", default=None)
+
+
+@contextmanager
+def adiar_geracao() -> Iterator[List[Geracao]]:
+    """
+    Dentro do bloco, `gerar_resposta` não chama o LLM em caso de miss: a
+    geração é registrada na lista devolvida e a resposta fica vazia, para
+    ser transmitida depois com `transmitir_resposta`. Acertos de cache
+    continuam voltando direto.
+    """
+    adiadas: List[Geracao] = []
+    token = _adiadas.set(adiadas)
+    try:
+        yield adiadas
+    finally:
+        _adiadas.reset(token)
+
+
+def _reaproveitar(
+    geracao: Geracao, medicao: Medicao
+) -> Tuple[Optional[str], Optional[str], BuscaSemantica]:
+    """Resposta já existente (exata ou paráfrase), o balde semântico e a busca."""
+    # outra requisição pode ter gravado a resposta entre o miss e a liderança
+    cached, medicao.cache = obter_cache_llm().obter_com_camada(geracao.chave)
+    if cached:
+        return cached, None, BuscaSemantica(None, 0.0, None)
+
+    # paráfrase de pergunta já respondida sobre exatamente os mesmos dados
+    balde: Optional[str] = None
+    busca = BuscaSemantica(None, 0.0, None)
+    if SEMANTIC_CACHE_ENABLED:
+        balde = gerar_chave_cache(
+            geracao.prompt_template
+            + geracao.dados_formatados
+            + geracao.fontes_str
+            + json.dumps(geracao.template_vars, sort_keys=True, default=str)
+        )
+        busca = cache_semantico.buscar(geracao.pergunta, balde, geracao.metricas)
+        if busca.chave is not None:
+            reaproveitada = carregar_do_cache(busca.chave)
+            if reaproveitada:
+                medicao.cache = "semantico"
+                return reaproveitada, balde, busca
+            cache_semantico.esquecer(balde, busca.chave)
+    return None, balde, busca
+
+
+def _concluir(
+    geracao: Geracao, resposta: str, balde: Optional[str], busca: BuscaSemantica
+) -> None:
+    salvar_em_cache(geracao.chave, resposta)
+    if balde is not None and busca.embedding is not None:
+        cache_semantico.registrar(
+            geracao.pergunta, balde, geracao.chave, busca.embedding, geracao.metricas
+        )
+    logger.debug(f"🧠 Resposta gerada:\n{resposta}")
+
+
+def _invocar(geracao: Geracao, medicao: Medicao) -> str:
+    mensagens = geracao.prompt()
+    medicao.cache = "llm"
+    inicio = time.perf_counter()
+    try:
+        while True:
+            medicao.tentativas += 1
+            try:
+                mensagem = llm.invoke(mensagens)
+                break
+            except Exception as e:
+                espera = _tentar_de_novo(medicao, e)
+                if espera is None:
+                    raise
+                time.sleep(espera)
+    finally:
+        medicao.latencia_llm_ms = (time.perf_counter() - inicio) * 1000
+
+    resposta = _texto(mensagem.content).strip()
+    _contar_tokens(medicao, mensagens, resposta, tokens_informados(mensagem))
+    return resposta
+
+
+def _gerar_sem_cache(geracao: Geracao, medicao: Medicao) -> str:
+    existente, balde, busca = _reaproveitar(geracao, medicao)
+    if existente:
+        return existente
+
+    resposta = _invocar(geracao, medicao)
+    _concluir(geracao, resposta, balde, busca)
+    return resposta
+
+
+def transmitir_resposta(geracao: Geracao) -> Iterator[str]:
+    """
+    Mesma resposta de `gerar_resposta`, em pedaços à medida que o LLM gera.
+    Respostas em cache saem em um único pedaço; o texto final vai para o cache.
+    Perguntas idênticas simultâneas (em streaming ou não) geram uma só chamada:
+    quem espera recebe o texto final em um único pedaço.
+    """
+    with _medir(geracao, "stream") as medicao:
+        yield from chamadas_llm.executar_em_partes(
+            geracao.chave,
+            lambda: _transmitir_sem_cache(geracao, medicao),
+            lambda partes: "".join(partes).strip(),
+        )
+
+
+def _transmitir_sem_cache(
+    geracao: Geracao, medicao: Medicao
+) -> Generator[str, None, None]:
+    existente, balde, busca = _reaproveitar(geracao, medicao)
+    if existente:
+        yield existente
+        return
+
+    mensagens = geracao.prompt()
+    medicao.cache = "llm"
+    partes: List[str] = []
+    informados: Optional[Tuple[int, int]] = None
+    inicio = time.perf_counter()
+    try:
+        while True:
+            medicao.tentativas += 1
+            try:
+                for pedaco in llm.stream(mensagens):
+                    # o uso costuma vir só no último pedaço
+                    uso = tokens_informados(pedaco)
+                    if uso is not None:
+                        informados = (
+                            uso
+                            if informados is None
+                            else (informados[0] + uso[0], informados[1] + uso[1])
+                        )
+                    texto = _texto(pedaco.content)
+                    if not texto:
+                        continue
+                    # sem espaços iniciais, como o strip da resposta completa
+                    if not partes:
+                        texto = texto.lstrip()
+                        if not texto:
+                            continue
+                    partes.append(texto)
+                    yield texto
+                break
+            except Exception as e:
+                # depois do primeiro pedaço enviado não há como recomeçar
+                espera = None if partes else _tentar_de_novo(medicao, e)
+                if espera is None:
+                    raise
+                time.sleep(espera)
+    finally:
+        medicao.latencia_llm_ms = (time.perf_counter() - inicio) * 1000
+
+    resposta = "".join(partes).strip()
+    _contar_tokens(medicao, mensagens, resposta, informados)
+    _concluir(geracao, resposta, balde, busca)
+
+
+def _preparar_geracao(
+    pergunta: str,
+    dados: List[Dict[str, Any]],
+    fontes: Optional[List[str]],
+    prompt_template: Optional[str],
+    template_vars: Dict[str, Any],
+    analise: Optional[AnalisePergunta] = None,
+) -> Geracao:
+    if not prompt_template:
+        logger.error("❌ Bug: prompt_template não foi fornecido pelo agent.")
+        raise ValueError("Nenhum prompt_template fornecido a gerar_resposta.")
+
+    # formata dados e monta string de fontes
+    dados_formatados = template_vars.pop("dados_formatados", None)
+    if dados_formatados is None:
+        dados_formatados = formatar_dados(dados)
+    fontes_str = ", ".join(fontes or ["Fonte desconhecida"])
+
+    # calcula chave de cache
+    texto_cache = pergunta + dados_formatados + fontes_str
+    chave = gerar_chave_cache(texto_cache)
+    metricas = frozenset(m.coluna for m in analise.metricas) if analise else None
+    return Geracao(
+        pergunta,
+        chave,
+        prompt_template,
+        dados_formatados,
+        fontes_str,
+        template_vars,
+        metricas,
+    )
 
 
 def gerar_resposta(
@@ -40,41 +338,97 @@ def gerar_resposta(
     dados: List[Dict[str, Any]],
     fontes: Optional[List[str]] = None,
     prompt_template: Optional[str] = None,
+    analise: Optional[AnalisePergunta] = None,
     **template_vars: Any,
 ) -> str:
     """
     Gera a resposta usando estritamente o prompt_template fornecido pelo agent.
     Todos os parâmetros adicionais (dados_formatados, contextos, comparacoes, etc.)
-    devem ser passados via template_vars.
+    devem ser passados via template_vars. `analise`: a análise da pergunta feita
+    no roteamento, reaproveitada pelo cache semântico.
     """
-    if not prompt_template:
-        logger.error("❌ Bug: prompt_template não foi fornecido pelo agent.")
-        raise ValueError("Nenhum prompt_template fornecido a gerar_resposta.")
+    geracao = _preparar_geracao(
+        pergunta, dados, fontes, prompt_template, template_vars, analise
+    )
+    with _medir(geracao, "invoke") as medicao:
+        cached, medicao.cache = obter_cache_llm().obter_com_camada(geracao.chave)
+        if cached:
+            logger.debug("⚡ Resposta recuperada do cache.")
+            return cached
 
-    # formata dados e monta string de fontes
-    dados_formatados = template_vars.pop("dados_formatados", formatar_dados(dados))
-    fontes_str = ", ".join(fontes or ["Fonte desconhecida"])
+        adiadas = _adiadas.get()
+        if adiadas is not None:
+            # medida quando for transmitida
+            medicao.adiada = True
+            adiadas.append(geracao)
+            return ""
 
-    # calcula chave e tenta cache
-    texto_cache = pergunta + dados_formatados + fontes_str
-    chave = gerar_chave_cache(texto_cache)
-    cached = carregar_do_cache(chave)
-    if cached:
-        logger.debug("⚡ Resposta recuperada do cache.")
-        return cached
-
-    # usa estritamente o template passado pelo agent
-    prompt = ChatPromptTemplate.from_template(prompt_template).format_messages(
-        pergunta=pergunta,
-        dados_formatados=dados_formatados,
-        fontes=fontes_str,
-        **template_vars,
-    )
-    raw = llm.invoke(prompt).content
-    # cast para str e strip para garantir retorno do tipo correto
-    raw_text = raw if isinstance(raw, str) else str(raw)
-    resposta = raw_text.strip()
+        # miss: uma única chamada por chave, mesmo com requisições simultâneas
+        return chamadas_llm.executar(
+            geracao.chave, lambda: _gerar_sem_cache(geracao, medicao)
+        )
 
-    salvar_em_cache(chave, resposta)
-    logger.debug(f"🧠 Resposta gerada:\n{resposta}")
+
+async def _agerar_compartilhada(geracao: Geracao) -> str:
+    # roda na tarefa do single-flight, que sobrevive ao cancelamento do líder:
+    # medição própria, registrada quando a chamada termina
+    with _medir(geracao, "ainvoke", requisicao=False) as medicao:
+        return await _agerar_sem_cache(geracao, medicao)
+
+
+async def _agerar_sem_cache(geracao: Geracao, medicao: Medicao) -> str:
+    # busca semântica calcula embedding: fora do event loop
+    existente, balde, busca = await asyncio.to_thread(_reaproveitar, geracao, medicao)
+    if existente:
+        return existente
+
+    mensagens = geracao.prompt()
+    medicao.cache = "llm"
+    inicio = time.perf_counter()
+    try:
+        while True:
+            medicao.tentativas += 1
+            try:
+                async with limite_llm:
+                    mensagem = await llm.ainvoke(mensagens)
+                break
+            except Exception as e:
+                espera = _tentar_de_novo(medicao, e)
+                if espera is None:
+                    raise
+                await asyncio.sleep(espera)
+    finally:
+        medicao.latencia_llm_ms = (time.perf_counter() - inicio) * 1000
+
+    resposta = _texto(mensagem.content).strip()
+    _contar_tokens(medicao, mensagens, resposta, tokens_informados(mensagem))
+    _concluir(geracao, resposta, balde, busca)
     return resposta
+
+
+async def agerar_resposta(
+    pergunta: str,
+    dados: List[Dict[str, Any]],
+    fontes: Optional[List[str]] = None,
+    prompt_template: Optional[str] = None,
+    analise: Optional[AnalisePergunta] = None,
+    **template_vars: Any,
+) -> str:
+    """
+    Versão assíncrona de `gerar_resposta` (mesmo prompt e mesmo cache), com
+    `ainvoke` e no máximo LLM_MAX_CONCURRENCY chamadas simultâneas por worker.
+    """
+    geracao = _preparar_geracao(
+        pergunta, dados, fontes, prompt_template, template_vars, analise
+    )
+    with _medir(geracao, "ainvoke") as medicao:
+        cached, medicao.cache = obter_cache_llm().obter_com_camada(geracao.chave)
+        if cached:
+            logger.debug("⚡ Resposta recuperada do cache.")
+            return cached
+
+        # líder e quem espera ficam como "coalescida"; tokens, custo e
+        # tentativas vão na medição da chamada compartilhada
+        return await chamadas_llm.aexecutar(
+            geracao.chave, lambda: _agerar_compartilhada(geracao)
+        )
@@ -1,48 +1,108 @@
 # chatbot-llm/backend/core/handlers/chat_handler.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, cast
 
+from core.engine import adiar_geracao, transmitir_resposta
 from core.handlers.fallback_handler import executar_fallback
-from core.handlers.log_handler import registrar_log
-from core.handlers.session_handler import registrar_resposta
+from core.handlers.log_handler import registrar_log, registrar_log_async
+from core.handlers.session_handler import registrar_resposta, registrar_resposta_async
+from core.router.analise_pergunta import AnalisePergunta
 from core.router.interpreter import interpretar_pergunta
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def processar_pergunta(pergunta: str, session_id: str) -> Tuple[
-    str,  # resposta
-    List[str],  # fontes
-    Optional[Dict[str, Any]],  # cidade_info
-    Optional[str],  # tema
-    Optional[Any],  # agente
-    Optional[Dict[str, Any]],  # dados brutos
-    Optional[Dict[str, Any]],  # chart_data
-    Optional[str],  # csv_base64
-    Optional[str],  # pdf_base64
-]:
-    logger.info(f"📥 Nova pergunta recebida: {pergunta}")
+class ResultadoAgente(NamedTuple):
+    resposta: str
+    fontes: List[str]
+    cidade_info: Optional[Dict[str, Any]]
+    tema: Optional[str]
+    agente: Optional[Any]
+    agente_nome: str
+    cidades: List[Dict[str, Any]]
+    dados: Optional[Dict[str, Any]]
+    chart_data: Optional[Dict[str, Any]]
+    csv_base64: Optional[str]
+    pdf_base64: Optional[str]
+
+
+def _executar_agente(pergunta: str) -> ResultadoAgente:
+    # Roteamento + consulta do agente (inclui a geração do texto, se não adiada)
+    dados: Optional[Dict[str, Any]] = None
+    agente, tema, cidades, analise = interpretar_pergunta(pergunta)
+
+    if agente:
+        try:
+            dados = agente.get_dados(
+                pergunta, cidades_detectadas=cidades, analise=analise
+            )
+        except Exception as e:
+            logger.error(
+                f"❌ Erro ao obter dados com agente {agente.__class__.__name__}: {e}"
+            )
+            dados = None
+
+    return _montar_resultado(agente, tema, cidades, dados)
+
+
+async def _obter_dados_async(
+    agente: Any,
+    pergunta: str,
+    cidades: List[Dict[str, Any]],
+    analise: Optional[AnalisePergunta],
+) -> Optional[Dict[str, Any]]:
+    # Agentes com `aget_dados` rodam no event loop; os síncronos, numa thread
+    aget_dados = getattr(agente, "aget_dados", None)
+    if aget_dados is not None:
+        dados: Optional[Dict[str, Any]] = await aget_dados(
+            pergunta, cidades_detectadas=cidades, analise=analise
+        )
+        return dados
+    return cast(
+        Optional[Dict[str, Any]],
+        await asyncio.to_thread(
+            agente.get_dados, pergunta, cidades_detectadas=cidades, analise=analise
+        ),
+    )
+
+
+async def _executar_agente_async(pergunta: str) -> ResultadoAgente:
+    dados: Optional[Dict[str, Any]] = None
+    # roteamento é CPU (embeddings, fuzzy): fora do event loop
+    agente, tema, cidades, analise = await asyncio.to_thread(
+        interpretar_pergunta, pergunta
+    )
+
+    if agente:
+        try:
+            dados = await _obter_dados_async(agente, pergunta, cidades, analise)
+        except Exception as e:
+            logger.error(
+                f"❌ Erro ao obter dados com agente {agente.__class__.__name__}: {e}"
+            )
+            dados = None
+
+    return _montar_resultado(agente, tema, cidades, dados)
+
 
+def _montar_resultado(
+    agente: Optional[Any],
+    tema: Optional[str],
+    cidades: List[Dict[str, Any]],
+    dados: Optional[Dict[str, Any]],
+) -> ResultadoAgente:
     resposta: str = "❌ Não consegui responder sua pergunta."
     fontes: List[str] = []
     chart_data: Optional[Dict[str, Any]] = None
     csv_base64: Optional[str] = None
     pdf_base64: Optional[str] = None
-    dados: Optional[Dict[str, Any]] = None
 
-    agente, tema, cidades = interpretar_pergunta(pergunta)
     agente_nome: str = agente.__class__.__name__ if agente else "LLM"
     cidade_info: Optional[Dict[str, Any]] = cidades[0] if cidades else None
 
-    if agente:
-        try:
-            dados = agente.get_dados(pergunta, cidades_detectadas=cidades)
-        except Exception as e:
-            logger.error(f"❌ Erro ao obter dados com agente {agente_nome}: {e}")
-            dados = None
-
     if isinstance(dados, dict):
         if dados.get("tipo") == "erro":
             resposta = str(dados.get("mensagem", resposta))
@@ -71,39 +131,158 @@ def processar_pergunta(pergunta: str, session_id: str) -> Tuple[
         agente = None
         agente_nome = "Nenhum"
 
+    return ResultadoAgente(
+        resposta,
+        fontes,
+        cidade_info,
+        tema,
+        agente,
+        agente_nome,
+        cidades,
+        dados,
+        chart_data,
+        csv_base64,
+        pdf_base64,
+    )
+
+
+def _registrar(session_id: str, pergunta: str, resultado: ResultadoAgente) -> None:
     try:
         registrar_resposta(
             session_id=session_id,
             pergunta=pergunta,
-            resposta=resposta,
-            agente_nome=agente_nome,
-            fontes=fontes,
-            cidades=[c["nome"] for c in cidades] if cidades else [],
-            tema=tema,
+            resposta=resultado.resposta,
+            agente_nome=resultado.agente_nome,
+            fontes=resultado.fontes,
+            cidades=[c["nome"] for c in resultado.cidades] if resultado.cidades else [],
+            tema=resultado.tema,
         )
         registrar_log(
             session_id=session_id,
             pergunta=pergunta,
-            resposta=resposta,
-            fontes=fontes,
-            cidade_info=cidade_info,
-            tema=tema,
+            resposta=resultado.resposta,
+            fontes=resultado.fontes,
+            cidade_info=resultado.cidade_info,
+            tema=resultado.tema,
         )
     except Exception as e:
         logger.error(
             f"❌ Erro ao registrar log no banco | Sessão: {session_id} | Erro: {e}"
         )
 
-    logger.info(f"✅ Resposta final pronta | Agente: {agente_nome} | Fontes: {fontes}")
+    logger.info(
+        f"✅ Resposta final pronta | Agente: {resultado.agente_nome} "
+        f"| Fontes: {resultado.fontes}"
+    )
+
+
+async def _registrar_async(
+    session_id: str, pergunta: str, resultado: ResultadoAgente
+) -> None:
+    # os dois inserts no Mongo são independentes: em paralelo
+    await asyncio.gather(
+        registrar_resposta_async(
+            session_id=session_id,
+            pergunta=pergunta,
+            resposta=resultado.resposta,
+            agente_nome=resultado.agente_nome,
+            fontes=resultado.fontes,
+            cidades=[c["nome"] for c in resultado.cidades] if resultado.cidades else [],
+            tema=resultado.tema,
+        ),
+        registrar_log_async(
+            session_id=session_id,
+            pergunta=pergunta,
+            resposta=resultado.resposta,
+            fontes=resultado.fontes,
+            cidade_info=resultado.cidade_info,
+            tema=resultado.tema,
+        ),
+    )
+
+    logger.info(
+        f"✅ Resposta final pronta | Agente: {resultado.agente_nome} "
+        f"| Fontes: {resultado.fontes}"
+    )
+
+
+def processar_pergunta(pergunta: str, session_id: str) -> Tuple[
+    str,  # resposta
+    List[str],  # fontes
+    Optional[Dict[str, Any]],  # cidade_info
+    Optional[str],  # tema
+    Optional[Any],  # agente
+    Optional[Dict[str, Any]],  # dados brutos
+    Optional[Dict[str, Any]],  # chart_data
+    Optional[str],  # csv_base64
+    Optional[str],  # pdf_base64
+]:
+    logger.info(f"📥 Nova pergunta recebida: {pergunta}")
+
+    resultado = _executar_agente(pergunta)
+    _registrar(session_id, pergunta, resultado)
 
     return (
-        resposta,
-        fontes,
-        cidade_info,
-        tema,
-        agente,
-        dados,
-        chart_data,
-        csv_base64,
-        pdf_base64,
+        resultado.resposta,
+        resultado.fontes,
+        resultado.cidade_info,
+        resultado.tema,
+        resultado.agente,
+        resultado.dados,
+        resultado.chart_data,
+        resultado.csv_base64,
+        resultado.pdf_base64,
     )
+
+
+async def processar_pergunta_async(pergunta: str, session_id: str) -> ResultadoAgente:
+    """
+    Versão assíncrona de `processar_pergunta`: Postgres, LLM e Mongo sem ocupar
+    thread do worker; agentes sem `aget_dados` continuam funcionando via thread.
+    """
+    logger.info(f"📥 Nova pergunta recebida: {pergunta}")
+
+    resultado = await _executar_agente_async(pergunta)
+    await _registrar_async(session_id, pergunta, resultado)
+    return resultado
+
+
+def processar_pergunta_stream(
+    pergunta: str, session_id: str
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Versão em etapas de `processar_pergunta`, para streaming:
+    ("inicio", ResultadoAgente) assim que roteamento e dados ficam prontos,
+    ("token", str) para cada pedaço do texto do LLM e ("fim", ResultadoAgente)
+    com a resposta completa, já registrada no Mongo e no cache.
+    """
+    logger.info(f"📥 Nova pergunta recebida (stream): {pergunta}")
+
+    # A geração do texto fica para depois do evento inicial
+    with adiar_geracao() as adiadas:
+        resultado = _executar_agente(pergunta)
+    yield "inicio", resultado
+
+    if adiadas and resultado.agente is not None and not resultado.resposta:
+        partes: List[str] = []
+        try:
+            for pedaco in transmitir_resposta(adiadas[-1]):
+                partes.append(pedaco)
+                yield "token", pedaco
+            resposta = "".join(partes).strip()
+        except Exception as e:
+            logger.error(f"❌ Erro durante o streaming da resposta: {e}")
+            resposta = (
+                "".join(partes).strip() or "❌ Não consegui responder sua pergunta."
+            )
+            if not partes:
+                yield "token", resposta
+        if isinstance(resultado.dados, dict):
+            resultado.dados["mensagem"] = resposta
+        resultado = resultado._replace(resposta=resposta)
+    else:
+        # resposta já pronta (cache, erro ou sem agente): um único pedaço
+        yield "token", resultado.resposta
+
+    _registrar(session_id, pergunta, resultado)
+    yield "fim", resultado
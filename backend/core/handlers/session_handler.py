@@ -6,7 +6,7 @@ from typing import List, cast
 from pymongo.collection import Collection
 from pymongo import MongoClient
 
-from database.mongo_logger import log_interacao
+from database.mongo_logger import colecao_async, log_interacao, log_interacao_async
 from utils.logger import get_logger
 from utils.parser import formatar_historico_mensagens
 
@@ -59,3 +59,47 @@ def get_history_for_session(session_id: str) -> List[str]:
     except Exception as e:
         logger.error(f"❌ Erro ao recuperar histórico da sessão {session_id}: {e}")
         return cast(List[str], [])
+
+
+async def registrar_resposta_async(
+    session_id: str,
+    pergunta: str,
+    resposta: str,
+    agente_nome: str,
+    fontes: List[str],
+    cidades: List[str],
+    tema: str,
+) -> None:
+    """
+    Versão assíncrona de `registrar_resposta`.
+    """
+    try:
+        await log_interacao_async(
+            session_id=session_id,
+            user_input=pergunta,
+            resposta=resposta,
+            agente=agente_nome,
+            cidades=cidades,
+            tema=tema,
+        )
+        logger.debug(
+            f"💾 Log registrado | Sessão: {session_id} | Agente: {agente_nome}"
+        )
+    except Exception as e:
+        logger.error(
+            f"❌ Erro ao registrar mensagem no MongoDB | Sessão: {session_id} | Erro: {e}"
+        )
+
+
+async def get_history_for_session_async(session_id: str) -> List[str]:
+    """
+    Versão assíncrona de `get_history_for_session`.
+    """
+    try:
+        logger.debug(f"📚 Recuperando histórico da sessão: {session_id}")
+        cursor = colecao_async().find({"session_id": session_id}).sort("timestamp", 1)
+        mensagens = await cursor.to_list()
+        return formatar_historico_mensagens(mensagens)
+    except Exception as e:
+        logger.error(f"❌ Erro ao recuperar histórico da sessão {session_id}: {e}")
+        return []
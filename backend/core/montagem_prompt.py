@@ -0,0 +1,155 @@
+# chatbot-llm/backend/core/montagem_prompt.py
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from config.config import PROMPT_TOKEN_BUDGET
+from config.dicionarios import FAMILIAS_COLUNAS, METRICAS_VALIDAS
+from core.router.analise_pergunta import AnalisePergunta
+from core.router.semantic_metric import extrair_metricas
+from utils.logger import get_logger
+from utils.parser import normalizar
+
+logger = get_logger(__name__)
+
+# Sempre enviadas: identificam a linha e o ano de referência dos números
+COLUNAS_IDENTIFICADORAS = ("cidade", "estado")
+# Sem o tokenizer do modelo remoto, estimativa conservadora para português
+CARACTERES_POR_TOKEN = 3.5
+
+
+class TabelaPrompt(NamedTuple):
+    texto: str
+    colunas: Tuple[str, ...]
+    tokens: int  # estimados
+    colunas_podadas: int  # irrelevantes para a pergunta
+    colunas_cortadas: int  # relevantes, mas acima do orçamento
+    linhas_cortadas: int
+
+
+@lru_cache(maxsize=64)
+def compilar_template(template: str) -> ChatPromptTemplate:
+    """Template compilado uma vez por texto (os templates são constantes)."""
+    return ChatPromptTemplate.from_template(template)
+
+
+def estimar_tokens(texto: str) -> int:
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _identificadora(coluna: str) -> bool:
+    return coluna in COLUNAS_IDENTIFICADORAS or coluna.startswith("ano")
+
+
+def colunas_relevantes(
+    pergunta: str,
+    colunas: Sequence[str],
+    analise: Optional[AnalisePergunta] = None,
+) -> Tuple[str, ...]:
+    """
+    Colunas que interessam à pergunta: identificadores e anos, mais as
+    métricas classificadas ou, sem métrica exata, as famílias citadas por
+    radical ("matrículas" → matriculas_*). Sem nenhuma pista, todas. Com a
+    análise da pergunta, usa as métricas já extraídas nela.
+    """
+    detectadas = analise.metricas if analise else extrair_metricas(pergunta)
+    metricas = {m.coluna for m in detectadas}
+    escolhidas = {c for c in colunas if c in metricas}
+    if not escolhidas:
+        texto = analise.texto_norm if analise else normalizar(pergunta)
+        prefixos = tuple(
+            prefixo
+            for radical, lista in FAMILIAS_COLUNAS.items()
+            if radical in texto
+            for prefixo in lista
+        )
+        if prefixos:
+            escolhidas = {c for c in colunas if c.startswith(prefixos)}
+    if not escolhidas:
+        return tuple(colunas)
+    return tuple(c for c in colunas if _identificadora(c) or c in escolhidas)
+
+
+def _valor(valor: Any) -> str:
+    if valor is None:
+        return "-"
+    if isinstance(valor, float):
+        if math.isnan(valor):
+            return "-"
+        return str(int(valor)) if valor.is_integer() else f"{valor:.2f}"
+    return str(valor)
+
+
+def _renderizar(registros: Sequence[Dict[str, Any]], colunas: Sequence[str]) -> str:
+    # Rótulos legíveis; uma linha por campo (1 registro) ou tabela sem padding
+    rotulos = [METRICAS_VALIDAS.get(c, c) for c in colunas]
+    if len(registros) == 1:
+        return "\n".join(
+            f"{rotulo}: {_valor(registros[0].get(c))}"
+            for rotulo, c in zip(rotulos, colunas)
+        )
+    linhas = [" | ".join(rotulos)]
+    linhas += [" | ".join(_valor(r.get(c)) for c in colunas) for r in registros]
+    return "\n".join(linhas)
+
+
+def montar_tabela(
+    pergunta: str,
+    registros: Sequence[Dict[str, Any]],
+    orcamento: int = PROMPT_TOKEN_BUDGET,
+    analise: Optional[AnalisePergunta] = None,
+) -> TabelaPrompt:
+    """
+    Tabela de dados para o prompt: só as colunas relevantes, em formato
+    compacto e dentro do orçamento de tokens. Acima dele, corta primeiro as
+    últimas colunas de métrica e depois as últimas linhas, avisando o LLM.
+    """
+    if not registros:
+        texto = "Nenhum dado disponível."
+        return TabelaPrompt(texto, (), estimar_tokens(texto), 0, 0, 0)
+
+    todas = [str(c) for c in registros[0].keys()]
+    colunas = list(colunas_relevantes(pergunta, todas, analise))
+    linhas: List[Dict[str, Any]] = list(registros)
+    texto = _renderizar(linhas, colunas)
+
+    cortadas = 0
+    while estimar_tokens(texto) > orcamento:
+        metricas = [c for c in colunas if not _identificadora(c)]
+        if len(metricas) > 1:
+            colunas.remove(metricas[-1])
+            cortadas += 1
+        elif len(linhas) > 1:
+            linhas.pop()
+        else:
+            break
+        texto = _renderizar(linhas, colunas)
+
+    linhas_cortadas = len(registros) - len(linhas)
+    if cortadas or linhas_cortadas:
+        texto += (
+            f"\n(omitidos por limite de tamanho: {cortadas} colunas, "
+            f"{linhas_cortadas} linhas)"
+        )
+        logger.warning(
+            f"✂️ Tabela do prompt acima de {orcamento} tokens: {cortadas} colunas e "
+            f"{linhas_cortadas} linhas cortadas."
+        )
+
+    tabela = TabelaPrompt(
+        texto,
+        tuple(colunas),
+        estimar_tokens(texto),
+        len(todas) - len(colunas) - cortadas,
+        cortadas,
+        linhas_cortadas,
+    )
+    logger.debug(
+        f"🧾 Tabela do prompt: {len(colunas)}/{len(todas)} colunas, "
+        f"{len(linhas)} linhas, ~{tabela.tokens} tokens."
+    )
+    return tabela
@@ -0,0 +1,146 @@
+# chatbot-llm/backend/core/resposta_direta.py
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from config.config import DIRECT_ANSWER_ENABLED
+from config.dicionarios import METRICAS_VALIDAS, TEMPLATES_RESPOSTA_DIRETA
+from core.router.analise_pergunta import AnalisePergunta
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Coluna do ano de referência de cada métrica (as demais usam a do agente)
+ANO_POR_METRICA: Dict[str, str] = {
+    "populacao_total": "ano_populacao",
+    "pib_per_capita": "ano_pib",
+}
+ANOS_GENERICOS = ("ano_dados", "ano_censo")
+# Nome da coluna no resultado do agente, quando a consulta usa alias
+ALIAS_COLUNAS: Dict[str, str] = {"populacao_total": "populacao"}
+# Métricas monetárias: sempre com centavos
+METRICAS_MONETARIAS = {"pib_per_capita"}
+
+
+def formatar_numero(valor: float, casas: Optional[int] = None) -> str:
+    """Número no padrão brasileiro (1.234.567 / 1.234,56)."""
+    if casas is None:
+        casas = 0 if float(valor).is_integer() else 2
+    texto = f"{valor:,.{casas}f}"
+    return texto.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _numero(valor: Any) -> Optional[float]:
+    if valor is None or isinstance(valor, bool):
+        return None
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(numero) else numero
+
+
+class RespostaDireta:
+    """
+    Resposta sem LLM para a consulta mais comum: uma cidade e uma métrica.
+    Preenche uma frase pronta com o valor formatado e o ano da fonte; em
+    qualquer dúvida (comparação, variação ou ano pedido, várias métricas,
+    valor ou ano ausente) recusa e o agente segue para o LLM. Conta quantas vezes dispara.
+    """
+
+    def __init__(self, ativa: bool = DIRECT_ANSWER_ENABLED) -> None:
+        self.ativa = ativa
+        self._lock = threading.Lock()
+        self.avaliadas = 0
+        self.respondidas = 0
+        self.recusas: Counter[str] = Counter()
+
+    def _recusar(self, motivo: str) -> None:
+        with self._lock:
+            self.recusas[motivo] += 1
+        logger.debug(f"↪️ Resposta direta recusada ({motivo}); seguindo para o LLM.")
+
+    def responder(
+        self,
+        pergunta: str,
+        cidades: Sequence[Dict[str, Any]],
+        registros: Sequence[Dict[str, Any]],
+        analise: Optional[AnalisePergunta],
+    ) -> Optional[str]:
+        """`analise`: a do roteamento (None se ela falhou: vai para o LLM)."""
+        if not self.ativa:
+            return None
+        with self._lock:
+            self.avaliadas += 1
+
+        if analise is None:
+            self._recusar("analise_indisponivel")
+            return None
+        if analise.comparativa or len(cidades) != 1 or len(registros) != 1:
+            self._recusar("nao_e_cidade_unica")
+            return None
+        if analise.analitica:
+            # "crescimento", "evolução", "em 2010": não é só o valor atual
+            self._recusar("pede_analise")
+            return None
+
+        colunas: List[str] = []
+        for metrica in analise.metricas:
+            if not metrica.coluna.startswith("ano") and metrica.coluna not in colunas:
+                colunas.append(metrica.coluna)
+        if len(colunas) != 1 or colunas[0] not in METRICAS_VALIDAS:
+            self._recusar("sem_metrica_unica")
+            return None
+
+        coluna = colunas[0]
+        linha = registros[0]
+        valor = _numero(linha.get(coluna, linha.get(ALIAS_COLUNAS.get(coluna, ""))))
+        if valor is None:
+            self._recusar("valor_ausente")
+            return None
+
+        colunas_ano = (ANO_POR_METRICA[coluna],) if coluna in ANO_POR_METRICA else ()
+        ano: Optional[float] = None
+        for coluna_ano in colunas_ano + ANOS_GENERICOS:
+            ano = _numero(linha.get(coluna_ano))
+            if ano is not None:
+                break
+        if ano is None:
+            self._recusar("ano_ausente")
+            return None
+
+        cidade = str(linha.get("cidade") or cidades[0].get("nome", ""))
+        uf = cidades[0].get("uf")
+        template = TEMPLATES_RESPOSTA_DIRETA.get(
+            coluna, TEMPLATES_RESPOSTA_DIRETA["padrao"]
+        )
+        resposta = template.format(
+            cidade=f"{cidade} ({uf})" if uf else cidade,
+            rotulo=METRICAS_VALIDAS[coluna],
+            valor=formatar_numero(valor, 2 if coluna in METRICAS_MONETARIAS else None),
+            ano=int(ano),
+        )
+        with self._lock:
+            self.respondidas += 1
+        logger.info(f"⚡ Resposta direta (sem LLM): {coluna} de {cidade}.")
+        return resposta
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ativa": self.ativa,
+                "avaliadas": self.avaliadas,
+                "respondidas": self.respondidas,
+                "taxa_disparo": (
+                    round(self.respondidas / self.avaliadas, 4)
+                    if self.avaliadas
+                    else 0.0
+                ),
+                "recusas": dict(self.recusas),
+            }
+
+
+resposta_direta = RespostaDireta()
@@ -0,0 +1,223 @@
+# chatbot-llm/backend/core/router/analise_pergunta.py
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config.dicionarios import (
+    COMPARATIVE_PATTERNS,
+    CONECTORES_COMPARATIVOS,
+    MARCADORES_ANALITICOS,
+)
+from core.router.indices_cidades import IndicesCidades, indices_cidades
+from core.router.semantic_metric import (
+    COLUNA_POR_TERMO,
+    MetricaDetectada,
+    metricas_das_ocorrencias,
+)
+from core.router.semantic_router import ResultadoTema, matcher_temas, padrao_literal
+from utils.aho_corasick import (
+    AutomatoAhoCorasick,
+    Ocorrencia,
+    fronteira,
+    maiores_sem_sobreposicao,
+)
+from utils.geo import UF_POR_TERMO, MencaoUF, sigla_em_contexto
+from utils.logger import get_logger
+from utils.parser import normalizar
+
+logger = get_logger(__name__)
+
+UF = "uf"
+METRICA = "metrica"
+TEMA = "tema"
+COMPARATIVO = "comparativo"
+CONECTOR = "conector"
+ANALITICO = "analitico"
+
+# Perguntas analisadas mantidas em memória (LRU)
+MAX_ANALISES = 1024
+
+
+class AnalisePergunta(NamedTuple):
+    """
+    Resultado imutável da análise de uma pergunta (QueryAnalysis): texto
+    normalizado e tokenizado uma única vez e todos os dicionários aplicados.
+    Consumido pelo interpretador e pela detecção de cidades e repassado aos
+    agentes (tabela do prompt, resposta direta e assinatura do cache semântico).
+    """
+
+    pergunta: str
+    texto_norm: str
+    tokens: Tuple[str, ...]
+    versao_indices: Optional[int]
+    cidades: Tuple[Ocorrencia, ...]  # nomes de município, sem sobreposição
+    ufs: Tuple[MencaoUF, ...]
+    metricas: Tuple[MetricaDetectada, ...]
+    temas: ResultadoTema
+    marcadores_comparativos: Tuple[Ocorrencia, ...]
+    conectores_cidades: Tuple[Ocorrencia, ...]  # "," "e" "ou" "x" entre cidades
+    marcadores_analiticos: Tuple[Ocorrencia, ...]  # "crescimento", "evolução"...
+    anos: Tuple[int, ...]  # anos citados explicitamente ("em 2010")
+
+    @property
+    def comparativa(self) -> bool:
+        """
+        Marcador explícito de comparação (COMPARATIVE_PATTERNS) ou conector
+        entre duas cidades ("salvador ou belo horizonte").
+        """
+        return bool(self.marcadores_comparativos or self.conectores_cidades)
+
+    @property
+    def analitica(self) -> bool:
+        """
+        Pede mais que o valor atual de um indicador: variação, crescimento,
+        evolução (MARCADORES_ANALITICOS) ou um ano específico.
+        """
+        return bool(self.marcadores_analiticos or self.anos)
+
+
+class _Vocabulario:
+    """
+    Um único automato para os dicionários estáticos (UFs, métricas, termos
+    de tema, marcadores comparativos e analíticos e conectores entre cidades).
+    Todos os termos entram como prefixo; a fronteira final é conferida depois,
+    por categoria, para manter a semântica de cada dicionário.
+    """
+
+    def __init__(self) -> None:
+        # termo → [(categoria, exige fronteira no fim)]
+        self.categorias: Dict[str, List[Tuple[str, bool]]] = {}
+        for termo in UF_POR_TERMO:
+            self._cadastrar(termo, UF, True)
+        for termo in COLUNA_POR_TERMO:
+            self._cadastrar(termo, METRICA, False)
+        for termo, _, prefixo in matcher_temas.termos():
+            self._cadastrar(termo, TEMA, not prefixo)
+        for padrao in COMPARATIVE_PATTERNS:
+            literal = padrao_literal(padrao)
+            if literal is not None:
+                self._cadastrar(normalizar(literal), COMPARATIVO, True)
+        for conector in CONECTORES_COMPARATIVOS:
+            # pontuação não tem fronteira de palavra depois
+            self._cadastrar(conector, CONECTOR, conector.isalnum())
+        for radical in MARCADORES_ANALITICOS:
+            self._cadastrar(normalizar(radical), ANALITICO, False)
+        self.automato = AutomatoAhoCorasick()
+        for termo in self.categorias:
+            self.automato.adicionar(termo, prefixo=True)
+        self.automato.construir()
+
+    def _cadastrar(self, termo: str, categoria: str, exige_fim: bool) -> None:
+        entradas = self.categorias.setdefault(termo, [])
+        if (categoria, exige_fim) not in entradas:
+            entradas.append((categoria, exige_fim))
+
+    def buscar(self, texto_norm: str) -> Dict[str, List[Ocorrencia]]:
+        """Uma passada; devolve as ocorrências separadas por categoria."""
+        por_categoria: Dict[str, List[Ocorrencia]] = {
+            UF: [],
+            METRICA: [],
+            TEMA: [],
+            COMPARATIVO: [],
+            CONECTOR: [],
+            ANALITICO: [],
+        }
+        for oc in self.automato.buscar(texto_norm, manter_sobrepostas=True):
+            fim_ok = fronteira(texto_norm, oc.fim)
+            for categoria, exige_fim in self.categorias[oc.chave]:
+                if fim_ok or not exige_fim:
+                    por_categoria[categoria].append(oc)
+        return por_categoria
+
+
+_vocabulario = _Vocabulario()
+_TOKEN = re.compile(r"\w+")
+_ANO = re.compile(r"(?:19|20)\d{2}")
+
+
+def _analisar(pergunta: str, indices: IndicesCidades) -> AnalisePergunta:
+    texto_norm = normalizar(pergunta)
+    ocorrencias = _vocabulario.buscar(texto_norm)
+
+    # Temas: todos os acertos (inclusive sobrepostos) entram na pontuação
+    temas = matcher_temas.pontuar_ocorrencias(
+        matcher_temas.ocorrencias_de(ocorrencias[TEMA])
+        + matcher_temas.ocorrencias_regex(texto_norm)
+    )
+    cidades = tuple(indices.automato.buscar(texto_norm))
+    posicoes_cidades = [(oc.inicio, oc.fim) for oc in cidades]
+    mencoes_uf = (
+        MencaoUF(UF_POR_TERMO[oc.chave], oc.chave, oc.inicio, oc.fim)
+        for oc in maiores_sem_sobreposicao(ocorrencias[UF])
+    )
+    ufs = tuple(
+        m for m in mencoes_uf if sigla_em_contexto(texto_norm, m, posicoes_cidades)
+    )
+    # Conector só compara entre duas cidades: "bom jesus, rs" e "qual e a
+    # populacao" não contam ("rio grande" em "rio grande do sul" não é cidade)
+    fora_das_ufs = [
+        oc
+        for oc in cidades
+        if not any(m.inicio <= oc.inicio and oc.fim <= m.fim for m in ufs)
+    ]
+    conectores = tuple(
+        c
+        for c in ocorrencias[CONECTOR]
+        if any(oc.fim <= c.inicio for oc in fora_das_ufs)
+        and any(oc.inicio >= c.fim for oc in fora_das_ufs)
+    )
+    tokens = tuple(_TOKEN.findall(texto_norm))
+    return AnalisePergunta(
+        pergunta=pergunta,
+        texto_norm=texto_norm,
+        tokens=tokens,
+        versao_indices=indices.versao,
+        cidades=cidades,
+        ufs=ufs,
+        metricas=metricas_das_ocorrencias(
+            maiores_sem_sobreposicao(ocorrencias[METRICA])
+        ),
+        temas=temas,
+        marcadores_comparativos=tuple(ocorrencias[COMPARATIVO]),
+        conectores_cidades=conectores,
+        marcadores_analiticos=tuple(ocorrencias[ANALITICO]),
+        anos=tuple(int(token) for token in tokens if _ANO.fullmatch(token)),
+    )
+
+
+_cache: OrderedDict[Tuple[str, Optional[int]], AnalisePergunta] = OrderedDict()
+_lock = threading.Lock()
+
+
+def analisar_pergunta(
+    pergunta: str, indices: Optional[IndicesCidades] = None
+) -> AnalisePergunta:
+    """
+    Análise da pergunta sobre o snapshot de índices informado (ou o atual).
+    Resultados ficam em cache por pergunta e versão dos dados, de modo que
+    interpretador, detecção de cidades e agentes compartilham a mesma análise.
+    """
+    pergunta = pergunta or ""
+    if indices is None:
+        indices = indices_cidades()
+    chave = (pergunta, indices.versao)
+    with _lock:
+        analise = _cache.get(chave)
+        if analise is not None:
+            _cache.move_to_end(chave)
+            return analise
+
+    analise = _analisar(pergunta, indices)
+    with _lock:
+        _cache[chave] = analise
+        if len(_cache) > MAX_ANALISES:
+            _cache.popitem(last=False)
+    return analise
+
+
+def limpar_cache_analises() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,109 @@
+# chatbot-llm/backend/core/router/cache_rotas.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from config.config import ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL_SECONDS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RotaCacheada(NamedTuple):
+    agente: str  # nome da classe do agente (AGENTE_FALLBACK: sem agente)
+    tema: Optional[str]
+    codigos_ibge: Tuple[int, ...]
+
+
+class CacheRotas:
+    """
+    LRU com TTL das decisões do interpretador. Vale para uma única versão
+    dos índices de cidades: quando a versão muda, todas as entradas caem.
+    """
+
+    def __init__(
+        self,
+        max_itens: int = ROUTE_CACHE_SIZE,
+        ttl_segundos: float = ROUTE_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._itens: OrderedDict[Hashable, Tuple[float, RotaCacheada]] = OrderedDict()
+        self._versao: Optional[int] = None
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.max_itens > 0 and self.ttl_segundos > 0
+
+    def _sincronizar_versao(self, versao: Optional[int]) -> None:
+        # chamado com o lock adquirido
+        if versao == self._versao:
+            return
+        if self._itens:
+            self.invalidacoes += 1
+            logger.info(
+                f"🧹 Cache de rotas invalidado: versão {self._versao} → {versao} "
+                f"({len(self._itens)} entradas)."
+            )
+            self._itens.clear()
+        self._versao = versao
+
+    def obter(self, chave: Hashable, versao: Optional[int]) -> Optional[RotaCacheada]:
+        if not self.ativo:
+            return None
+        with self._lock:
+            self._sincronizar_versao(versao)
+            item = self._itens.get(chave)
+            if item is not None and time.monotonic() - item[0] > self.ttl_segundos:
+                del self._itens[chave]
+                self.expirados += 1
+                item = None
+            if item is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(
+        self, chave: Hashable, versao: Optional[int], rota: RotaCacheada
+    ) -> None:
+        if not self.ativo:
+            return
+        with self._lock:
+            self._sincronizar_versao(versao)
+            self._itens[chave] = (time.monotonic(), rota)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "ativo": self.ativo,
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl_segundos": self.ttl_segundos,
+                "versao_indices": self._versao,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "expirados": self.expirados,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+cache_rotas = CacheRotas()
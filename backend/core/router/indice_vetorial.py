@@ -0,0 +1,224 @@
+# chatbot-llm/backend/core/router/indice_vetorial.py
+from __future__ import annotations
+
+from typing import Optional, Protocol, Tuple, Union, runtime_checkable
+
+import numpy as np
+
+from utils.embedding_store import MatrizEmbeddings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ResultadoBusca = Tuple[np.ndarray, np.ndarray]  # (ids, scores) em ordem decrescente
+Vetores = Union[np.ndarray, MatrizEmbeddings]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Posições dos `k` maiores scores, ordenadas do maior para o menor,
+    sem ordenar o vetor inteiro (argpartition + sort só dos k).
+    """
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if scores.size > k:
+        parcial = np.argpartition(scores, -k)[-k:]
+    else:
+        parcial = np.arange(scores.size)
+    return parcial[np.argsort(-scores[parcial], kind="stable")]
+
+
+def top_k_linhas(scores: np.ndarray, k: int) -> np.ndarray:
+    """Versão de `top_k` aplicada a cada linha de uma matriz (m, n)."""
+    m, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((m, 0), dtype=np.int64)
+    if n > k:
+        parcial = np.argpartition(scores, -k, axis=1)[:, -k:]
+    else:
+        parcial = np.broadcast_to(np.arange(n), (m, n))
+    valores = np.take_along_axis(scores, parcial, axis=1)
+    ordem = np.argsort(-valores, axis=1, kind="stable")
+    return np.take_along_axis(parcial, ordem, axis=1)
+
+
+@runtime_checkable
+class IndiceVetorial(Protocol):
+    def buscar(self, consulta: np.ndarray, k: int) -> ResultadoBusca: ...
+
+    def buscar_lote(self, consultas: np.ndarray, k: int) -> ResultadoBusca: ...
+
+    def fatiar(self, ids: np.ndarray) -> IndiceVetorial: ...
+
+
+class IndiceExato:
+    """
+    Busca exata por produto interno (vetores normalizados → cosseno).
+    Os ids retornados são sempre relativos à matriz original.
+    """
+
+    def __init__(self, vetores: Vetores, ids: Optional[np.ndarray] = None) -> None:
+        self.vetores = vetores
+        self.ids = ids if ids is not None else np.arange(len(vetores))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def buscar(self, consulta: np.ndarray, k: int) -> ResultadoBusca:
+        scores = self.vetores @ consulta
+        pos = top_k(scores, k)
+        return self.ids[pos], scores[pos]
+
+    def buscar_lote(self, consultas: np.ndarray, k: int) -> ResultadoBusca:
+        # um único produto matriz-matriz para todas as consultas
+        scores = np.ascontiguousarray((self.vetores @ consultas.T).T)
+        pos = top_k_linhas(scores, k)
+        return self.ids[pos], np.take_along_axis(scores, pos, axis=1)
+
+    def fatiar(self, ids: np.ndarray) -> IndiceExato:
+        # ids globais → linhas locais (self.ids é sempre crescente)
+        linhas = np.searchsorted(self.ids, np.sort(ids))
+        return IndiceExato(self.vetores[linhas], self.ids[linhas])
+
+
+class IndiceIVF:
+    """
+    Índice aproximado por listas invertidas (IVF) em NumPy puro.
+
+    Os vetores são agrupados por k-means esférico em `n_listas` centróides;
+    a busca visita apenas as `n_sondas` listas mais próximas da consulta.
+    """
+
+    def __init__(
+        self,
+        vetores: Vetores,
+        n_listas: int = 64,
+        n_sondas: int = 8,
+        iteracoes: int = 10,
+        semente: int = 42,
+        ids: Optional[np.ndarray] = None,
+    ) -> None:
+        self.vetores = vetores
+        self.ids = ids if ids is not None else np.arange(len(vetores))
+        self.n_sondas = n_sondas
+        n_listas = max(1, min(n_listas, len(vetores)))
+        # o treino usa uma cópia float32 temporária; a busca usa `vetores` como está
+        treino = np.asarray(vetores, dtype=np.float32)
+        self.centroides = self._kmeans(treino, n_listas, iteracoes, semente)
+        self._atribuir()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _kmeans(
+        vetores: np.ndarray, n_listas: int, iteracoes: int, semente: int
+    ) -> np.ndarray:
+        rng = np.random.default_rng(semente)
+        escolhidos = rng.choice(len(vetores), size=n_listas, replace=False)
+        centroides = np.array(vetores[escolhidos], dtype=np.float32)
+        for _ in range(iteracoes):
+            rotulos = np.argmax(vetores @ centroides.T, axis=1)
+            for c in range(n_listas):
+                membros = vetores[rotulos == c]
+                if len(membros):
+                    media = membros.mean(axis=0)
+                    norma = np.linalg.norm(media)
+                    centroides[c] = media / norma if norma > 0 else media
+        return centroides
+
+    def _atribuir(self) -> None:
+        rotulos = np.argmax(self.vetores @ self.centroides.T, axis=1)
+        ordem = np.argsort(rotulos, kind="stable")
+        limites = np.searchsorted(rotulos[ordem], np.arange(len(self.centroides) + 1))
+        # linhas locais agrupadas por lista; lista c = ordem[limites[c]:limites[c+1]]
+        self._ordem = ordem
+        self._limites = limites
+
+    def buscar(self, consulta: np.ndarray, k: int) -> ResultadoBusca:
+        listas = top_k(self.centroides @ consulta, self.n_sondas)
+        linhas = np.concatenate(
+            [self._ordem[self._limites[c] : self._limites[c + 1]] for c in listas]
+        )
+        if linhas.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.vetores[linhas] @ consulta
+        pos = top_k(scores, k)
+        return self.ids[linhas[pos]], scores[pos]
+
+    def buscar_lote(self, consultas: np.ndarray, k: int) -> ResultadoBusca:
+        # cada consulta visita listas diferentes; o ganho do IVF já é por consulta
+        resultados = [self.buscar(consulta, k) for consulta in consultas]
+        largura = max((len(ids) for ids, _ in resultados), default=0)
+        ids_lote = np.full((len(resultados), largura), -1, dtype=np.int64)
+        scores_lote = np.full((len(resultados), largura), -np.inf, dtype=np.float32)
+        for linha, (ids, scores) in enumerate(resultados):
+            ids_lote[linha, : len(ids)] = ids
+            scores_lote[linha, : len(scores)] = scores
+        return ids_lote, scores_lote
+
+    def fatiar(self, ids: np.ndarray) -> IndiceVetorial:
+        linhas = np.searchsorted(self.ids, np.sort(ids))
+        # fatias pequenas (ex.: cidades de uma UF) não compensam o IVF
+        if len(linhas) <= len(self.centroides) * 16:
+            return IndiceExato(self.vetores[linhas], self.ids[linhas])
+        sub = IndiceIVF.__new__(IndiceIVF)
+        sub.vetores = self.vetores[linhas]
+        sub.ids = self.ids[linhas]
+        sub.n_sondas = self.n_sondas
+        sub.centroides = self.centroides
+        sub._atribuir()
+        return sub
+
+
+def criar_indice(
+    vetores: Vetores, backend: str = "exato", n_listas: int = 64, n_sondas: int = 8
+) -> IndiceVetorial:
+    """
+    Fábrica dos backends disponíveis: 'exato' ou 'ivf'.
+    """
+    if backend == "ivf" and len(vetores) > n_listas:
+        indice = IndiceIVF(vetores, n_listas=n_listas, n_sondas=n_sondas)
+        recall = medir_recall(indice, vetores)
+        logger.info(
+            f"🧭 Índice IVF criado ({n_listas} listas, {n_sondas} sondas) | "
+            f"recall@10 vs exato: {recall:.3f}"
+        )
+        return indice
+    if backend not in ("exato", "ivf"):
+        logger.warning(f"⚠️ Backend vetorial '{backend}' desconhecido. Usando 'exato'.")
+    return IndiceExato(vetores)
+
+
+def medir_recall(
+    indice: IndiceVetorial,
+    vetores: Vetores,
+    consultas: Optional[np.ndarray] = None,
+    k: int = 10,
+    amostras: int = 128,
+    semente: int = 0,
+) -> float:
+    """
+    Recall@k do índice em relação à busca exata. Sem `consultas`, usa uma
+    amostra dos próprios vetores perturbada com ruído gaussiano.
+    """
+    if consultas is None:
+        rng = np.random.default_rng(semente)
+        escolhidos = rng.choice(len(vetores), size=min(amostras, len(vetores)))
+        # ruído com norma esperada ~0.3, independente da dimensão
+        escala = 0.3 / np.sqrt(vetores.shape[1])
+        consultas = np.asarray(vetores[escolhidos], dtype=np.float32) + rng.normal(
+            0, escala, size=(len(escolhidos), vetores.shape[1])
+        ).astype(np.float32)
+        consultas /= np.linalg.norm(consultas, axis=1, keepdims=True)
+
+    exato = IndiceExato(vetores)
+    acertos = 0
+    total = 0
+    for consulta in consultas:
+        esperados, _ = exato.buscar(consulta, k)
+        obtidos, _ = indice.buscar(consulta, k)
+        acertos += len(np.intersect1d(esperados, obtidos))
+        total += len(esperados)
+    return acertos / total if total else 1.0
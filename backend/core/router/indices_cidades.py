@@ -0,0 +1,303 @@
+# chatbot-llm/backend/core/router/indices_cidades.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from config.config import (
+    CITY_EMBEDDING_MODEL,
+    DATA_VERSION_CHECK_SECONDS,
+    EMBEDDINGS_PATH,
+    EMBEDDINGS_PRECISION,
+    IVF_LISTAS,
+    IVF_SONDAS,
+    VECTOR_INDEX_BACKEND,
+)
+from core.router.indice_vetorial import IndiceVetorial, criar_indice
+from core.router.registro_cidades import RegistroCidades
+from database.connection import get_engine
+from database.versao_dados import consultar_versao_dados
+from utils.aho_corasick import AutomatoAhoCorasick
+from utils.embedding_store import MatrizEmbeddings, abrir_embeddings, salvar_embeddings
+from utils.logger import get_logger
+from utils.model_provider import RecursoSobDemanda, modelo_cidades, registrar_recurso
+from utils.trigramas import IndiceTrigramas
+
+logger = get_logger(__name__)
+
+
+class IndiceVetorialCidades(NamedTuple):
+    nomes: List[str]  # alinhados às linhas de `vetores` (= nomes do registro)
+    vetores: MatrizEmbeddings
+    indice: IndiceVetorial
+
+
+class IndicesCidades:
+    """
+    Snapshot de todas as estruturas derivadas de `municipios` para uma versão
+    dos dados. Uma pergunta usa sempre o mesmo snapshot do início ao fim; a
+    atualização constrói um novo em background e troca a referência global.
+    """
+
+    def __init__(self, registro: RegistroCidades, versao: Optional[int]) -> None:
+        self.versao = versao
+        self.registro = registro
+        # Automato único sobre os nomes normalizados: uma passada por pergunta
+        self.automato = AutomatoAhoCorasick(registro.nomes_normalizados)
+        # Índice trigrama → cidades, particionado por UF, para o matching aproximado
+        self.trigramas = IndiceTrigramas(
+            registro.nomes_normalizados,
+            ufs_por_nome={
+                nome: registro.ufs_do_nome(nome) for nome in registro.nomes_normalizados
+            },
+        )
+        # Preenchido quando o modelo local estiver pronto (atribuição única)
+        self.vetorial: Optional[IndiceVetorialCidades] = None
+        self._fatias_uf: Dict[str, IndiceVetorial] = {}
+
+    def anexar_embeddings(self, nomes: List[str], vetores: MatrizEmbeddings) -> None:
+        indice = criar_indice(
+            vetores,
+            backend=VECTOR_INDEX_BACKEND,
+            n_listas=IVF_LISTAS,
+            n_sondas=IVF_SONDAS,
+        )
+        self._fatias_uf = {}
+        self.vetorial = IndiceVetorialCidades(nomes, vetores, indice)
+
+    def indice_uf(self, uf: str) -> IndiceVetorial:
+        # Fatia do índice com apenas as cidades da UF detectada
+        vetorial = self.vetorial
+        if vetorial is None:
+            raise RuntimeError("Embeddings de cidades ainda não carregados.")
+        uf = uf.upper()
+        fatia = self._fatias_uf.get(uf)
+        if fatia is None:
+            ids = np.asarray(
+                [
+                    i
+                    for i, nome in enumerate(vetorial.nomes)
+                    if uf in self.registro.ufs_do_nome(nome)
+                ],
+                dtype=np.int64,
+            )
+            fatia = vetorial.indice.fatiar(ids)
+            self._fatias_uf[uf] = fatia
+        return fatia
+
+
+def _consultar_registro() -> RegistroCidades:
+    logger.info("📦 Carregando cidades do banco de dados via SQLAlchemy...")
+    engine = get_engine()
+    with engine.connect() as conn:
+        result = conn.execute(
+            text(
+                """
+                SELECT
+                  m.codigo_ibge,
+                  m.cidade,
+                  m.sigla_estado AS uf,
+                  e.nome         AS estado,
+                  m.populacao_total
+                FROM public.municipios m
+                JOIN public.estados e
+                  ON e.sigla = m.sigla_estado
+                """
+            )
+        )
+        linhas = result.fetchall()
+
+    registro = RegistroCidades(tuple(linha) for linha in linhas)
+    logger.info(
+        f"✅ {len(registro)} cidades carregadas "
+        f"({len(registro.nomes_normalizados)} nomes normalizados)."
+    )
+    return registro
+
+
+def _construir_indices(versao: Optional[int]) -> IndicesCidades:
+    indices = IndicesCidades(_consultar_registro(), versao)
+    logger.info(
+        f"🔤 Índices de cidades construídos (versão {versao}): "
+        f"{len(indices.automato)} nomes."
+    )
+    return indices
+
+
+def sincronizar_embeddings(
+    registro: RegistroCidades, modelo: Any
+) -> Tuple[List[str], MatrizEmbeddings]:
+    """
+    Garante que o store em disco tenha exatamente os nomes do registro, na
+    mesma ordem e na precisão configurada (EMBEDDINGS_PRECISION). Vetores de
+    nomes já conhecidos são reaproveitados; apenas os nomes novos passam
+    pelo modelo. Ao mudar a precisão, só vetores em float32 são requantizados;
+    os já quantizados são gerados de novo, sem acumular o erro.
+    """
+    nomes = registro.nomes_normalizados
+    antigos: Dict[str, int] = {}
+    store = None
+    try:
+        store = abrir_embeddings(EMBEDDINGS_PATH, modelo=CITY_EMBEDDING_MODEL)
+        mesma_precisao = store.precisao == EMBEDDINGS_PRECISION
+        if store.nomes == nomes and mesma_precisao:
+            logger.info(
+                f"📂 Embeddings de cidades mapeados do disco ({store.precisao})."
+            )
+            return store.nomes, store.vetores
+        if not mesma_precisao:
+            logger.info(
+                f"🔁 Embeddings em {store.precisao} no disco; regravando em "
+                f"{EMBEDDINGS_PRECISION}."
+            )
+        if mesma_precisao or store.precisao == "float32":
+            antigos = {nome: i for i, nome in enumerate(store.nomes)}
+    except FileNotFoundError:
+        logger.warning("⚠️ Embeddings não encontrados. Gerando on-the-fly.")
+    except ValueError as e:
+        logger.warning(f"⚠️ {e} Gerando novamente.")
+
+    novos = [nome for nome in nomes if nome not in antigos]
+    emb_novos = np.asarray(
+        modelo.encode(novos, normalize_embeddings=True) if novos else [],
+        dtype=np.float32,
+    )
+    if store is not None and antigos:
+        dim = store.vetores.shape[1]
+        emb = np.empty((len(nomes), dim), dtype=np.float32)
+        reaproveitados = [i for i, nome in enumerate(nomes) if nome in antigos]
+        emb[reaproveitados] = store.vetores[
+            [antigos[nomes[i]] for i in reaproveitados]
+        ].para_float32()
+        if novos:
+            emb[[i for i, nome in enumerate(nomes) if nome not in antigos]] = emb_novos
+        logger.info(
+            f"🔁 Embeddings sincronizados: {len(reaproveitados)} reaproveitados, "
+            f"{len(novos)} novos."
+        )
+    else:
+        emb = emb_novos
+
+    salvar_embeddings(
+        EMBEDDINGS_PATH, nomes, emb, CITY_EMBEDDING_MODEL, EMBEDDINGS_PRECISION
+    )
+    logger.info("💾 Embeddings salvos em cache local.")
+    store = abrir_embeddings(EMBEDDINGS_PATH)
+    return store.nomes, store.vetores
+
+
+# === Snapshot atual e atualização em background ===
+_atual: Optional[IndicesCidades] = None
+_lock_inicial = threading.Lock()
+_lock_atualizacao = threading.Lock()
+_ultima_verificacao = 0.0
+
+
+def indices_cidades() -> IndicesCidades:
+    """
+    Snapshot atual. Só a primeira chamada do processo constrói os índices
+    de forma síncrona; depois, a verificação da versão dos dados é feita no
+    máximo a cada DATA_VERSION_CHECK_SECONDS, sempre em background.
+    """
+    global _atual, _ultima_verificacao
+    atual = _atual
+    if atual is None:
+        with _lock_inicial:
+            if _atual is None:
+                _atual = _construir_indices(consultar_versao_dados())
+                _ultima_verificacao = time.monotonic()
+            atual = _atual
+        return atual
+
+    if (
+        DATA_VERSION_CHECK_SECONDS > 0
+        and time.monotonic() - _ultima_verificacao >= DATA_VERSION_CHECK_SECONDS
+    ):
+        _ultima_verificacao = time.monotonic()
+        agendar_atualizacao()
+    return atual
+
+
+def agendar_atualizacao() -> bool:
+    """
+    Dispara a verificação/reconstrução em uma thread daemon. Retorna False
+    se já houver uma em andamento (nunca bloqueia o chamador).
+    """
+    if not _lock_atualizacao.acquire(blocking=False):
+        return False
+    threading.Thread(
+        target=_atualizar, name="atualizar-indices-cidades", daemon=True
+    ).start()
+    return True
+
+
+def _atualizar() -> None:
+    global _atual
+    try:
+        atual = _atual
+        versao = consultar_versao_dados()
+        if atual is None or (versao is not None and versao != atual.versao):
+            logger.info(
+                f"🔄 Dados de municípios mudaram "
+                f"({atual.versao if atual else None} → {versao}). Reconstruindo..."
+            )
+            novo = _construir_indices(versao)
+        else:
+            novo = atual
+
+        # Embeddings entram antes da troca, para o novo snapshot já nascer completo
+        modelo = modelo_cidades.obter() if modelo_cidades.pronto else None
+        if novo.vetorial is None and modelo is not None:
+            novo.anexar_embeddings(*sincronizar_embeddings(novo.registro, modelo))
+
+        if novo is not atual:
+            _atual = novo
+            logger.info(f"✅ Índices de cidades trocados para a versão {versao}.")
+    except Exception as e:
+        logger.error(f"❌ Erro ao atualizar índices de cidades: {e}")
+    finally:
+        _lock_atualizacao.release()
+
+
+def _criar_embeddings_cidades() -> Optional[IndiceVetorialCidades]:
+    # O modelo local é carregado antes: sem ele não há como gerar/consultar
+    modelo_local = modelo_cidades.obter(bloquear=True)
+    if modelo_local is None:
+        return None
+    indices = indices_cidades()
+    if indices.vetorial is None:
+        indices.anexar_embeddings(
+            *sincronizar_embeddings(indices.registro, modelo_local)
+        )
+    return indices.vetorial
+
+
+# Carga inicial dos embeddings (aquecimento); trocas de versão usam `_atualizar`
+embeddings_cidades: RecursoSobDemanda[IndiceVetorialCidades] = RecursoSobDemanda(
+    "embeddings_cidades", _criar_embeddings_cidades
+)
+registrar_recurso(embeddings_cidades)
+
+
+def embeddings_prontos(indices: IndicesCidades) -> bool:
+    """
+    Verdadeiro quando o snapshot tem embeddings e o modelo local está pronto.
+    Caso contrário, agenda o carregamento em background; a detecção fica
+    restrita às etapas literal/fuzzy enquanto isso.
+    """
+    if indices.vetorial is not None and modelo_cidades.pronto:
+        return True
+    if embeddings_cidades.pronto:
+        # snapshot novo ainda sem embeddings (troca de versão em andamento)
+        agendar_atualizacao()
+    else:
+        embeddings_cidades.aquecer()
+    return False
+
+
+def carregar_cidades() -> RegistroCidades:
+    return indices_cidades().registro
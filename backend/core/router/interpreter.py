@@ -4,8 +4,14 @@ from __future__ import annotations
 from typing import Tuple, Type, Dict, List, Any, Protocol, Optional, runtime_checkable
 import re
 from utils.logger import get_logger
+from utils.model_provider import modelo_cidades
+from utils.parser import forma_canonica
+from core.router.analise_pergunta import AnalisePergunta, analisar_pergunta
+from core.router.cache_rotas import RotaCacheada, cache_rotas
+from core.router.indices_cidades import IndicesCidades, indices_cidades
 from core.router.semantic_router import classificar_tema
 from core.router.semantic_city import detectar_cidades
+from core.router.tema_vetorial import classificador_temas, classificar_tema_vetorial
 
 from core.agents.educacao_agent import EducacaoAgent
 from core.agents.tecnica_agent import TecnicaAgent
@@ -20,7 +26,10 @@ logger = get_logger(__name__)
 @runtime_checkable
 class AgentType(Protocol):
     def get_dados(
-        self, pergunta: str, cidades_detectadas: List[Dict[str, Any]]
+        self,
+        pergunta: str,
+        cidades_detectadas: List[Dict[str, Any]],
+        analise: Optional[AnalisePergunta] = None,
     ) -> Dict[str, Any]: ...
 
 
@@ -38,26 +47,96 @@ def load_agents() -> Dict[str, Type[AgentType]]:
 
 
 AGENTS_DISPONIVEIS = load_agents()
-
-
-def interpretar_pergunta(
-    pergunta: str,
-) -> Tuple[Optional[AgentType], str, List[Dict[str, Any]]]:
+# Rota sem agente (tema nulo ou desconhecido): resposta pelo fallback do LLM
+AGENTE_FALLBACK = "LLM"
+
+# Agente, tema, cidades e a análise da pergunta (repassada ao agente)
+RotaInterpretada = Tuple[
+    Optional[AgentType], Optional[str], List[Dict[str, Any]], Optional[AnalisePergunta]
+]
+
+
+def _restaurar_rota(
+    rota: RotaCacheada, indices: IndicesCidades
+) -> Optional[Tuple[Optional[AgentType], Optional[str], List[Dict[str, Any]]]]:
+    # Recria agente e cidades a partir da decisão em cache (mesma versão dos dados)
+    agente: Optional[AgentType] = None
+    if rota.agente != AGENTE_FALLBACK:
+        agente_classe = AGENTS_DISPONIVEIS.get(rota.tema) if rota.tema else None
+        if agente_classe is None or agente_classe.__name__ != rota.agente:
+            return None
+        agente = agente_classe()
+    cidades: List[Dict[str, Any]] = []
+    for codigo in rota.codigos_ibge:
+        i = indices.registro.id_codigo(codigo)
+        if i is None:
+            return None
+        cidades.append(indices.registro.cidade(i))
+    return agente, rota.tema, cidades
+
+
+def interpretar_pergunta(pergunta: str) -> RotaInterpretada:
     if not pergunta or not pergunta.strip():
         logger.warning("⚠️ Pergunta vazia ou inválida recebida.")
-        return InstitucionalAgent(), "institucional", []
+        return InstitucionalAgent(), "institucional", [], None
 
     logger.info("🔍 Interpretando pergunta recebida:")
     logger.info(pergunta)
 
+    # ⚡ Mesma pergunta (forma canônica) já roteada nesta versão dos dados.
+    # O estado do modelo local e o dos centroides de tema entram na chave: com
+    # eles prontos, a rota pode mudar (os centroides ficam prontos depois do
+    # modelo, e até lá o fallback vetorial de tema devolve None)
+    indices: Optional[IndicesCidades]
+    try:
+        indices = indices_cidades()
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter índices de cidades: {e}")
+        indices = None
+    chave = (
+        forma_canonica(pergunta),
+        modelo_cidades.pronto,
+        classificador_temas.pronto,
+    )
+    if indices is not None:
+        rota = cache_rotas.obter(chave, indices.versao)
+        restaurada = _restaurar_rota(rota, indices) if rota is not None else None
+        if restaurada is not None:
+            logger.info(f"⚡ Rota em cache: {rota}")
+            agente, tema_cacheado, cidades_cacheadas = restaurada
+            # a análise tem cache próprio: os agentes a recebem mesmo assim
+            try:
+                analise_cacheada: Optional[AnalisePergunta] = analisar_pergunta(
+                    pergunta, indices
+                )
+            except Exception as e:
+                logger.error(f"❌ Erro ao analisar pergunta: {e}")
+                analise_cacheada = None
+            return agente, tema_cacheado, cidades_cacheadas, analise_cacheada
+
+    # Só decisões sem erro intermediário vão para o cache
+    cacheavel = indices is not None
+
+    # 0️⃣ Análise única da pergunta (normalização + dicionários), reaproveitada
+    # pela detecção de cidades e pela classificação de tema
+    analise: Optional[AnalisePergunta]
+    try:
+        analise = analisar_pergunta(pergunta, indices)
+    except Exception as e:
+        logger.error(f"❌ Erro ao analisar pergunta: {e}")
+        analise = None
+        cacheavel = False
+
     # 1️⃣ Detectar cidades primeiro
     try:
         cidades = detectar_cidades(pergunta, max_cidades=10)
     except Exception as e:
         logger.error(f"❌ Erro ao detectar cidades: {e}")
         cidades = []
+        cacheavel = False
 
     # 2️⃣ Se 2+ cidades, forçar comparative
+    tema: Optional[str]
     if len(cidades) >= 2:
         tema = "comparative"
         logger.info(
@@ -66,18 +145,39 @@ def interpretar_pergunta(
     else:
         # 3️⃣ Classificar tema via classificar_tema
         try:
-            tema = classificar_tema(pergunta)
+            tema = classificar_tema(pergunta, analise.temas if analise else None)
         except Exception as e:
             logger.error(f"❌ Erro ao classificar tema: {e}")
             tema = "institucional"
+            cacheavel = False
+
+        # 3️⃣.1 Nenhuma regra casou: centroides de tema (modelo local, sem LLM)
+        if tema is None:
+            try:
+                tema = classificar_tema_vetorial(
+                    pergunta, analise.texto_norm if analise else None
+                )
+            except Exception as e:
+                logger.error(f"❌ Erro na classificação vetorial de tema: {e}")
+                cacheavel = False
 
     # 4️⃣ Selecionar agente: se tema não existir, usar LLMAgent
-    agente_classe = AGENTS_DISPONIVEIS.get(tema)
+    agente_classe = AGENTS_DISPONIVEIS.get(tema) if tema else None
     if agente_classe is None:
         logger.warning(f"❌ Tema '{tema}' não corresponde a nenhum agente. Abortando.")
-        return None, tema, cidades
-
-    logger.info(
-        f"🤖 Tema identificado: {tema} | Agente selecionado: {agente_classe.__name__}"
-    )
-    return agente_classe(), tema, cidades
+    else:
+        logger.info(
+            f"🤖 Tema identificado: {tema} | Agente selecionado: {agente_classe.__name__}"
+        )
+    # a rota de fallback também vai para o cache (restaurada pelo nome)
+    if cacheavel and indices is not None:
+        cache_rotas.guardar(
+            chave,
+            indices.versao,
+            RotaCacheada(
+                agente_classe.__name__ if agente_classe else AGENTE_FALLBACK,
+                tema,
+                tuple(int(c["codigo_ibge"]) for c in cidades),
+            ),
+        )
+    return (agente_classe() if agente_classe else None), tema, cidades, analise
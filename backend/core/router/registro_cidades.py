@@ -0,0 +1,210 @@
+# chatbot-llm/backend/core/router/registro_cidades.py
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from utils.parser import normalizar
+
+# (codigo_ibge, cidade, uf, estado, populacao_total)
+LinhaCidade = Tuple[int, str, str, str, Optional[int]]
+
+
+class RegistroCidades:
+    """
+    Cadastro colunar dos municípios.
+
+    Cada município tem um id inteiro (posição nos arrays). Os nomes originais
+    ficam em um único texto com offsets; código IBGE, UF e população em
+    arrays NumPy. Os nomes normalizados são únicos e apontam para todos os
+    municípios homônimos (multi-mapa), ordenados por população decrescente.
+    """
+
+    def __init__(self, linhas: Iterable[LinhaCidade]) -> None:
+        linhas = sorted(linhas, key=lambda linha: linha[0])
+        n = len(linhas)
+
+        self.codigo_ibge = np.fromiter(
+            (linha[0] for linha in linhas), np.int32, count=n
+        )
+        self.populacao = np.fromiter(
+            (linha[4] or 0 for linha in linhas), np.int64, count=n
+        )
+
+        self.ufs: List[str] = sorted({linha[2].upper() for linha in linhas})
+        pos_uf = {uf: i for i, uf in enumerate(self.ufs)}
+        self.estados: List[str] = [""] * len(self.ufs)
+        for _, _, uf, estado, _ in linhas:
+            self.estados[pos_uf[uf.upper()]] = estado
+        self.uf_idx = np.fromiter(
+            (pos_uf[linha[2].upper()] for linha in linhas), np.int16, count=n
+        )
+
+        # Nomes originais: um único str + offsets
+        self._nomes = "".join(linha[1] for linha in linhas)
+        self._offsets = np.zeros(n + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum([len(linha[1]) for linha in linhas])
+
+        # Multi-mapa nome normalizado → ids (mais populoso primeiro)
+        grupos: Dict[str, List[int]] = {}
+        for i, linha in enumerate(linhas):
+            grupos.setdefault(normalizar(linha[1]), []).append(i)
+        self.nomes_normalizados: List[str] = list(grupos)
+        self._id_nome: Dict[str, int] = {
+            nome: i for i, nome in enumerate(self.nomes_normalizados)
+        }
+        # Layout CSR: ids do nome j = _ids_nomes[_inicio_nome[j]:_inicio_nome[j + 1]]
+        self._ids_nomes = np.fromiter(
+            (
+                i
+                for ids in grupos.values()
+                for i in sorted(ids, key=lambda i: -int(self.populacao[i]))
+            ),
+            np.int32,
+            count=n,
+        )
+        self._inicio_nome = np.zeros(len(grupos) + 1, dtype=np.int32)
+        self._inicio_nome[1:] = np.cumsum([len(ids) for ids in grupos.values()])
+        # id do nome normalizado de cada município (agrupamento sem normalizar)
+        self.nome_idx = np.empty(n, dtype=np.int32)
+        self.nome_idx[self._ids_nomes] = np.repeat(
+            np.arange(len(grupos), dtype=np.int32), np.diff(self._inicio_nome)
+        )
+
+    def __len__(self) -> int:
+        return len(self.codigo_ibge)
+
+    def __contains__(self, nome_norm: object) -> bool:
+        return nome_norm in self._id_nome
+
+    def nome(self, i: int) -> str:
+        return self._nomes[int(self._offsets[i]) : int(self._offsets[i + 1])]
+
+    def uf(self, i: int) -> str:
+        return self.ufs[int(self.uf_idx[i])]
+
+    def cidade(self, i: int) -> Dict[str, Any]:
+        """Dicionário no formato consumido pelos agentes."""
+        uf_i = int(self.uf_idx[i])
+        return {
+            "codigo_ibge": int(self.codigo_ibge[i]),
+            "nome": self.nome(i),
+            "uf": self.ufs[uf_i],
+            "estado": self.estados[uf_i],
+            "populacao": int(self.populacao[i]),
+        }
+
+    def id_nome(self, nome_norm: str) -> Optional[int]:
+        return self._id_nome.get(nome_norm)
+
+    def id_codigo(self, codigo_ibge: int) -> Optional[int]:
+        # Linhas ordenadas por código IBGE: busca binária
+        i = int(np.searchsorted(self.codigo_ibge, codigo_ibge))
+        if i < len(self.codigo_ibge) and int(self.codigo_ibge[i]) == codigo_ibge:
+            return i
+        return None
+
+    def ids(self, nome_norm: str) -> np.ndarray:
+        """Todos os municípios com o nome normalizado, mais populoso primeiro."""
+        j = self._id_nome.get(nome_norm)
+        if j is None:
+            return np.empty(0, dtype=np.int32)
+        return self._ids_nomes[self._inicio_nome[j] : self._inicio_nome[j + 1]]
+
+    def ufs_do_nome(self, nome_norm: str) -> List[str]:
+        return [self.uf(int(i)) for i in self.ids(nome_norm)]
+
+    def resolver(
+        self, nome_norm: str, uf: Optional[str] = None, somente_uf: bool = False
+    ) -> Optional[int]:
+        """
+        Escolhe um município para o nome: o mais populoso na UF indicada,
+        se houver; senão (e se `somente_uf` for falso) o mais populoso do país.
+        """
+        ids = self.ids(nome_norm)
+        if not len(ids):
+            return None
+        if uf is not None:
+            alvo = self._posicao_uf(uf)
+            for i in ids:
+                if self.uf_idx[i] == alvo:
+                    return int(i)
+            if somente_uf:
+                return None
+        return int(ids[0])
+
+    def _posicao_uf(self, uf: str) -> int:
+        try:
+            return self.ufs.index(uf.upper())
+        except ValueError:
+            return -1
+
+    def por_nome(
+        self, uf: Optional[str] = None, somente_uf: bool = False
+    ) -> VisaoPorNome:
+        return VisaoPorNome(self, uf, somente_uf)
+
+    def agrupar(self, ids: Sequence[int], limite: int) -> List[Dict[str, Any]]:
+        """
+        Remove duplicatas (por município e por nome normalizado, mantendo o
+        mais populoso) e devolve até `limite` cidades, maiores primeiro.
+        """
+        escolhidos: Dict[int, int] = {}
+        for i in ids:
+            chave = int(self.nome_idx[i])
+            atual = escolhidos.get(chave)
+            if atual is None or self.populacao[i] > self.populacao[atual]:
+                escolhidos[chave] = int(i)
+        ordem = sorted(escolhidos.values(), key=lambda i: -int(self.populacao[i]))
+        return [self.cidade(i) for i in ordem[:limite]]
+
+
+class VisaoPorNome(Mapping[str, Dict[str, Any]]):
+    """
+    Visão nome normalizado → cidade sobre o registro, resolvendo homônimos
+    pela UF informada e pela população. Com `somente_uf`, expõe apenas os
+    nomes que existem naquela UF.
+    """
+
+    def __init__(
+        self,
+        registro: RegistroCidades,
+        uf: Optional[str] = None,
+        somente_uf: bool = False,
+    ) -> None:
+        self.registro = registro
+        self.uf = uf
+        self.somente_uf = somente_uf and uf is not None
+
+    def resolver(self, nome_norm: str) -> Optional[int]:
+        return self.registro.resolver(nome_norm, self.uf, self.somente_uf)
+
+    def __getitem__(self, nome_norm: str) -> Dict[str, Any]:
+        i = self.resolver(nome_norm)
+        if i is None:
+            raise KeyError(nome_norm)
+        return self.registro.cidade(i)
+
+    def __contains__(self, nome_norm: object) -> bool:
+        return isinstance(nome_norm, str) and self.resolver(nome_norm) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for nome in self.registro.nomes_normalizados:
+            if not self.somente_uf or self.resolver(nome) is not None:
+                yield nome
+
+    def __len__(self) -> int:
+        if not self.somente_uf:
+            return len(self.registro.nomes_normalizados)
+        return sum(1 for _ in self)
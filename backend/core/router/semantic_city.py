@@ -2,132 +2,162 @@
 from __future__ import annotations
 
 import re
+
 import numpy as np
-from typing import Any, Dict, List, Tuple, cast
-from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 from rapidfuzz import process, fuzz
-from sentence_transformers import SentenceTransformer
-from sqlalchemy import text
 
-from database.connection import get_engine
-from utils.geo import detectar_uf
+from utils.aho_corasick import Ocorrencia
+from utils.geo import MencaoUF
 from utils.logger import get_logger
+from utils.model_provider import modelo_cidades
 from utils.parser import normalizar, extrair_cidades_explicitamente
-from config.config import PERFORMANCE_LEVEL, EMBEDDINGS_PATH
+from core.router.analise_pergunta import analisar_pergunta
+from core.router.indice_vetorial import IndiceVetorial
+from core.router.indices_cidades import (
+    IndicesCidades,
+    embeddings_prontos,
+    indices_cidades,
+)
+from core.router.registro_cidades import RegistroCidades, VisaoPorNome
 
 logger = get_logger(__name__)
 
-# Carregamento opcional do modelo de embeddings local
-modelo_local: SentenceTransformer | None = None
-if PERFORMANCE_LEVEL in ("auto", "turbo"):
-    try:
-        modelo_local = SentenceTransformer("BAAI/bge-small-en-v1.5")
-        logger.info("📌 Modelo de embedding local carregado com sucesso.")
-    except Exception as e:
-        logger.warning(f"⚠️ Erro ao carregar modelo local: {e}")
-        modelo_local = None
-
-
-@lru_cache(maxsize=1)
-def carregar_cidades() -> Dict[str, Dict[str, Any]]:
-    logger.info("📦 Carregando cidades do banco de dados via SQLAlchemy...")
-    engine = get_engine()
-    with engine.connect() as conn:
-        result = conn.execute(
-            text(
-                """
-                SELECT
-                  m.codigo_ibge,
-                  m.cidade,
-                  m.sigla_estado AS uf,
-                  e.nome         AS estado
-                FROM public.municipios m
-                JOIN public.estados e
-                  ON e.sigla = m.sigla_estado
-                """
-            )
-        )
-        linhas = result.fetchall()
+# Entre a cidade e a UF que a qualifica: "bom jesus, rs", "santa luzia na paraiba"
+_CONECTOR_UF = re.compile(
+    r"[\s,;(/-]*(?:(?:no|na|em)\s+)?(?:estado\s+(?:do|da|de)\s+)?"
+)
 
-    cidades: Dict[str, Dict[str, Any]] = {}
-    for codigo_ibge, cidade, uf, estado in linhas:
-        nome_norm = normalizar(cidade)
-        cidades[nome_norm] = {
-            "codigo_ibge": codigo_ibge,
-            "nome": cidade,
-            "uf": uf,
-            "estado": estado,
-        }
 
-    logger.info(f"✅ {len(cidades)} cidades carregadas e normalizadas.")
-    return cidades
+class _DeteccaoPendente(NamedTuple):
+    # Estado de uma pergunta que passou pelas etapas literal/fuzzy sem resolução
+    texto_norm: str
+    is_comparativa: bool
+    uf_filtro: Optional[str]
+    cidades_index: VisaoPorNome
+    cidades_encontradas: Set[str]
+    indices: IndicesCidades
 
 
-@lru_cache(maxsize=1)
-def carregar_embeddings_cidades() -> Tuple[List[str], np.ndarray]:
-    if not modelo_local:
-        return [], np.array([])
+def _qualificar_ocorrencias(
+    texto_norm: str,
+    ocorrencias: Sequence[Ocorrencia],
+    ufs: Sequence[MencaoUF],
+    registro: RegistroCidades,
+) -> Tuple[List[Tuple[Ocorrencia, Optional[str]]], List[MencaoUF]]:
+    """
+    Associa a cada cidade a UF escrita logo depois dela ("bom jesus rs",
+    "santa luzia na paraiba"), se o nome existir naquela UF. Cidades contidas
+    na menção qualificadora ("rio grande" em "rio grande do sul") saem da
+    lista, assim como menções de UF dentro de um nome de cidade mais longo
+    ("sao paulo" em "sao paulo do potengi").
+
+    Retorna as ocorrências com a UF de cada uma (ou None) e as menções de UF
+    válidas, em ordem no texto.
+    """
+    mencoes = [
+        m
+        for m in ufs
+        if not any(
+            oc.inicio <= m.inicio
+            and m.fim <= oc.fim
+            and oc.fim - oc.inicio > m.fim - m.inicio
+            for oc in ocorrencias
+        )
+    ]
 
-    if EMBEDDINGS_PATH.exists():
-        logger.info("📂 Embeddings de cidades carregados do disco.")
-        data = np.load(EMBEDDINGS_PATH, allow_pickle=True)
-        return data["nomes"].tolist(), data["embeddings"]
+    qualificadas: List[Tuple[Ocorrencia, Optional[str]]] = []
+    consumidas: List[MencaoUF] = []
+    for oc in ocorrencias:
+        if any(m.inicio <= oc.inicio and oc.fim <= m.fim for m in consumidas):
+            continue  # faz parte da UF da cidade anterior
+        uf = None
+        seguinte = next((m for m in mencoes if m.inicio >= oc.fim), None)
+        if (
+            seguinte is not None
+            and _CONECTOR_UF.fullmatch(texto_norm, oc.fim, seguinte.inicio)
+            and seguinte.uf in registro.ufs_do_nome(oc.chave)
+        ):
+            uf = seguinte.uf
+            consumidas.append(seguinte)
+        qualificadas.append((oc, uf))
+    return qualificadas, mencoes
 
-    logger.warning("⚠️ Embeddings não encontrados. Gerando on-the-fly.")
-    cidades_index = carregar_cidades()
-    nomes = list(cidades_index.keys())
-    emb = modelo_local.encode(nomes, normalize_embeddings=True)
 
-    EMBEDDINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    np.savez_compressed(EMBEDDINGS_PATH, nomes=nomes, embeddings=emb)
-    logger.info("💾 Embeddings salvos em cache local.")
-    return nomes, emb
+def _mascarar(texto_norm: str, mencoes: Sequence[MencaoUF]) -> str:
+    # Troca os trechos por espaços, preservando as posições do texto
+    for m in mencoes:
+        texto_norm = (
+            texto_norm[: m.inicio] + " " * (m.fim - m.inicio) + texto_norm[m.fim :]
+        )
+    return texto_norm
 
 
-def detectar_cidades(texto: str, max_cidades: int = 10) -> List[Dict[str, Any]]:
-    cidades_index = carregar_cidades()
-    texto_norm = normalizar(texto)
+def _detectar_sem_embeddings(
+    texto: str, max_cidades: int, indices: IndicesCidades
+) -> Union[List[Dict[str, Any]], _DeteccaoPendente]:
+    """
+    Etapas 1️⃣–5️⃣: retorna a lista final quando resolvida por match literal
+    ou parser; caso contrário, o estado pendente para a etapa de embeddings.
+    """
+    registro = indices.registro
+    # Normalização e varreduras de cidades/UFs compartilhadas com o interpretador
+    analise = analisar_pergunta(texto, indices)
+    texto_norm = analise.texto_norm
 
     # 1️⃣ Se for comparativa, usar apenas match literal para todas as cidades mencionadas
-    is_comparativa = any(
-        termo in texto.lower()
-        for termo in [
-            "compare",
-            "comparar",
-            "versus",
-            " vs ",
-            " x ",
-            ",",
-            " e ",
-            " ou ",
-        ]
+    is_comparativa = analise.comparativa
+    ocorrencias, mencoes_uf = _qualificar_ocorrencias(
+        texto_norm, analise.cidades, analise.ufs, registro
     )
-    if is_comparativa:
-        literal_matches = []
-        for nome_norm, cid in cidades_index.items():
-            if re.search(rf"\b{re.escape(nome_norm)}\b", texto_norm):
-                literal_matches.append(cid)
-        if literal_matches:
-            normals = [normalizar(c["nome"]) for c in literal_matches]
-            filtered = []
-            for idx, cid in enumerate(literal_matches):
-                norm = normals[idx]
-                if any(other != norm and norm in other for other in normals):
-                    continue
+    # UF mencionada desempata homônimos (ex.: "bom jesus" no PI x RS)
+    uf_detectada = mencoes_uf[0].uf if mencoes_uf else None
+    cidades_index = registro.por_nome(uf=uf_detectada)
+
+    def resolver(oc: Ocorrencia, uf: Optional[str]) -> Dict[str, Any]:
+        # UF escrita junto da cidade tem precedência sobre a da pergunta
+        if uf is not None:
+            return registro.cidade(cast(int, registro.resolver(oc.chave, uf)))
+        return cidades_index[oc.chave]
+
+    if is_comparativa and ocorrencias:
+        filtered: List[Dict[str, Any]] = []
+        for oc, uf in ocorrencias:
+            cid = resolver(oc, uf)
+            if cid not in filtered:
                 filtered.append(cid)
-            nomes = [c["nome"] for c in filtered]
-            logger.debug(f"🔎 (Comparativa literal) Cidades extraídas: {nomes}")
-            return filtered
+        nomes = [c["nome"] for c in filtered]
+        logger.debug(f"🔎 (Comparativa literal) Cidades extraídas: {nomes}")
+        return filtered
 
-    # 2️⃣ Match literal exato para 1 única cidade
-    for nome_norm in sorted(cidades_index.keys(), key=len, reverse=True):
-        if re.search(rf"\b{re.escape(nome_norm)}\b", texto_norm):
-            cid = cidades_index[nome_norm]
-            logger.debug(f"🔎 Match literal único: {cid['nome']}")
-            return [cid]
+    # 2️⃣ Match literal exato para 1 única cidade (a mais longa encontrada)
+    if ocorrencias:
+        maior, uf = max(ocorrencias, key=lambda par: par[0].fim - par[0].inicio)
+        cid = resolver(maior, uf)
+        logger.debug(f"🔎 Match literal único: {cid['nome']}")
+        return [cid]
 
     # 3️⃣ Extração explícita via parser (fallback para singular)
-    cidades_exp = extrair_cidades_explicitamente(texto_norm, cidades_index, max_cidades)
+    # Etapas aproximadas não olham para os nomes de estado ("piaui" ≠ "Piau")
+    texto_sem_uf = _mascarar(texto_norm, mencoes_uf)
+    cidades_exp = extrair_cidades_explicitamente(
+        texto_sem_uf,
+        cidades_index,
+        max_cidades,
+        automato=indices.automato,
+        indice=indices.trigramas,
+    )
     if cidades_exp:
         cidades_ordenadas = sorted(
             cidades_exp, key=lambda c: len(normalizar(c["nome"])), reverse=True
@@ -137,63 +167,137 @@ def detectar_cidades(texto: str, max_cidades: int = 10) -> List[Dict[str, Any]]:
         return cast(List[Dict[str, Any]], cidades_ordenadas[:max_cidades])
 
     # 4️⃣ Filtragem por estado, se não comparativa
-    uf_detectada = detectar_uf(texto_norm)
-    if uf_detectada and not is_comparativa:
+    uf_filtro = uf_detectada if uf_detectada and not is_comparativa else None
+    if uf_filtro:
         logger.debug(f"🌎 UF detectada: {uf_detectada}")
-        cidades_index = cast(
-            Dict[str, Dict[str, Any]],
-            {
-                nome: cid
-                for nome, cid in cidades_index.items()
-                if cid["uf"].lower() == uf_detectada.lower()
-            },
-        )
+        cidades_index = registro.por_nome(uf=uf_filtro, somente_uf=True)
 
-    # 5️⃣ Fuzzy matching
-    nomes_norm = list(cidades_index.keys())
+    # 5️⃣ Fuzzy matching sobre os candidatos pré-selecionados por trigramas
+    nomes_norm = indices.trigramas.candidatos(texto_sem_uf, uf=uf_filtro)
     matches = process.extract(
-        texto_norm, nomes_norm, scorer=fuzz.token_sort_ratio, limit=max_cidades * 2
+        texto_sem_uf, nomes_norm, scorer=fuzz.token_sort_ratio, limit=max_cidades * 2
     )
     fuzzy = {nome for nome, score, _ in matches if score >= 85}
-    cidades_encontradas = set(fuzzy)
+    return _DeteccaoPendente(
+        texto_norm, is_comparativa, uf_filtro, cidades_index, set(fuzzy), indices
+    )
+
+
+def _indice_para(pendente: _DeteccaoPendente) -> IndiceVetorial:
+    vetorial = pendente.indices.vetorial
+    if vetorial is None:
+        raise RuntimeError("Embeddings de cidades ainda não carregados.")
+    if pendente.uf_filtro:
+        return pendente.indices.indice_uf(pendente.uf_filtro)
+    return vetorial.indice
+
+
+def _finalizar_deteccao(
+    pendente: _DeteccaoPendente,
+    max_cidades: int,
+    ids: Optional[np.ndarray] = None,
+    scores: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Etapas 6️⃣–7️⃣: aplica o resultado da busca vetorial (se houver) e agrupa.
+    """
+    cidades_index = pendente.cidades_index
+    cidades_encontradas = set(pendente.cidades_encontradas)
 
     # 6️⃣ Embeddings local (se disponível)
+    vetorial = pendente.indices.vetorial
+    if ids is not None and scores is not None and vetorial is not None:
+        nomes_cached = vetorial.nomes
+        threshold = 0.45 if pendente.is_comparativa else 0.7
+        for idx, score in zip(ids, scores):
+            if score < threshold:
+                continue
+            nn = nomes_cached[idx]
+            if nn in cidades_index:
+                cidades_encontradas.add(nn)
+
+    # 7️⃣ Agrupamento final por id, evitando duplicatas (homônimos resolvidos)
+    ids_cidades = [
+        i
+        for i in map(cidades_index.resolver, sorted(cidades_encontradas))
+        if i is not None
+    ]
+    if not ids_cidades:
+        logger.warning("⚠️ Nenhuma cidade foi detectada.")
+        return []
+
+    cidades_final = cidades_index.registro.agrupar(ids_cidades, max_cidades)
+    logger.debug(f"🏙️ {len(cidades_final)} cidades finais detectadas.")
+    return cidades_final
+
+
+def detectar_cidades(texto: str, max_cidades: int = 10) -> List[Dict[str, Any]]:
+    indices = indices_cidades()
+    etapa = _detectar_sem_embeddings(texto, max_cidades, indices)
+    if isinstance(etapa, list):
+        return etapa
+
+    ids = scores = None
+    modelo_local = modelo_cidades.obter() if embeddings_prontos(indices) else None
     if modelo_local:
         try:
-            texto_emb = modelo_local.encode(texto_norm, normalize_embeddings=True)
-            nomes_cached, emb_cidades = carregar_embeddings_cidades()
-            scores = np.dot(emb_cidades, texto_emb)
-            threshold = 0.45 if is_comparativa else 0.7
-            for idx in np.argsort(scores)[::-1][: max_cidades * 2]:
-                nn = nomes_cached[idx]
-                if scores[idx] >= threshold and nn in cidades_index:
-                    cidades_encontradas.add(nn)
+            texto_emb = modelo_local.encode(etapa.texto_norm, normalize_embeddings=True)
+            ids, scores = _indice_para(etapa).buscar(texto_emb, max_cidades * 2)
         except Exception as e:
             logger.warning(f"⚠️ Erro embeddings locais: {e}")
+            ids = scores = None
 
-    if not cidades_encontradas:
-        logger.warning("⚠️ Nenhuma cidade foi detectada.")
-        return []
+    return _finalizar_deteccao(etapa, max_cidades, ids, scores)
 
-    # 7️⃣ Agrupamento final, evitando duplicatas
-    agrupadas: Dict[str, Dict[str, Any]] = {}
-    for nome_norm in cidades_encontradas:
-        if nome_norm not in cidades_index:
-            continue
-        cid = cidades_index[nome_norm]
-        chave = normalizar(cid["nome"])
-        pop = cid.get("populacao_total", 0)
-        if chave not in agrupadas or pop > agrupadas[chave].get("populacao", 0):
-            agrupadas[chave] = cid
-
-    cidades_final: List[Dict[str, Any]] = []
-    seen = set()
-    for cid in agrupadas.values():
-        if cid["codigo_ibge"] not in seen:
-            seen.add(cid["codigo_ibge"])
-            cidades_final.append(cid)
-        if len(cidades_final) >= max_cidades:
-            break
 
-    logger.debug(f"🏙️ {len(cidades_final)} cidades finais detectadas.")
-    return cidades_final
+def detectar_cidades_batch(
+    textos: Sequence[str], max_cidades: int = 10
+) -> List[List[Dict[str, Any]]]:
+    """
+    Versão em lote de `detectar_cidades`, com o mesmo resultado por pergunta.
+
+    As etapas literal/fuzzy rodam por texto; as perguntas não resolvidas são
+    codificadas em um único batch do modelo local e pontuadas com um produto
+    matriz-matriz por índice (global ou fatia da UF).
+    """
+    # um único snapshot para o lote inteiro
+    indices = indices_cidades()
+    etapas = [_detectar_sem_embeddings(texto, max_cidades, indices) for texto in textos]
+    pendentes = [
+        i for i, etapa in enumerate(etapas) if isinstance(etapa, _DeteccaoPendente)
+    ]
+
+    buscas: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    modelo_local = (
+        modelo_cidades.obter() if pendentes and embeddings_prontos(indices) else None
+    )
+    if modelo_local and pendentes:
+        try:
+            embs = modelo_local.encode(
+                [cast(_DeteccaoPendente, etapas[i]).texto_norm for i in pendentes],
+                normalize_embeddings=True,
+            )
+            # agrupa por UF para reaproveitar a mesma fatia do índice
+            grupos: Dict[Optional[str], List[int]] = {}
+            for pos, i in enumerate(pendentes):
+                uf = cast(_DeteccaoPendente, etapas[i]).uf_filtro
+                grupos.setdefault(uf, []).append(pos)
+            for posicoes in grupos.values():
+                pendente = cast(_DeteccaoPendente, etapas[pendentes[posicoes[0]]])
+                ids_lote, scores_lote = _indice_para(pendente).buscar_lote(
+                    embs[posicoes], max_cidades * 2
+                )
+                for linha, pos in enumerate(posicoes):
+                    buscas[pendentes[pos]] = (ids_lote[linha], scores_lote[linha])
+        except Exception as e:
+            logger.warning(f"⚠️ Erro embeddings locais (lote): {e}")
+            buscas = {}
+
+    resultados: List[List[Dict[str, Any]]] = []
+    for i, etapa in enumerate(etapas):
+        if isinstance(etapa, list):
+            resultados.append(etapa)
+            continue
+        ids, scores = buscas.get(i, (None, None))
+        resultados.append(_finalizar_deteccao(etapa, max_cidades, ids, scores))
+    return resultados
@@ -1,36 +1,102 @@
 # chatbot-llm/backend/core/router/semantic_metric.py
 from __future__ import annotations
 
-import re
 from functools import lru_cache
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
+from utils.aho_corasick import AutomatoAhoCorasick, Ocorrencia
 from utils.logger import get_logger
+from utils.parser import normalizar
 from config.dicionarios import METRICAS_VALIDAS, HEURISTICAS
 
 logger = get_logger(__name__)
 
 
-def aplicar_heuristica(pergunta: str) -> Optional[Tuple[str, str]]:
-    """
-    Verifica termos-chave em HEURISTICAS para identificar coluna e label.
-    """
-    pergunta_lower = pergunta.lower()
+class MetricaDetectada(NamedTuple):
+    coluna: str
+    label: str
+    termo: str  # termo normalizado que casou
+    inicio: int  # posições no texto normalizado
+    fim: int
+
+
+def _compilar_heuristicas() -> Tuple[AutomatoAhoCorasick, Dict[str, str]]:
+    # Termos normalizados → coluna; variações com/sem acento colapsam
+    colunas: Dict[str, str] = {}
     for termo, coluna in HEURISTICAS.items():
-        if termo in pergunta_lower:
-            label = METRICAS_VALIDAS.get(coluna, coluna)
-            logger.info(f"⚙️ Métrica classificada via heurística: {coluna} ({label})")
-            return coluna, label
-    return None
+        colunas.setdefault(normalizar(termo), coluna)
+    automato = AutomatoAhoCorasick()
+    for termo in colunas:
+        # prefixo: plurais e flexões ("bibliotecas", "quadras") também casam
+        automato.adicionar(termo, prefixo=True)
+    automato.construir()
+    return automato, colunas
+
+
+_automato_metricas, COLUNA_POR_TERMO = _compilar_heuristicas()
+
+
+def metricas_das_ocorrencias(
+    ocorrencias: Iterable[Ocorrencia],
+) -> Tuple[MetricaDetectada, ...]:
+    """Métricas a partir de ocorrências já sem sobreposição, em ordem no texto."""
+    metricas: List[MetricaDetectada] = []
+    vistas = set()
+    for oc in ocorrencias:
+        coluna = COLUNA_POR_TERMO[oc.chave]
+        if coluna in vistas:
+            continue
+        vistas.add(coluna)
+        label = METRICAS_VALIDAS.get(coluna, coluna)
+        metricas.append(MetricaDetectada(coluna, label, oc.chave, oc.inicio, oc.fim))
+    return tuple(metricas)
 
 
 @lru_cache(maxsize=1000)
-def classificar_metrica(pergunta: str) -> Tuple[str, str]:
+def _metricas_do_texto(texto_norm: str) -> Tuple[MetricaDetectada, ...]:
+    # ocorrências sem sobreposição, a mais longa vence, em ordem no texto
+    return metricas_das_ocorrencias(_automato_metricas.buscar(texto_norm))
+
+
+def extrair_metricas(pergunta: str) -> List[MetricaDetectada]:
+    """
+    Todas as métricas mencionadas na pergunta, na ordem em que aparecem,
+    sem repetição de coluna. Termos sobrepostos resolvem pelo mais longo
+    ("população total" em vez de "população"). Cache pelo texto normalizado.
+    """
+    return list(_metricas_do_texto(normalizar(pergunta or "")))
+
+
+def aplicar_heuristica(
+    pergunta: str, metricas: Optional[Sequence[MetricaDetectada]] = None
+) -> Optional[Tuple[str, str]]:
+    """
+    Métrica principal da pergunta: a primeira mencionada, preferindo
+    colunas de valor às de ano de referência (`ano_*`). Aceita as métricas
+    já extraídas (ex.: de `AnalisePergunta`) para evitar nova varredura.
+    """
+    if metricas is None:
+        metricas = extrair_metricas(pergunta)
+    if not metricas:
+        return None
+    principal = next(
+        (m for m in metricas if not m.coluna.startswith("ano_")), metricas[0]
+    )
+    logger.info(
+        f"⚙️ Métrica classificada via heurística: {principal.coluna} "
+        f"({principal.label})"
+    )
+    return principal.coluna, principal.label
+
+
+def classificar_metrica(
+    pergunta: str, metricas: Optional[Sequence[MetricaDetectada]] = None
+) -> Tuple[str, str]:
     """
     Classifica a métrica com base em heurísticas definidas.
     Se nada for encontrado, retorna 'populacao_total' por padrão.
     """
-    heuristica = aplicar_heuristica(pergunta)
+    heuristica = aplicar_heuristica(pergunta, metricas)
     if heuristica:
         return heuristica
 
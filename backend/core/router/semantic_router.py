@@ -2,9 +2,21 @@
 from __future__ import annotations
 
 import re
-from typing import List, Optional, cast
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from utils.aho_corasick import AutomatoAhoCorasick, Ocorrencia
 from utils.logger import get_logger
-from config.dicionarios import THEME_KEYWORDS
+from utils.parser import normalizar
+from config.dicionarios import PRIORIDADE_TEMAS, THEME_KEYWORDS
 
 logger = get_logger(__name__)
 
@@ -22,30 +34,218 @@ PALAVRAS_INSTITUCIONAL = [
     "concessão",
 ]
 
+# Temas que vencem sempre que aparecem, independentemente do score
+TEMAS_FORCADOS = ("institucional",)
+
+# `\btermo\b` gerado com re.escape → termo literal
+_PADRAO_LITERAL = re.compile(r"^\\b(.+)\\b$")
+
+
+class OcorrenciaTema(NamedTuple):
+    tema: str
+    termo: str
+    inicio: int  # posições no texto normalizado
+    fim: int
+    peso: float
+
+
+class ResultadoTema(NamedTuple):
+    tema: Optional[str]
+    score: float
+    scores: Dict[str, float]
+    ocorrencias: List[OcorrenciaTema]
+
+
+def padrao_literal(padrao: str) -> Optional[str]:
+    """Termo literal de um padrão regex simples ("compare" entre fronteiras) ou None."""
+    m = _PADRAO_LITERAL.match(padrao)
+    if not m:
+        return None
+    termo = re.sub(r"\\(.)", r"\1", m.group(1))
+    return termo if re.escape(termo) == m.group(1) else None
+
+
+def _peso(termo: str) -> float:
+    # Especificidade: termos com mais palavras pesam mais
+    return float(len(termo.split()))
+
+
+class MatcherTemas:
+    """
+    Vocabulário de temas compilado uma única vez.
+
+    Termos literais vão para um automato Aho-Corasick (uma passada por
+    pergunta, com custo que não cresce com o vocabulário); padrões que não
+    são literais viram uma única regex com grupos nomeados. O texto e os
+    termos são comparados já normalizados (minúsculas, sem acentos).
+    """
+
+    def __init__(
+        self,
+        padroes: Mapping[str, Iterable[str]],
+        prefixos: Optional[Mapping[str, Iterable[str]]] = None,
+        prioridade: Optional[Mapping[str, int]] = None,
+        forcados: Iterable[str] = (),
+    ) -> None:
+        self.prioridade = dict(prioridade or {})
+        self.forcados = tuple(forcados)
+        self._temas_por_termo: Dict[str, List[str]] = {}
+        self._prefixo: Dict[str, bool] = {}
+        self.automato = AutomatoAhoCorasick()
+        regex: Dict[str, str] = {}
+        grupos: Dict[str, str] = {}
+
+        def cadastrar(tema: str, termo: str, prefixo: bool) -> None:
+            termo = normalizar(termo)
+            temas = self._temas_por_termo.setdefault(termo, [])
+            if not temas:
+                self.automato.adicionar(termo, prefixo=prefixo)
+                self._prefixo[termo] = prefixo
+            if tema not in temas:
+                temas.append(tema)
+
+        for tema, lista in padroes.items():
+            for padrao in lista:
+                termo = padrao_literal(padrao)
+                if termo is not None:
+                    cadastrar(tema, termo, prefixo=False)
+                else:
+                    grupo = f"p{len(regex)}"
+                    regex[grupo] = padrao
+                    grupos[grupo] = tema
+        for tema, lista in (prefixos or {}).items():
+            for termo in lista:
+                cadastrar(tema, termo, prefixo=True)
+
+        self.automato.construir()
+        self._regex = (
+            re.compile("|".join(f"(?P<{g}>{p})" for g, p in regex.items()))
+            if regex
+            else None
+        )
+        self._tema_grupo = grupos
+
+    def __len__(self) -> int:
+        return len(self._temas_por_termo) + len(self._tema_grupo)
+
+    def termos(self) -> Iterator[Tuple[str, List[str], bool]]:
+        """(termo normalizado, temas, casa como prefixo) de cada termo literal."""
+        for termo, temas in self._temas_por_termo.items():
+            yield termo, temas, self._prefixo[termo]
+
+    def ocorrencias_de(self, ocorrencias: Iterable[Ocorrencia]) -> List[OcorrenciaTema]:
+        # Uma ocorrência literal vira um acerto por tema que declara o termo
+        return [
+            OcorrenciaTema(tema, oc.chave, oc.inicio, oc.fim, _peso(oc.chave))
+            for oc in ocorrencias
+            for tema in self._temas_por_termo[oc.chave]
+        ]
+
+    def ocorrencias_regex(self, texto_norm: str) -> List[OcorrenciaTema]:
+        """Acertos dos padrões não literais (regex única), se houver."""
+        if self._regex is None:
+            return []
+        encontradas: List[OcorrenciaTema] = []
+        for m in self._regex.finditer(texto_norm):
+            grupo = m.lastgroup or ""
+            encontradas.append(
+                OcorrenciaTema(
+                    self._tema_grupo[grupo],
+                    m.group(),
+                    m.start(),
+                    m.end(),
+                    _peso(m.group()),
+                )
+            )
+        return encontradas
+
+    def ocorrencias(self, texto: str) -> List[OcorrenciaTema]:
+        """Todos os acertos de todos os temas, com span e peso."""
+        texto_norm = normalizar(texto)
+        literais = self.automato.buscar(texto_norm, manter_sobrepostas=True)
+        return self.ocorrencias_de(literais) + self.ocorrencias_regex(texto_norm)
+
+    def pontuar(self, texto: str) -> ResultadoTema:
+        return self.pontuar_ocorrencias(self.ocorrencias(texto))
+
+    def pontuar_ocorrencias(self, ocorrencias: List[OcorrenciaTema]) -> ResultadoTema:
+        """
+        Score por tema = soma dos pesos dos acertos, descontando termos
+        contidos em outro acerto do mesmo tema ("escolas de educação
+        infantil" dentro de "total de escolas de educação infantil").
+        Empates: acerto mais longo (especificidade) e depois a prioridade.
+        """
+        scores: Dict[str, float] = {}
+        maior_trecho: Dict[str, int] = {}
+        for oc in ocorrencias:
+            contida = any(
+                outra.tema == oc.tema
+                and outra.inicio <= oc.inicio
+                and oc.fim <= outra.fim
+                and (outra.fim - outra.inicio) > (oc.fim - oc.inicio)
+                for outra in ocorrencias
+            )
+            if contida:
+                continue
+            scores[oc.tema] = scores.get(oc.tema, 0.0) + oc.peso
+            maior_trecho[oc.tema] = max(
+                maior_trecho.get(oc.tema, 0), oc.fim - oc.inicio
+            )
+
+        if not scores:
+            return ResultadoTema(None, 0.0, scores, ocorrencias)
+
+        def chave(tema: str) -> Tuple[bool, float, int, int]:
+            return (
+                tema in self.forcados,
+                scores[tema],
+                maior_trecho[tema],
+                self.prioridade.get(tema, 0),
+            )
+
+        vencedor = max(scores, key=chave)
+        return ResultadoTema(vencedor, scores[vencedor], scores, ocorrencias)
+
+
+# Compilado uma vez no import; 'comparative' é tratado no interpretador
+matcher_temas = MatcherTemas(
+    {tema: pats for tema, pats in THEME_KEYWORDS.items() if tema != "comparative"},
+    prefixos={"institucional": PALAVRAS_INSTITUCIONAL},
+    prioridade=PRIORIDADE_TEMAS,
+    forcados=TEMAS_FORCADOS,
+)
+
+
+def pontuar_temas(pergunta: str) -> ResultadoTema:
+    """Resultado completo da classificação: vencedor, scores e acertos."""
+    return matcher_temas.pontuar(pergunta or "")
+
 
-def classificar_tema(pergunta: str) -> Optional[str]:
+def classificar_tema(
+    pergunta: str, resultado: Optional[ResultadoTema] = None
+) -> Optional[str]:
     """
     Classifica a pergunta em um dos temas definidos pelo projeto.
     - Se tiver alguma palavra de Houer, retorna 'institucional'.
-    - Se bater em algum tema de THEME_KEYWORDS, retorna esse tema.
+    - Senão, o tema de THEME_KEYWORDS com maior score (ver `MatcherTemas`).
     - Caso contrário, retorna None (nenhum tema).
+    Aceita o resultado já pontuado (ex.: de `AnalisePergunta`).
     """
-    texto = pergunta or ""
-    lower = texto.lower()
+    if resultado is None:
+        resultado = pontuar_temas(pergunta)
 
     # 0️⃣ Se for algo institucional sobre Houer, força 'institucional'
-    if any(palavra in lower for palavra in PALAVRAS_INSTITUCIONAL):
-        logger.info("🔵 Tema classificado manualmente como 'institucional'")
-        return "institucional"
+    if resultado.tema in TEMAS_FORCADOS:
+        logger.info(f"🔵 Tema classificado manualmente como '{resultado.tema}'")
+        return resultado.tema
 
     # 1️⃣ Classificação por palavras-chave para os demais temas
-    for tema, patterns in THEME_KEYWORDS.items():
-        if tema == "comparative":
-            continue  # comparativo tratado em outro módulo
-        for pat in patterns:
-            if re.search(pat, lower):
-                logger.info(f"⚙️ Tema classificado via regra: {tema}")
-                return cast(str, tema)
+    if resultado.tema is not None:
+        logger.info(
+            f"⚙️ Tema classificado via regra: {resultado.tema} "
+            f"(score {resultado.score:g}; {resultado.scores})"
+        )
+        return resultado.tema
 
     # 2️⃣ Sem match: retorna None - podendo escalar para fallback do llm ---> ele escolher o tema
     logger.info(
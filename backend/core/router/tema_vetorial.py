@@ -0,0 +1,118 @@
+# chatbot-llm/backend/core/router/tema_vetorial.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from config.config import TEMA_VETORIAL_LIMIAR, TEMA_VETORIAL_MARGEM
+from config.dicionarios import EXEMPLOS_TEMAS
+from core.router.semantic_router import matcher_temas
+from utils.logger import get_logger
+from utils.model_provider import RecursoSobDemanda, modelo_cidades, registrar_recurso
+from utils.parser import normalizar
+
+logger = get_logger(__name__)
+
+
+class PredicaoTema(NamedTuple):
+    tema: Optional[str]  # None quando abaixo do limiar ou da margem
+    score: float
+    scores: Dict[str, float]
+
+
+def textos_por_tema(
+    exemplos: Mapping[str, Sequence[str]] = EXEMPLOS_TEMAS,
+) -> Dict[str, List[str]]:
+    """Vocabulário de cada tema (o mesmo das regras) + perguntas rotuladas."""
+    textos: Dict[str, List[str]] = {}
+    for termo, temas, _ in matcher_temas.termos():
+        for tema in temas:
+            textos.setdefault(tema, []).append(termo)
+    for tema, perguntas in exemplos.items():
+        textos.setdefault(tema, []).extend(normalizar(p) for p in perguntas)
+    return textos
+
+
+class ClassificadorTemasVetorial:
+    """
+    Um centroide (média normalizada dos embeddings) por tema, calculado uma
+    vez com o modelo local. Classificar é um produto matriz × vetor sobre
+    poucos temas; o custo dominante é codificar a pergunta.
+    """
+
+    def __init__(
+        self,
+        modelo: Any,
+        textos: Mapping[str, Sequence[str]],
+        limiar: float = TEMA_VETORIAL_LIMIAR,
+        margem: float = TEMA_VETORIAL_MARGEM,
+    ) -> None:
+        self.modelo = modelo
+        self.limiar = limiar
+        self.margem = margem
+        self.temas = sorted(tema for tema, lista in textos.items() if lista)
+        centroides = []
+        for tema in self.temas:
+            embs = np.asarray(
+                modelo.encode(list(textos[tema]), normalize_embeddings=True),
+                dtype=np.float32,
+            )
+            centro = embs.mean(axis=0)
+            centroides.append(centro / max(float(np.linalg.norm(centro)), 1e-12))
+        self.centroides = np.vstack(centroides).astype(np.float32)
+
+    def classificar_embedding(self, embedding: np.ndarray) -> PredicaoTema:
+        sims = self.centroides @ np.asarray(embedding, dtype=np.float32)
+        scores = {tema: round(float(s), 4) for tema, s in zip(self.temas, sims)}
+        ordem = np.argsort(-sims)
+        melhor = float(sims[ordem[0]])
+        segundo = float(sims[ordem[1]]) if len(ordem) > 1 else -1.0
+        if melhor < self.limiar or melhor - segundo < self.margem:
+            return PredicaoTema(None, melhor, scores)
+        return PredicaoTema(self.temas[int(ordem[0])], melhor, scores)
+
+    def classificar(self, texto_norm: str) -> PredicaoTema:
+        embedding = self.modelo.encode(texto_norm, normalize_embeddings=True)
+        return self.classificar_embedding(embedding)
+
+
+def _criar_classificador() -> Optional[ClassificadorTemasVetorial]:
+    # Reaproveita o modelo local da detecção de cidades; sem ele, desativado
+    modelo_local = modelo_cidades.obter(bloquear=True)
+    if modelo_local is None:
+        return None
+    return ClassificadorTemasVetorial(modelo_local, textos_por_tema())
+
+
+classificador_temas: RecursoSobDemanda[ClassificadorTemasVetorial] = RecursoSobDemanda(
+    "centroides_temas", _criar_classificador
+)
+registrar_recurso(classificador_temas)
+
+
+def classificar_tema_vetorial(
+    pergunta: str, texto_norm: Optional[str] = None
+) -> Optional[str]:
+    """
+    Fallback local de `classificar_tema`: tema do centroide mais próximo,
+    se a similaridade passar do limiar com margem sobre o segundo colocado.
+    Não bloqueia: enquanto o modelo não está pronto, retorna None.
+    """
+    classificador = classificador_temas.obter()
+    if classificador is None:
+        logger.info("⚠️ Centroides de tema indisponíveis; sem fallback vetorial.")
+        return None
+
+    predicao = classificador.classificar(texto_norm or normalizar(pergunta))
+    if predicao.tema is None:
+        logger.info(
+            f"⚠️ Centroides de tema sem confiança (score {predicao.score:.3f}; "
+            f"{predicao.scores})"
+        )
+        return None
+    logger.info(
+        f"🧭 Tema classificado via centroides: {predicao.tema} "
+        f"(score {predicao.score:.3f})"
+    )
+    return predicao.tema
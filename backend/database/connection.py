@@ -3,18 +3,21 @@ from __future__ import annotations
 
 import time
 import traceback
-from typing import Optional
+from typing import Any, Dict, Optional
 
-from sqlalchemy import create_engine, text
+import pandas as pd
+from sqlalchemy import TextClause, create_engine, make_url, text
 from sqlalchemy.engine import Engine, Connection
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
-from config.config import DATABASE_URL
+from config.config import DATABASE_URL, DB_POOL_SIZE, DB_POOL_TIMEOUT_SECONDS
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 _engine: Optional[Engine] = None
+_engine_async: Optional[AsyncEngine] = None
 
 
 def get_engine() -> Engine:
@@ -50,3 +53,43 @@ def get_connection() -> Connection:
         tb = traceback.format_exc()
         logger.critical(f"❌ Erro ao obter conexão: {e}\n{tb}")
         raise RuntimeError("Erro ao obter conexão SQLAlchemy.")
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Engine assíncrono (psycopg 3) para o caminho async. O pool sem overflow
+    limita as consultas simultâneas do worker: excedentes aguardam conexão.
+    """
+    global _engine_async
+    if _engine_async is None:
+        url = make_url(DATABASE_URL)
+        if url.drivername in ("postgresql", "postgres", "postgresql+psycopg2"):
+            url = url.set(drivername="postgresql+psycopg")
+        _engine_async = create_async_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=0,
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+            pool_pre_ping=True,
+            echo=False,
+        )
+        logger.info(f"✅ Engine SQLAlchemy assíncrono criado (pool: {DB_POOL_SIZE}).")
+    return _engine_async
+
+
+async def consultar_df(
+    query: TextClause, params: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    # Equivalente assíncrono de pd.read_sql(query, con=get_engine(), params=...)
+    async with get_async_engine().connect() as conn:
+        resultado = await conn.execute(query, params or {})
+        return pd.DataFrame.from_records(
+            resultado.fetchall(), columns=list(resultado.keys()), coerce_float=True
+        )
+
+
+async def fechar_async_engine() -> None:
+    global _engine_async
+    if _engine_async is not None:
+        await _engine_async.dispose()
+        _engine_async = None
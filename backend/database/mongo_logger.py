@@ -1,10 +1,12 @@
 # chatbot-llm/backend/database/mongo_logger.py
 import os
-from typing import List
+from typing import Any, Dict, List, Optional
 
-from pymongo import MongoClient, errors
+from pymongo import AsyncMongoClient, MongoClient, errors
+from pymongo.asynchronous.collection import AsyncCollection
 from datetime import datetime
 
+from config.config import MONGO_MAX_POOL_SIZE
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,19 +15,33 @@ MONGO_URL = os.getenv("MONGO_URL", "mongodb://mongo:27017/")
 client = MongoClient(MONGO_URL)
 collection = client.chatbot_logs.messages
 
+# Cliente assíncrono criado sob demanda, já dentro do event loop
+_client_async: Optional[AsyncMongoClient[Dict[str, Any]]] = None
 
-def log_interacao(
+
+def colecao_async() -> AsyncCollection[Dict[str, Any]]:
+    global _client_async
+    if _client_async is None:
+        _client_async = AsyncMongoClient(MONGO_URL, maxPoolSize=MONGO_MAX_POOL_SIZE)
+    return _client_async.chatbot_logs.messages
+
+
+async def fechar_client_async() -> None:
+    global _client_async
+    if _client_async is not None:
+        await _client_async.close()
+        _client_async = None
+
+
+def _documento(
     session_id: str,
     user_input: str,
     resposta: str,
     agente: str,
     cidades: List[str],
     tema: str,
-) -> None:
-    """
-    Registra uma interação completa no MongoDB com segurança.
-    """
-    doc = {
+) -> Dict[str, Any]:
+    return {
         "timestamp": datetime.utcnow(),
         "session_id": session_id,
         "pergunta": user_input,
@@ -35,8 +51,42 @@ def log_interacao(
         "cidades": cidades or [],
     }
 
+
+def log_interacao(
+    session_id: str,
+    user_input: str,
+    resposta: str,
+    agente: str,
+    cidades: List[str],
+    tema: str,
+) -> None:
+    """
+    Registra uma interação completa no MongoDB com segurança.
+    """
+    doc = _documento(session_id, user_input, resposta, agente, cidades, tema)
+
     try:
         collection.insert_one(doc)
         logger.debug(f"🗃️ Interação registrada no MongoDB | Sessão: {session_id}")
     except errors.PyMongoError as e:
         logger.error(f"❌ Erro ao salvar log no MongoDB: {e}")
+
+
+async def log_interacao_async(
+    session_id: str,
+    user_input: str,
+    resposta: str,
+    agente: str,
+    cidades: List[str],
+    tema: str,
+) -> None:
+    """
+    Versão assíncrona de `log_interacao` (não ocupa thread durante o insert).
+    """
+    doc = _documento(session_id, user_input, resposta, agente, cidades, tema)
+
+    try:
+        await colecao_async().insert_one(doc)
+        logger.debug(f"🗃️ Interação registrada no MongoDB | Sessão: {session_id}")
+    except errors.PyMongoError as e:
+        logger.error(f"❌ Erro ao salvar log no MongoDB: {e}")
@@ -0,0 +1,33 @@
+# chatbot-llm/backend/database/versao_dados.py
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import text
+
+from database.connection import get_engine
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_avisado = False
+
+
+def consultar_versao_dados(conjunto: str = "municipios") -> Optional[int]:
+    """
+    Lê a marca d'água gravada pelo ETL em `public.versao_dados`.
+    Retorna None se a tabela/linha não existir ou o banco estiver indisponível.
+    """
+    global _avisado
+    try:
+        with get_engine().connect() as conn:
+            versao = conn.execute(
+                text("SELECT versao FROM public.versao_dados WHERE conjunto = :c"),
+                {"c": conjunto},
+            ).scalar()
+        return int(versao) if versao is not None else None
+    except Exception as e:
+        if not _avisado:
+            logger.warning(f"⚠️ Versão dos dados indisponível ({conjunto}): {e}")
+            _avisado = True
+        return None
@@ -1,28 +1,41 @@
 # chatbot-llm/backend/main.py
 from __future__ import annotations
-from typing import Any, Dict, List, Callable, Awaitable
+import json
+from typing import Any, Dict, List, Callable, Awaitable, Iterator
 
 from fastapi import FastAPI, Request, Body
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.responses import Response
 from pydantic import BaseModel
 
 from config.ngrok import get_ngrok_origin
-from core.handlers.chat_handler import processar_pergunta
-from core.handlers.session_handler import get_history_for_session
+from core.handlers.chat_handler import (
+    processar_pergunta_async,
+    processar_pergunta_stream,
+)
+from core.engine import chamadas_llm
+from core.resposta_direta import resposta_direta
+from core.handlers.session_handler import (
+    get_history_for_session,
+    get_history_for_session_async,
+)
+from database.connection import fechar_async_engine
+from database.mongo_logger import fechar_client_async
+from core.router.cache_rotas import cache_rotas
+from utils.cache_llm import obter_cache_llm
+from utils.cache_semantico import cache_semantico
 from utils.logger import get_logger
 from utils.formatters import nome_agente_formatado
+from utils.model_provider import recursos_prontos, status_recursos
+from utils.telemetria_llm import telemetria_llm
 from utils.parser import extrair_nome_uf
-from startup.embed_initializer import inicializar_embeddings
+from startup.warmup import iniciar_aquecimento
 
 logger = get_logger(__name__)
 app = FastAPI(title="Chatbot PPPs API", version="1.0")
 
-# Inicia embeddings
-inicializar_embeddings()
-
 
 class ChatRequest(BaseModel):  # type: ignore[misc]
     pergunta: str
@@ -66,41 +79,125 @@ async def validation_exception_handler(
     return JSONResponse(status_code=422, content={"detail": exc.errors()})
 
 
+@app.on_event("startup")  # type: ignore[misc]
+def aquecer_recursos() -> None:
+    # Modelo, embeddings e Pinecone carregam em background; o servidor já responde
+    iniciar_aquecimento()
+
+
+@app.on_event("shutdown")  # type: ignore[misc]
+async def fechar_conexoes() -> None:
+    # Pools assíncronos pertencem ao event loop do worker
+    await fechar_async_engine()
+    await fechar_client_async()
+
+
 @app.get("/health")  # type: ignore[misc]
 def health_check() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/health/ready")  # type: ignore[misc]
+def readiness_check() -> JSONResponse:
+    pronto = recursos_prontos()
+    return JSONResponse(
+        status_code=200 if pronto else 503,
+        content={"pronto": pronto, "recursos": status_recursos()},
+    )
+
+
+@app.get("/health/cache")  # type: ignore[misc]
+def cache_check() -> Dict[str, Any]:
+    return {
+        "rotas": cache_rotas.estatisticas(),
+        "llm": obter_cache_llm().estatisticas(),
+        "semantico": cache_semantico.estatisticas(),
+        "chamadas_llm": chamadas_llm.estatisticas(),
+        "resposta_direta": resposta_direta.estatisticas(),
+    }
+
+
+@app.get("/health/llm")  # type: ignore[misc]
+def llm_check() -> Dict[str, Any]:
+    return telemetria_llm.estatisticas()
+
+
 @app.post("/api/chat")  # type: ignore[misc]
-def chat_endpoint(req: ChatRequest = Body(...)) -> JSONResponse:
+async def chat_endpoint(req: ChatRequest = Body(...)) -> JSONResponse:
     logger.info(f"💬 Nova pergunta recebida | Sessão: {req.session_id}")
 
-    (
-        resposta,
-        fontes,
-        cidade_info,
-        tema,
-        agente,
-        dados,
-        chart_data,
-        csv_base64,
-        pdf_base64,
-    ) = processar_pergunta(req.pergunta, req.session_id)
-
-    cidade, uf = extrair_nome_uf(cidade_info)
+    resultado = await processar_pergunta_async(req.pergunta, req.session_id)
+    cidade, uf = extrair_nome_uf(resultado.cidade_info)
 
     return JSONResponse(
         {
-            "resposta": resposta,
-            "agente": nome_agente_formatado(agente),
-            "fontes": fontes,
+            "resposta": resultado.resposta,
+            "agente": nome_agente_formatado(resultado.agente),
+            "fontes": resultado.fontes,
             "cidade": cidade,
             "uf": uf,
-            "tema": tema,
-            "dados_brutos": dados,
-            "chart_data": chart_data,
-            "csv_base64": csv_base64,
-            "pdf_base64": pdf_base64,
-            "history": get_history_for_session(req.session_id),
+            "tema": resultado.tema,
+            "dados_brutos": resultado.dados,
+            "chart_data": resultado.chart_data,
+            "csv_base64": resultado.csv_base64,
+            "pdf_base64": resultado.pdf_base64,
+            "history": await get_history_for_session_async(req.session_id),
         }
     )
+
+
+def _evento_sse(evento: str, dados: Any) -> str:
+    corpo = json.dumps(dados, ensure_ascii=False, default=str)
+    return f"event: {evento}\ndata: {corpo}\n\n"
+
+
+@app.post("/api/chat/stream")  # type: ignore[misc]
+def chat_stream_endpoint(req: ChatRequest = Body(...)) -> StreamingResponse:
+    """
+    Mesma resposta de /api/chat via Server-Sent Events: `meta` com roteamento
+    e dados assim que ficam prontos, `token` a cada pedaço do texto e `fim`
+    com a resposta completa, anexos e histórico.
+    """
+    logger.info(f"📡 Nova pergunta recebida (stream) | Sessão: {req.session_id}")
+
+    def eventos() -> Iterator[str]:
+        for etapa, conteudo in processar_pergunta_stream(req.pergunta, req.session_id):
+            if etapa == "token":
+                yield _evento_sse("token", {"texto": conteudo})
+                continue
+
+            cidade, uf = extrair_nome_uf(conteudo.cidade_info)
+            if etapa == "inicio":
+                yield _evento_sse(
+                    "meta",
+                    {
+                        "agente": nome_agente_formatado(conteudo.agente),
+                        "fontes": conteudo.fontes,
+                        "cidade": cidade,
+                        "uf": uf,
+                        "tema": conteudo.tema,
+                        "dados_brutos": conteudo.dados,
+                        "chart_data": conteudo.chart_data,
+                    },
+                )
+            else:
+                yield _evento_sse(
+                    "fim",
+                    {
+                        "resposta": conteudo.resposta,
+                        "agente": nome_agente_formatado(conteudo.agente),
+                        "fontes": conteudo.fontes,
+                        "cidade": cidade,
+                        "uf": uf,
+                        "tema": conteudo.tema,
+                        "csv_base64": conteudo.csv_base64,
+                        "pdf_base64": conteudo.pdf_base64,
+                        "history": get_history_for_session(req.session_id),
+                    },
+                )
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
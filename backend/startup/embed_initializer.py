@@ -1,33 +1,68 @@
 # chatbot-llm/backend/startup/embed_initializer.py
-import os
 import numpy as np
 
-from sentence_transformers import SentenceTransformer
-
-from core.router.semantic_city import carregar_cidades
+from config.config import (
+    CITY_EMBEDDING_MODEL,
+    EMBEDDINGS_LEGACY_PATH,
+    EMBEDDINGS_PATH,
+    EMBEDDINGS_PRECISION,
+)
+from core.router.indices_cidades import carregar_cidades
+from utils.embedding_store import abrir_embeddings, salvar_embeddings
 from utils.logger import get_logger
+from utils.model_provider import modelo_cidades
 
 logger = get_logger(__name__)
 
-EMBEDDINGS_PATH = "data/embeddings_cidades.npz"
-MODEL_NAME = "BAAI/bge-small-en-v1.5"
-
 
 def inicializar_embeddings() -> None:
-    if os.path.exists(EMBEDDINGS_PATH):
+    try:
+        abrir_embeddings(EMBEDDINGS_PATH, modelo=CITY_EMBEDDING_MODEL)
         logger.info(
             "📂 Embeddings de cidades já estão salvos. Nenhuma ação necessária."
         )
         return
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        logger.warning(f"⚠️ {e} Gerando novamente.")
+
+    # Migração do formato antigo (.npz comprimido), sem recalcular o modelo
+    if EMBEDDINGS_LEGACY_PATH.exists():
+        try:
+            with np.load(EMBEDDINGS_LEGACY_PATH, allow_pickle=False) as data:
+                nomes = [str(n) for n in data["nomes"]]
+                embeddings = data["embeddings"]
+            salvar_embeddings(
+                EMBEDDINGS_PATH,
+                nomes,
+                embeddings,
+                CITY_EMBEDDING_MODEL,
+                EMBEDDINGS_PRECISION,
+            )
+            logger.info(f"🔁 Embeddings de {len(nomes)} cidades migrados do .npz.")
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao migrar embeddings antigos: {e}")
+
+    # Reaproveita o modelo compartilhado com a detecção de cidades
+    modelo = modelo_cidades.obter(bloquear=True)
+    if modelo is None:
+        logger.info("ℹ️ Modelo local desativado. Embeddings de cidades não gerados.")
+        return
 
     logger.info("⚙️ Nenhum embedding encontrado. Iniciando geração...")
     try:
-        modelo = SentenceTransformer(MODEL_NAME)
-        nomes = list(carregar_cidades().keys())
+        nomes = carregar_cidades().nomes_normalizados
         embeddings = modelo.encode(nomes, normalize_embeddings=True)
 
-        os.makedirs("data", exist_ok=True)
-        np.savez_compressed(EMBEDDINGS_PATH, nomes=nomes, embeddings=embeddings)
+        salvar_embeddings(
+            EMBEDDINGS_PATH,
+            nomes,
+            embeddings,
+            CITY_EMBEDDING_MODEL,
+            EMBEDDINGS_PRECISION,
+        )
 
         logger.info(f"✅ Embeddings de {len(nomes)} cidades salvos com sucesso.")
     except Exception as e:
@@ -0,0 +1,46 @@
+# chatbot-llm/backend/startup/warmup.py
+import threading
+import time
+
+from core.router.indices_cidades import embeddings_cidades, indices_cidades
+from core.router.tema_vetorial import classificador_temas
+from startup.embed_initializer import inicializar_embeddings
+from utils.logger import get_logger
+from utils.model_provider import modelo_cidades, vectorstore_institucional
+
+logger = get_logger(__name__)
+
+_iniciado = threading.Event()
+
+
+def _aquecer() -> None:
+    inicio = time.perf_counter()
+
+    # Pinecone é independente do restante: conecta em paralelo
+    vectorstore_institucional.aquecer()
+
+    # Etapas literal/fuzzy primeiro: ficam disponíveis em milissegundos
+    try:
+        indices_cidades()
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao pré-carregar índices de cidades: {e}")
+
+    modelo_cidades.obter(bloquear=True)
+    # centroides de tema: poucas dezenas de textos, com o modelo já carregado
+    classificador_temas.obter(bloquear=True)
+    inicializar_embeddings()
+    # sincroniza o store com o registro e constrói o índice vetorial
+    embeddings_cidades.obter(bloquear=True)
+
+    logger.info(f"🔥 Aquecimento concluído em {time.perf_counter() - inicio:.2f}s.")
+
+
+def iniciar_aquecimento() -> None:
+    """
+    Carrega modelo, embeddings e conexões em uma thread daemon, sem atrasar
+    o startup do servidor. Pode ser chamada mais de uma vez.
+    """
+    if _iniciado.is_set():
+        return
+    _iniciado.set()
+    threading.Thread(target=_aquecer, name="aquecimento", daemon=True).start()
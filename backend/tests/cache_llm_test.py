@@ -0,0 +1,165 @@
+# chatbot-llm/backend/tests/cache_llm_test.py
+import hashlib
+import json
+import tempfile
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from utils.cache_llm import CacheEmCamadas, CacheSQLite
+
+
+def _chave(i: int) -> str:
+    return hashlib.sha256(str(i).encode("utf-8")).hexdigest()
+
+
+def _escrever(args: Tuple[str, int, int]) -> None:
+    # Escritor em outro processo, sobre o mesmo arquivo
+    caminho, inicio, n = args
+    cache = CacheSQLite(Path(caminho))
+    for i in range(inicio, inicio + n):
+        cache.guardar(_chave(i), f"resposta {i}")
+
+
+def comparar_com_legado(n: int = 2000, tamanho: int = 1500) -> Dict[str, Any]:
+    """
+    Migra um diretório no formato antigo (um JSON por resposta) e compara a
+    latência de leitura dos dois formatos; confere LRU, TTL e escrita
+    concorrente entre processos.
+    """
+    resposta = "x" * tamanho
+    with tempfile.TemporaryDirectory() as tmp:
+        legado = Path(tmp) / "llm"
+        legado.mkdir()
+        for i in range(n):
+            (legado / f"{_chave(i)}.json").write_text(
+                json.dumps({"resposta": resposta}), encoding="utf-8"
+            )
+
+        inicio = time.perf_counter()
+        for i in range(n):
+            path = legado / f"{_chave(i)}.json"
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    json.load(f)
+        legado_us = (time.perf_counter() - inicio) / n * 1e6
+
+        cache = CacheSQLite(Path(tmp) / "llm.sqlite3", max_bytes=n * tamanho)
+        migradas = cache.migrar_diretorio(legado)
+
+        inicio = time.perf_counter()
+        lidas = sum(cache.obter(_chave(i)) is not None for i in range(n))
+        sqlite_us = (time.perf_counter() - inicio) / n * 1e6
+
+        # LRU: a entrada recém-lida sobrevive à evicção, a mais antiga sai
+        cache.obter(_chave(1))
+        cache.max_bytes = (n - 1) * tamanho
+        cache.guardar(_chave(n), resposta)
+        lru_ok = cache.obter(_chave(1)) is not None and cache.obter(_chave(0)) is None
+
+        cache.guardar("expira", "valor", ttl=0.05)
+        time.sleep(0.1)
+        ttl_ok = cache.obter("expira") is None
+
+        concorrente = CacheSQLite(Path(tmp) / "concorrente.sqlite3")
+        lotes: List[Tuple[str, int, int]] = [
+            (str(concorrente.caminho), p * 200, 200) for p in range(4)
+        ]
+        with Pool(4) as pool:
+            pool.map(_escrever, lotes)
+        concorrente_ok = concorrente.estatisticas()["itens"] == 800
+        # total mantido pelos gatilhos confere com a soma real, após migração,
+        # evicção, TTL e escritas concorrentes
+        totais_ok = all(
+            c._conexao().execute("SELECT bytes FROM totais").fetchone()[0]
+            == c.estatisticas()["bytes"]
+            for c in (cache, concorrente)
+        )
+
+        return {
+            "migradas": migradas,
+            "diretorio_removido": not legado.exists(),
+            "lidas": lidas,
+            "leitura_legado_us": round(legado_us, 1),
+            "leitura_sqlite_us": round(sqlite_us, 1),
+            "lru_ok": lru_ok,
+            "ttl_ok": ttl_ok,
+            "concorrente_ok": concorrente_ok,
+            "totais_ok": totais_ok,
+            "estatisticas": cache.estatisticas(),
+        }
+
+
+def medir_camadas(n: int = 200, tamanho: int = 1500) -> Dict[str, Any]:
+    """
+    Latência de escrita (write-behind) e de leitura no L1 contra o SQLite,
+    promoção ao L1 de uma resposta lida do disco, TTL no L1 e acertos no L1
+    contando para o LRU do disco.
+    """
+    resposta = "x" * tamanho
+    with tempfile.TemporaryDirectory() as tmp:
+        disco = CacheSQLite(Path(tmp) / "llm.sqlite3")
+        camadas = CacheEmCamadas(disco, max_bytes=n * (tamanho + 64))
+
+        inicio = time.perf_counter()
+        for i in range(n):
+            camadas.guardar(_chave(i), resposta)
+        escrita_us = (time.perf_counter() - inicio) / n * 1e6
+        camadas.descarregar()
+
+        inicio = time.perf_counter()
+        for i in range(n):
+            camadas.obter(_chave(i))
+        l1_us = (time.perf_counter() - inicio) / n * 1e6
+        # a taxa de acerto soma L1 e disco: as n leituras vieram do L1
+        taxa_ok = camadas.estatisticas()["taxa_acerto"] == 1.0
+
+        inicio = time.perf_counter()
+        for i in range(n):
+            disco.obter(_chave(i))
+        disco_us = (time.perf_counter() - inicio) / n * 1e6
+
+        # resposta gravada só no disco (outro processo) sobe para o L1
+        disco.guardar("so_disco", resposta)
+        camadas.obter("so_disco")
+        promovida = camadas.estatisticas()["l1"]["promocoes"] == 1
+        persistidas = disco.estatisticas()["itens"] == n + 1
+
+        # TTL vale também no L1: expirada no disco, expirada na memória
+        camadas.guardar("expira", resposta, ttl=0.05)
+        time.sleep(0.1)
+        ttl_l1_ok = camadas.obter("expira") is None
+
+        # acertos no L1 contam para o LRU do disco: a mais lida sobrevive
+        lru = CacheEmCamadas(CacheSQLite(Path(tmp) / "lru.sqlite3"))
+        for chave in ("lida", "esquecida"):
+            lru.guardar(chave, resposta)
+            lru.descarregar()
+            time.sleep(0.01)
+        lru.obter("lida")
+        lru.disco.max_bytes = 2 * tamanho  # type: ignore[attr-defined]
+        lru.guardar("nova", resposta)
+        lru.descarregar()
+        lru_l1_ok = (
+            lru.disco.obter("lida") is not None and lru.disco.obter("esquecida") is None
+        )
+
+        return {
+            "escrita_us": round(escrita_us, 1),
+            "leitura_l1_us": round(l1_us, 2),
+            "leitura_sqlite_us": round(disco_us, 1),
+            "persistidas": persistidas,
+            "taxa_ok": taxa_ok,
+            "promovida": promovida,
+            "ttl_l1_ok": ttl_l1_ok,
+            "lru_l1_ok": lru_l1_ok,
+            "estatisticas": camadas.estatisticas()["l1"],
+        }
+
+
+if __name__ == "__main__":
+    from pprint import pprint
+
+    pprint(comparar_com_legado())
+    pprint(medir_camadas())
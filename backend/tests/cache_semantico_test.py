@@ -0,0 +1,48 @@
+# chatbot-llm/backend/tests/cache_semantico_test.py
+from typing import Any, Dict
+
+from config.config import SEMANTIC_CACHE_THRESHOLD
+from utils.cache_semantico import CacheSemantico, assinatura
+from utils.model_provider import modelo_cidades
+
+
+def verificar_antonimos(limiar: float = SEMANTIC_CACHE_THRESHOLD) -> Dict[str, Any]:
+    """
+    Um par de antônimos sobre a mesma tabela ("maior" e "menor" PIB) não
+    pode reaproveitar a resposta, por mais alto que seja o cosseno; uma
+    paráfrase de verdade continua reaproveitando.
+    """
+    if modelo_cidades.obter(bloquear=True) is None:
+        return {"erro": "modelo local indisponível (PERFORMANCE_LEVEL)"}
+
+    cache = CacheSemantico(limiar=limiar)
+    balde = "comparativo-pib"
+    original = "Qual tem o maior PIB per capita, Campinas ou Santos?"
+    antonimo = "Qual tem o menor PIB per capita, Campinas ou Santos?"
+    parafrase = "Entre Campinas e Santos, qual possui o maior PIB per capita?"
+
+    busca = cache.buscar(original, balde)
+    assert busca.embedding is not None
+    cache.registrar(original, balde, "resposta-maior", busca.embedding)
+
+    busca_antonimo = cache.buscar(antonimo, balde)
+    busca_parafrase = cache.buscar(parafrase, balde)
+    assert busca_antonimo.embedding is not None
+    # cosseno bruto do par: mostra que o limiar sozinho não separaria os dois
+    cosseno_antonimo = float(busca_antonimo.embedding @ busca.embedding)
+
+    return {
+        "limiar": limiar,
+        "cosseno_antonimo": round(cosseno_antonimo, 4),
+        "assinaturas_iguais": assinatura(original) == assinatura(antonimo),
+        "antonimo_recusado": busca_antonimo.chave is None,
+        "parafrase_reaproveitada": busca_parafrase.chave == "resposta-maior",
+        "similaridade_parafrase": round(busca_parafrase.similaridade, 4),
+        "estatisticas": cache.estatisticas(),
+    }
+
+
+if __name__ == "__main__":
+    from pprint import pprint
+
+    pprint(verificar_antonimos())
@@ -0,0 +1,78 @@
+# chatbot-llm/backend/tests/embeddings_precisao_test.py
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from config.config import CITY_EMBEDDING_MODEL, EMBEDDINGS_PATH
+from core.router.indice_vetorial import IndiceExato
+from utils.embedding_store import PRECISOES, abrir_embeddings, salvar_embeddings
+
+
+def comparar_precisoes(
+    nomes: List[str], emb: np.ndarray, k: int = 10, consultas: int = 256
+) -> List[Dict[str, Any]]:
+    """
+    Compara tamanho em disco, tempo de abertura, latência de busca e
+    recall@k de cada precisão contra a busca exata em float32.
+    """
+    rng = np.random.default_rng(0)
+    base = emb[rng.choice(len(emb), size=consultas)]
+    ruido = rng.normal(0, 0.3 / np.sqrt(emb.shape[1]), size=base.shape)
+    qs = (base + ruido).astype(np.float32)
+    qs /= np.linalg.norm(qs, axis=1, keepdims=True)
+
+    referencia = IndiceExato(emb)
+    esperados = [referencia.buscar(q, k)[0] for q in qs]
+
+    resultados: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # baseline: formato antigo comprimido
+        npz = Path(tmp) / "legado.npz"
+        np.savez_compressed(npz, nomes=nomes, embeddings=emb)
+        inicio = time.perf_counter()
+        with np.load(npz) as data:
+            data["nomes"].tolist(), np.array(data["embeddings"])
+        resultados.append(
+            {
+                "precisao": "npz (legado)",
+                "bytes": npz.stat().st_size,
+                "abertura_ms": (time.perf_counter() - inicio) * 1e3,
+                "busca_us": None,
+                f"recall@{k}": 1.0,
+            }
+        )
+
+        for precisao in PRECISOES:
+            path = Path(tmp) / f"emb_{precisao}.emb"
+            salvar_embeddings(path, nomes, emb, CITY_EMBEDDING_MODEL, precisao)
+
+            inicio = time.perf_counter()
+            store = abrir_embeddings(path, modelo=CITY_EMBEDDING_MODEL)
+            abertura = time.perf_counter() - inicio
+
+            indice = IndiceExato(store.vetores)
+            inicio = time.perf_counter()
+            obtidos = [indice.buscar(q, k)[0] for q in qs]
+            busca = (time.perf_counter() - inicio) / len(qs)
+
+            acertos = sum(len(np.intersect1d(e, o)) for e, o in zip(esperados, obtidos))
+            resultados.append(
+                {
+                    "precisao": precisao,
+                    "bytes": path.stat().st_size,
+                    "abertura_ms": abertura * 1e3,
+                    "busca_us": busca * 1e6,
+                    f"recall@{k}": acertos / (len(qs) * k),
+                }
+            )
+    return resultados
+
+
+if __name__ == "__main__":
+    from pprint import pprint
+
+    store = abrir_embeddings(EMBEDDINGS_PATH)
+    pprint(comparar_precisoes(store.nomes, store.vetores.para_float32()))
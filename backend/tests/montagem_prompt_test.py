@@ -0,0 +1,71 @@
+# chatbot-llm/backend/tests/montagem_prompt_test.py
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from config.dicionarios import METRICAS_VALIDAS, TEMPLATE_SINGLE_CITY
+from core.montagem_prompt import compilar_template, estimar_tokens, montar_tabela
+
+PERGUNTAS = [
+    "Quantas matrículas no ensino fundamental tem Campinas?",
+    "Quantas escolas com biblioteca existem em Campinas?",
+    "Quantos professores tem Campinas?",
+    "Como está a educação em Campinas?",
+]
+
+
+def _linha_educacao() -> Dict[str, Any]:
+    # Mesmas colunas do EducacaoAgent (educacao_basica + infraestrutura_basica)
+    linha: Dict[str, Any] = {"cidade": "Campinas", "estado": "São Paulo"}
+    linha["ano_dados"] = 2023
+    for i, coluna in enumerate(METRICAS_VALIDAS):
+        if coluna.startswith(
+            ("matriculas_", "turmas_", "docentes_", "escolas_", "profissionais_")
+        ) and not coluna.endswith(("_ct", "_nm", "concomitantes", "subsequentes")):
+            linha[coluna] = 1000 + i * 137
+    return linha
+
+
+def comparar_tokens() -> List[Dict[str, Any]]:
+    """Tokens estimados da tabela: markdown completo contra a tabela podada."""
+    linha = _linha_educacao()
+    markdown = pd.DataFrame([linha]).to_markdown(index=False)
+    resultados = []
+    for pergunta in PERGUNTAS:
+        tabela = montar_tabela(pergunta, [linha])
+        resultados.append(
+            {
+                "pergunta": pergunta,
+                "colunas": f"{len(tabela.colunas)}/{len(linha)}",
+                "tokens_markdown": estimar_tokens(markdown),
+                "tokens_compacto": tabela.tokens,
+            }
+        )
+    return resultados
+
+
+def medir_template(n: int = 2000) -> Dict[str, float]:
+    """Custo de from_template por requisição contra o template em cache."""
+    from langchain_core.prompts import ChatPromptTemplate
+
+    inicio = time.perf_counter()
+    for _ in range(n):
+        ChatPromptTemplate.from_template(TEMPLATE_SINGLE_CITY)
+    sem_cache_us = (time.perf_counter() - inicio) / n * 1e6
+
+    inicio = time.perf_counter()
+    for _ in range(n):
+        compilar_template(TEMPLATE_SINGLE_CITY)
+    com_cache_us = (time.perf_counter() - inicio) / n * 1e6
+    return {
+        "from_template_us": round(sem_cache_us, 1),
+        "em_cache_us": round(com_cache_us, 2),
+    }
+
+
+if __name__ == "__main__":
+    from pprint import pprint
+
+    pprint(comparar_tokens())
+    pprint(medir_template())
@@ -0,0 +1,84 @@
+# chatbot-llm/backend/tests/onnx_benchmark_test.py
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from config.config import CITY_EMBEDDING_MODEL
+from utils.onnx_encoder import BACKENDS, TEXTOS_PARIDADE, criar_encoder
+
+
+def _rss_mb() -> float:
+    # RSS atual do processo (Linux); fallback para o pico via resource
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_backend(modelo: str, backend: str, repeticoes: int = 200) -> Dict[str, Any]:
+    """
+    Mede, no processo atual, RSS após carregar o encoder e latência por
+    consulta (uma pergunta por chamada, como em `detectar_cidades`).
+    """
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    encoder = criar_encoder(modelo, backend)
+    carga = time.perf_counter() - inicio
+
+    encoder.encode(TEXTOS_PARIDADE[0], normalize_embeddings=True)  # aquecimento
+    tempos: List[float] = []
+    for i in range(repeticoes):
+        texto = TEXTOS_PARIDADE[i % len(TEXTOS_PARIDADE)]
+        inicio = time.perf_counter()
+        encoder.encode(texto, normalize_embeddings=True)
+        tempos.append((time.perf_counter() - inicio) * 1e3)
+
+    return {
+        "backend": backend,
+        "encoder": type(encoder).__name__,
+        "carga_s": round(carga, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_modelo_mb": round(_rss_mb() - rss_inicial, 1),
+        "p50_ms": round(float(np.percentile(tempos, 50)), 2),
+        "p95_ms": round(float(np.percentile(tempos, 95)), 2),
+    }
+
+
+def comparar_backends(modelo: str = CITY_EMBEDDING_MODEL) -> List[Dict[str, Any]]:
+    """
+    Roda cada backend em um subprocesso separado, para que o RSS de um não
+    contamine o do outro. O backend 'torch' é a referência.
+    """
+    resultados: List[Dict[str, Any]] = []
+    for backend in BACKENDS:
+        saida = subprocess.run(
+            [sys.executable, __file__, modelo, backend],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    return resultados
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        print(json.dumps(medir_backend(sys.argv[1], sys.argv[2])))
+    else:
+        from pprint import pprint
+
+        from utils.onnx_encoder import carregar_meta, diretorio_modelo
+
+        modelo = sys.argv[1] if len(sys.argv) > 1 else CITY_EMBEDDING_MODEL
+        pprint(comparar_backends(modelo))
+        pprint(carregar_meta(diretorio_modelo(modelo)).get("paridade"))
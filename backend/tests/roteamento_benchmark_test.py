@@ -0,0 +1,398 @@
+# chatbot-llm/backend/tests/roteamento_benchmark_test.py
+import os
+
+# Offline por padrão: sem Postgres, sem rede e sem modelo local (etapas
+# literal/fuzzy). Com PERFORMANCE_LEVEL=auto no ambiente, a etapa de
+# embeddings entra no benchmark se o modelo já estiver em cache.
+os.environ.setdefault("DATABASE_URL", "postgresql://offline/benchmark")
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("PERFORMANCE_LEVEL", "eco")
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("DATA_VERSION_CHECK_SECONDS", "0")
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.config import PERFORMANCE_LEVEL, PROJETO_RAIZ
+from core.router.registro_cidades import LinhaCidade, RegistroCidades
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+CORPUS_PATH = FIXTURES_DIR / "corpus_roteamento.json"
+BASELINE_PATH = FIXTURES_DIR / "baseline_roteamento.json"
+# Tabela de municípios: o próprio dump versionado do banco
+DUMP_PATH = PROJETO_RAIZ.parent / "postgres" / "init.sql"
+VERSAO_FIXTURE = 1
+
+# Regressão: queda de acurácia ou p95 acima de (1 + tolerância) × baseline;
+# a folga absoluta evita alarmes por ruído em etapas de microssegundos
+TOLERANCIA_LATENCIA = 0.5
+FOLGA_LATENCIA_MS = 0.2
+
+
+def _copy_do_dump(dump: Path, tabela: str) -> List[List[Optional[str]]]:
+    # Linhas do bloco `COPY public.<tabela> ... FROM stdin;` (formato texto)
+    linhas: List[List[Optional[str]]] = []
+    dentro = False
+    with open(dump, encoding="utf-8") as f:
+        for linha in f:
+            if not dentro:
+                dentro = linha.startswith(f"COPY public.{tabela} ")
+                continue
+            if linha.startswith("\\."):
+                break
+            campos = linha.rstrip("\n").split("\t")
+            linhas.append([None if c == "\\N" else c for c in campos])
+    return linhas
+
+
+def carregar_fixture(dump: Path = DUMP_PATH) -> RegistroCidades:
+    """Mesmas colunas de `_consultar_registro`, lidas do dump em vez do banco."""
+    estados = {sigla: nome for sigla, nome in _copy_do_dump(dump, "estados")}
+    linhas: List[LinhaCidade] = []
+    for codigo, uf, cidade, populacao, *_ in _copy_do_dump(dump, "municipios"):
+        linhas.append(
+            (
+                int(codigo or 0),
+                cidade or "",
+                uf or "",
+                estados.get(uf or "") or uf or "",
+                int(populacao) if populacao else None,
+            )
+        )
+    return RegistroCidades(linhas)
+
+
+def preparar_ambiente(registro: RegistroCidades) -> float:
+    """
+    Injeta a fixture no carregamento dos índices de cidades e constrói o
+    snapshot. Retorna o tempo de construção (partida a frio), em segundos.
+    """
+    import core.router.indices_cidades as indices_mod
+
+    setattr(indices_mod, "_consultar_registro", lambda: registro)
+    setattr(indices_mod, "consultar_versao_dados", lambda *_: VERSAO_FIXTURE)
+
+    inicio = time.perf_counter()
+    indices_mod.indices_cidades()
+    segundos = time.perf_counter() - inicio
+    # com modelo local habilitado, a etapa de embeddings já entra pronta
+    indices_mod.embeddings_cidades.obter(bloquear=True)
+    return segundos
+
+
+def carregar_corpus(caminho: Path = CORPUS_PATH) -> List[Dict[str, Any]]:
+    with open(caminho, encoding="utf-8") as f:
+        return list(json.load(f)["perguntas"])
+
+
+def _rotulo(cidade: Dict[str, Any]) -> str:
+    return f"{cidade['nome']}/{cidade['uf']}"
+
+
+def _rota_esperada(item: Dict[str, Any]) -> Optional[str]:
+    return "comparative" if len(item["cidades"]) >= 2 else item["tema"]
+
+
+def _cronometrar(
+    funcao: Callable[[str], Any],
+    perguntas: Sequence[str],
+    repeticoes: int,
+    antes_da_rodada: Optional[Callable[[], None]] = None,
+) -> Tuple[List[float], List[Any]]:
+    # Uma rodada de aquecimento (resultados usados na acurácia) + repetições
+    resultados = [funcao(p) for p in perguntas]
+    tempos: List[float] = []
+    for _ in range(repeticoes):
+        if antes_da_rodada:
+            antes_da_rodada()
+        for pergunta in perguntas:
+            inicio = time.perf_counter()
+            funcao(pergunta)
+            tempos.append((time.perf_counter() - inicio) * 1e3)
+    return tempos, resultados
+
+
+def _latencia(tempos: List[float]) -> Dict[str, float]:
+    total_s = sum(tempos) / 1e3
+    return {
+        "p50_ms": round(float(np.percentile(tempos, 50)), 4),
+        "p95_ms": round(float(np.percentile(tempos, 95)), 4),
+        "p99_ms": round(float(np.percentile(tempos, 99)), 4),
+        "media_ms": round(float(np.mean(tempos)), 4),
+        "perguntas_por_s": round(len(tempos) / total_s, 1) if total_s else 0.0,
+    }
+
+
+def _acuracia(
+    corpus: List[Dict[str, Any]],
+    acertos: Dict[int, bool],
+) -> Dict[str, Any]:
+    por_categoria: Dict[str, List[bool]] = {}
+    for item in corpus:
+        if item["id"] in acertos:
+            por_categoria.setdefault(item["categoria"], []).append(acertos[item["id"]])
+    valores = list(acertos.values())
+    return {
+        "acuracia": round(sum(valores) / len(valores), 4) if valores else None,
+        "avaliadas": len(valores),
+        "por_categoria": {
+            cat: round(sum(v) / len(v), 4) for cat, v in sorted(por_categoria.items())
+        },
+        "falhas": sorted(i for i, ok in acertos.items() if not ok),
+    }
+
+
+def executar_benchmark(
+    corpus: List[Dict[str, Any]], repeticoes: int = 20
+) -> Dict[str, Any]:
+    """
+    Mede latência (p50/p95/p99), vazão e acurácia de cada etapa do
+    roteamento sobre o corpus rotulado. A acurácia de `classificar_tema`
+    considera só as perguntas com menos de duas cidades (as demais são
+    roteadas como comparativas pelo interpretador); as de `classificar_metrica`
+    e `extrair_metricas`, só as que têm métrica rotulada (`metricas`, quando
+    presente, é a lista completa e ordenada).
+    """
+    from core.router.analise_pergunta import analisar_pergunta, limpar_cache_analises
+    from core.router.cache_rotas import cache_rotas
+    from core.router.interpreter import interpretar_pergunta
+    from core.router.semantic_city import detectar_cidades, detectar_cidades_batch
+    from core.router import semantic_metric
+    from core.router.semantic_metric import classificar_metrica, extrair_metricas
+    from core.router.semantic_router import classificar_tema
+    from utils.model_provider import modelo_cidades
+
+    perguntas = [item["pergunta"] for item in corpus]
+    etapas: Dict[str, Dict[str, Any]] = {}
+
+    # analisar_pergunta: análise única (cache limpo a cada rodada); acerta
+    # quando tema (se avaliado) e métricas (se rotuladas) batem com o rótulo
+    tempos, resultados = _cronometrar(
+        analisar_pergunta,
+        perguntas,
+        repeticoes,
+        antes_da_rodada=limpar_cache_analises,
+    )
+    acertos = {
+        item["id"]: (len(item["cidades"]) >= 2 or analise.temas.tema == item["tema"])
+        and (
+            not item["metrica"]
+            or [m.coluna for m in analise.metricas]
+            == item.get("metricas", [item["metrica"]])
+        )
+        for item, analise in zip(corpus, resultados)
+    }
+    etapas["analisar_pergunta"] = {**_latencia(tempos), **_acuracia(corpus, acertos)}
+
+    # detectar_cidades (inclui a análise da pergunta, sem cache)
+    tempos, resultados = _cronometrar(
+        detectar_cidades,
+        perguntas,
+        repeticoes,
+        antes_da_rodada=limpar_cache_analises,
+    )
+    acertos = {
+        item["id"]: sorted(map(_rotulo, obtidas)) == sorted(item["cidades"])
+        for item, obtidas in zip(corpus, resultados)
+    }
+    etapas["detectar_cidades"] = {**_latencia(tempos), **_acuracia(corpus, acertos)}
+
+    # detectar_cidades_batch: o corpus inteiro como um único lote
+    tempos_lote: List[float] = []
+    lote = detectar_cidades_batch(perguntas)
+    for _ in range(repeticoes):
+        limpar_cache_analises()
+        inicio = time.perf_counter()
+        detectar_cidades_batch(perguntas)
+        tempos_lote.append((time.perf_counter() - inicio) * 1e3 / len(perguntas))
+    acertos = {
+        item["id"]: sorted(map(_rotulo, obtidas)) == sorted(item["cidades"])
+        for item, obtidas in zip(corpus, lote)
+    }
+    etapas["detectar_cidades_batch"] = {
+        **_latencia(tempos_lote),
+        **_acuracia(corpus, acertos),
+    }
+
+    # classificar_tema
+    avaliadas = [item for item in corpus if len(item["cidades"]) < 2]
+    tempos, resultados = _cronometrar(
+        classificar_tema, [item["pergunta"] for item in avaliadas], repeticoes
+    )
+    acertos = {
+        item["id"]: obtido == item["tema"]
+        for item, obtido in zip(avaliadas, resultados)
+    }
+    etapas["classificar_tema"] = {**_latencia(tempos), **_acuracia(corpus, acertos)}
+
+    # classificar_metrica (cache limpo a cada rodada: mede o caminho sem cache)
+    avaliadas = [item for item in corpus if item["metrica"]]
+    tempos, resultados = _cronometrar(
+        classificar_metrica,
+        [item["pergunta"] for item in avaliadas],
+        repeticoes,
+        antes_da_rodada=semantic_metric._metricas_do_texto.cache_clear,
+    )
+    acertos = {
+        item["id"]: obtido[0] == item["metrica"]
+        for item, obtido in zip(avaliadas, resultados)
+    }
+    etapas["classificar_metrica"] = {
+        **_latencia(tempos),
+        **_acuracia(corpus, acertos),
+    }
+
+    # extrair_metricas: todas as métricas, em ordem
+    tempos, resultados = _cronometrar(
+        extrair_metricas,
+        [item["pergunta"] for item in avaliadas],
+        repeticoes,
+        antes_da_rodada=semantic_metric._metricas_do_texto.cache_clear,
+    )
+    acertos = {
+        item["id"]: [m.coluna for m in obtidas]
+        == item.get("metricas", [item["metrica"]])
+        for item, obtidas in zip(avaliadas, resultados)
+    }
+    etapas["extrair_metricas"] = {**_latencia(tempos), **_acuracia(corpus, acertos)}
+
+    # interpretar_pergunta: rota (tema final) + cidades
+    def limpar_caches() -> None:
+        limpar_cache_analises()
+        cache_rotas.limpar()
+
+    limpar_caches()
+    tempos, resultados = _cronometrar(
+        interpretar_pergunta,
+        perguntas,
+        repeticoes,
+        antes_da_rodada=limpar_caches,
+    )
+    acertos = {
+        item["id"]: tema == _rota_esperada(item)
+        and sorted(map(_rotulo, cidades)) == sorted(item["cidades"])
+        for item, (_, tema, cidades, _) in zip(corpus, resultados)
+    }
+    etapas["interpretar_pergunta"] = {
+        **_latencia(tempos),
+        **_acuracia(corpus, acertos),
+    }
+
+    # interpretar_pergunta com o cache de rotas aquecido (perguntas repetidas)
+    tempos, resultados = _cronometrar(interpretar_pergunta, perguntas, repeticoes)
+    acertos = {
+        item["id"]: tema == _rota_esperada(item)
+        and sorted(map(_rotulo, cidades)) == sorted(item["cidades"])
+        for item, (_, tema, cidades, _) in zip(corpus, resultados)
+    }
+    etapas["interpretar_em_cache"] = {
+        **_latencia(tempos),
+        **_acuracia(corpus, acertos),
+    }
+
+    return {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "performance_level": PERFORMANCE_LEVEL,
+            "modelo_local": modelo_cidades.estado,
+        },
+        "corpus": {"perguntas": len(corpus), "repeticoes": repeticoes},
+        "etapas": etapas,
+    }
+
+
+def comparar_com_baseline(
+    atual: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerancia: float = TOLERANCIA_LATENCIA,
+    folga_ms: float = FOLGA_LATENCIA_MS,
+) -> List[str]:
+    """Lista as regressões de acurácia e de p95 em relação à baseline."""
+    regressoes: List[str] = []
+    for etapa, base in baseline.get("etapas", {}).items():
+        medida = atual["etapas"].get(etapa)
+        if medida is None:
+            regressoes.append(f"{etapa}: etapa ausente na execução atual")
+            continue
+        if (medida["acuracia"] or 0) < (base["acuracia"] or 0):
+            novas = sorted(set(medida["falhas"]) - set(base["falhas"]))
+            regressoes.append(
+                f"{etapa}: acurácia {base['acuracia']:.2%} → "
+                f"{medida['acuracia']:.2%} (novas falhas: {novas})"
+            )
+        limite = max(base["p95_ms"] * (1 + tolerancia), base["p95_ms"] + folga_ms)
+        if medida["p95_ms"] > limite:
+            regressoes.append(
+                f"{etapa}: p95 {base['p95_ms']:.3f}ms → {medida['p95_ms']:.3f}ms"
+            )
+    return regressoes
+
+
+def imprimir_relatorio(relatorio: Dict[str, Any]) -> None:
+    print(
+        f"\n📊 Roteamento — {relatorio['corpus']['perguntas']} perguntas × "
+        f"{relatorio['corpus']['repeticoes']} repetições "
+        f"(modelo local: {relatorio['ambiente']['modelo_local']})\n"
+    )
+    print(
+        f"{'etapa':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'perg/s':>11}{'acurácia':>10}"
+    )
+    for etapa, m in relatorio["etapas"].items():
+        acuracia = f"{m['acuracia']:.1%}" if m["acuracia"] is not None else "-"
+        print(
+            f"{etapa:<24}{m['p50_ms']:>9.3f}{m['p95_ms']:>9.3f}{m['p99_ms']:>9.3f}"
+            f"{m['perguntas_por_s']:>11.1f}{acuracia:>10}"
+        )
+    print()
+    for etapa, m in relatorio["etapas"].items():
+        print(f"{etapa}: {m['por_categoria']} | falhas: {m['falhas']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do roteamento")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_LATENCIA)
+    parser.add_argument(
+        "--salvar-baseline",
+        action="store_true",
+        help=f"grava o resultado em {BASELINE_PATH.name}",
+    )
+    args = parser.parse_args()
+
+    registro = carregar_fixture()
+    segundos_indices = preparar_ambiente(registro)
+    # logs por pergunta distorcem as medições de microssegundos
+    logging.disable(logging.INFO)
+
+    relatorio = executar_benchmark(carregar_corpus(), args.repeticoes)
+    relatorio["corpus"]["municipios"] = len(registro)
+    relatorio["indices_s"] = round(segundos_indices, 3)
+    imprimir_relatorio(relatorio)
+
+    if args.salvar_baseline:
+        BASELINE_PATH.write_text(
+            json.dumps(relatorio, ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"\n💾 Baseline salva em {BASELINE_PATH}")
+    elif BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+        regressoes = comparar_com_baseline(relatorio, baseline, args.tolerancia)
+        for regressao in regressoes:
+            print(f"❌ {regressao}")
+        if regressoes:
+            sys.exit(1)
+        print("\n✅ Sem regressões em relação à baseline.")
@@ -0,0 +1,146 @@
+# chatbot-llm/backend/utils/aho_corasick.py
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, cast
+
+
+class Ocorrencia(NamedTuple):
+    inicio: int
+    fim: int  # exclusivo, como em texto[inicio:fim]
+    chave: str
+
+
+def _eh_palavra(caractere: str) -> bool:
+    # Mesma definição de caractere de palavra usada por `\b` no módulo re
+    return caractere.isalnum() or caractere == "_"
+
+
+def fronteira(texto: str, pos: int) -> bool:
+    """
+    Equivalente a `\\b` na posição `pos`: verdadeiro quando exatamente um
+    dos lados (anterior/posterior) é caractere de palavra.
+    """
+    antes = pos > 0 and _eh_palavra(texto[pos - 1])
+    depois = pos < len(texto) and _eh_palavra(texto[pos])
+    return antes != depois
+
+
+class AutomatoAhoCorasick:
+    """
+    Automato de múltiplos padrões literais (Aho-Corasick).
+
+    Encontra todas as ocorrências delimitadas por fronteira de palavra de
+    qualquer padrão cadastrado em uma única passada sobre o texto, no mesmo
+    sentido de `re.search(rf"\\b{re.escape(padrao)}\\b", texto)`.
+    """
+
+    def __init__(self, padroes: Optional[Iterable[str]] = None) -> None:
+        self._transicoes: List[Dict[str, int]] = [{}]
+        self._falha: List[int] = [0]
+        # padrão terminado em cada nó (ou None) e próximo nó terminal na cadeia de falhas
+        self._saida: List[Optional[str]] = [None]
+        self._saida_link: List[int] = [-1]
+        # padrões que exigem fronteira apenas no início (casam prefixo de palavra)
+        self._prefixo: List[bool] = [False]
+        self._construido = False
+        if padroes is not None:
+            for padrao in padroes:
+                self.adicionar(padrao)
+            self.construir()
+
+    def __len__(self) -> int:
+        return sum(1 for s in self._saida if s is not None)
+
+    def adicionar(self, padrao: str, prefixo: bool = False) -> None:
+        """
+        Cadastra um padrão. Com `prefixo`, dispensa a fronteira no fim
+        (ex.: "empresa" também casa em "empresas").
+        """
+        if not padrao:
+            return
+        no = 0
+        for caractere in padrao:
+            prox = self._transicoes[no].get(caractere)
+            if prox is None:
+                prox = len(self._transicoes)
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._saida.append(None)
+                self._saida_link.append(-1)
+                self._prefixo.append(False)
+                self._transicoes[no][caractere] = prox
+            no = prox
+        self._saida[no] = padrao
+        self._prefixo[no] = prefixo
+        self._construido = False
+
+    def construir(self) -> None:
+        """Calcula os links de falha e de saída (BFS sobre a trie)."""
+        fila: deque[int] = deque()
+        for filho in self._transicoes[0].values():
+            self._falha[filho] = 0
+            self._saida_link[filho] = -1
+            fila.append(filho)
+
+        while fila:
+            no = fila.popleft()
+            for caractere, filho in self._transicoes[no].items():
+                fila.append(filho)
+                f = self._falha[no]
+                while f and caractere not in self._transicoes[f]:
+                    f = self._falha[f]
+                alvo = self._transicoes[f].get(caractere, 0)
+                self._falha[filho] = alvo
+                self._saida_link[filho] = (
+                    alvo if self._saida[alvo] is not None else self._saida_link[alvo]
+                )
+        self._construido = True
+
+    def buscar(self, texto: str, manter_sobrepostas: bool = False) -> List[Ocorrencia]:
+        """
+        Retorna as ocorrências delimitadas por fronteira de palavra, em ordem
+        de posição no texto.
+
+        Por padrão, quando duas ocorrências se sobrepõem, mantém apenas a
+        mais longa (ex.: "sao jose dos campos" descarta "campos").
+        """
+        if not self._construido:
+            self.construir()
+
+        transicoes = self._transicoes
+        falha = self._falha
+        saida = self._saida
+        saida_link = self._saida_link
+        prefixo = self._prefixo
+
+        encontradas: List[Ocorrencia] = []
+        no = 0
+        for i, caractere in enumerate(texto):
+            while no and caractere not in transicoes[no]:
+                no = falha[no]
+            no = transicoes[no].get(caractere, 0)
+
+            terminal = no if saida[no] is not None else saida_link[no]
+            while terminal > 0:
+                padrao = cast(str, saida[terminal])
+                fim = i + 1
+                inicio = fim - len(padrao)
+                if fronteira(texto, inicio) and (
+                    prefixo[terminal] or fronteira(texto, fim)
+                ):
+                    encontradas.append(Ocorrencia(inicio, fim, padrao))
+                terminal = saida_link[terminal]
+
+        if manter_sobrepostas or len(encontradas) < 2:
+            return sorted(encontradas)
+        return maiores_sem_sobreposicao(encontradas)
+
+
+def maiores_sem_sobreposicao(ocorrencias: List[Ocorrencia]) -> List[Ocorrencia]:
+    # Guloso: mais longa primeiro, empate pela mais à esquerda
+    aceitas: List[Ocorrencia] = []
+    for oc in sorted(ocorrencias, key=lambda o: (o.inicio - o.fim, o.inicio)):
+        if all(oc.fim <= a.inicio or oc.inicio >= a.fim for a in aceitas):
+            aceitas.append(oc)
+    return sorted(aceitas)
@@ -0,0 +1,482 @@
+# chatbot-llm/backend/utils/cache_llm.py
+from __future__ import annotations
+
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from config.config import (
+    LLM_CACHE_L1_MB,
+    LLM_CACHE_LEGACY_DIR,
+    LLM_CACHE_MAX_MB,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    criado REAL NOT NULL,
+    acesso REAL NOT NULL,
+    expira REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entradas_acesso ON entradas (acesso);
+CREATE INDEX IF NOT EXISTS entradas_expira ON entradas (expira);
+-- total de bytes mantido por gatilhos (vale entre processos): a evicção só
+-- percorre a tabela quando o total passa do limite
+CREATE TABLE IF NOT EXISTS totais (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+BEGIN IMMEDIATE;
+CREATE TRIGGER IF NOT EXISTS entradas_inseridas AFTER INSERT ON entradas
+BEGIN
+    UPDATE totais SET bytes = bytes + NEW.bytes WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entradas_removidas AFTER DELETE ON entradas
+BEGIN
+    UPDATE totais SET bytes = bytes - OLD.bytes WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entradas_alteradas AFTER UPDATE OF bytes ON entradas
+BEGIN
+    UPDATE totais SET bytes = bytes + NEW.bytes - OLD.bytes WHERE id = 1;
+END;
+-- arquivo criado antes dos gatilhos: total inicial pela soma, uma única vez
+INSERT INTO totais (id, bytes)
+SELECT 1, (SELECT COALESCE(SUM(bytes), 0) FROM entradas)
+WHERE NOT EXISTS (SELECT 1 FROM totais);
+COMMIT;
+"""
+
+# Upsert (não INSERT OR REPLACE: a troca por REPLACE não dispara os gatilhos)
+_GRAVACAO = """
+INSERT INTO entradas VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (chave) DO UPDATE SET
+    valor = excluded.valor,
+    bytes = excluded.bytes,
+    criado = excluded.criado,
+    acesso = excluded.acesso,
+    expira = excluded.expira
+"""
+
+# Remove as entradas menos usadas cuja soma acumulada passa do limite
+_EVICCAO = """
+DELETE FROM entradas WHERE chave IN (
+    SELECT chave FROM (
+        SELECT chave, SUM(bytes) OVER (ORDER BY acesso DESC, chave) AS acumulado
+        FROM entradas
+    ) WHERE acumulado > ?
+)
+"""
+
+
+class BackendCache(Protocol):
+    """Interface comum dos caches de respostas do LLM (chave → texto)."""
+
+    def obter(self, chave: str) -> Optional[str]: ...
+
+    def obter_com_camada(self, chave: str) -> Tuple[Optional[str], Optional[str]]:
+        """Valor e a camada que respondeu ("l1" | "sqlite"; None no miss)."""
+        ...
+
+    def obter_com_expiracao(self, chave: str) -> Tuple[Optional[str], Optional[float]]:
+        """Valor e o instante (epoch) em que expira (None: sem TTL)."""
+        ...
+
+    def registrar_acesso(self, chave: str) -> None:
+        """Leitura atendida por uma camada à frente (conta para o LRU)."""
+        ...
+
+    def guardar(self, chave: str, valor: str, ttl: Optional[float] = None) -> None: ...
+
+    def remover(self, chave: str) -> None: ...
+
+    def limpar(self) -> None: ...
+
+    def estatisticas(self) -> Dict[str, Any]: ...
+
+
+class CacheSQLite:
+    """
+    Cache persistente em um único arquivo SQLite (modo WAL).
+
+    Leitura = uma consulta pela chave primária. Escritas são transações
+    atômicas, seguras entre processos; a cada escrita, entradas expiradas
+    saem e, se o total (mantido no próprio arquivo) passar de `max_bytes`,
+    as menos acessadas (LRU). Os acessos de
+    leitura são acumulados em memória e gravados junto com a próxima escrita,
+    para que uma leitura não vire escrita.
+    """
+
+    def __init__(
+        self,
+        caminho: Path = LLM_CACHE_PATH,
+        max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024,
+        ttl_segundos: Optional[float] = LLM_CACHE_TTL_SECONDS or None,
+    ) -> None:
+        self.caminho = Path(caminho)
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._acessos: Dict[str, float] = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.escritas = 0
+        self.bytes_lidos = 0
+        self.bytes_escritos = 0
+        with self._conexao() as con:
+            con.executescript(_ESQUEMA)
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Uma conexão por thread; o SQLite cuida da concorrência entre processos
+        con: Optional[sqlite3.Connection] = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def obter(self, chave: str) -> Optional[str]:
+        return self.obter_com_expiracao(chave)[0]
+
+    def obter_com_expiracao(self, chave: str) -> Tuple[Optional[str], Optional[float]]:
+        linha = (
+            self._conexao()
+            .execute("SELECT valor, expira FROM entradas WHERE chave = ?", (chave,))
+            .fetchone()
+        )
+        agora = time.time()
+        with self._lock:
+            if linha is None:
+                self.falhas += 1
+                return None, None
+            valor, expira = linha
+            if expira is not None and expira <= agora:
+                self.expirados += 1
+                self.falhas += 1
+                return None, None
+            self.acertos += 1
+            self.bytes_lidos += len(valor.encode("utf-8"))
+            self._acessos[chave] = agora
+        return str(valor), expira
+
+    def registrar_acesso(self, chave: str) -> None:
+        # gravado junto com a próxima escrita, como as leituras do próprio disco
+        with self._lock:
+            self._acessos[chave] = time.time()
+
+    def obter_com_camada(self, chave: str) -> Tuple[Optional[str], Optional[str]]:
+        valor = self.obter(chave)
+        return valor, "sqlite" if valor is not None else None
+
+    def _pendentes(self) -> List[Tuple[float, str]]:
+        with self._lock:
+            acessos, self._acessos = self._acessos, {}
+        return [(quando, chave) for chave, quando in acessos.items()]
+
+    def guardar(self, chave: str, valor: str, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl_segundos
+        agora = time.time()
+        tamanho = len(valor.encode("utf-8"))
+        con = self._conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.executemany(
+                "UPDATE entradas SET acesso = ? WHERE chave = ?", self._pendentes()
+            )
+            con.execute(
+                _GRAVACAO,
+                (chave, valor, tamanho, agora, agora, agora + ttl if ttl else None),
+            )
+            con.execute(
+                "DELETE FROM entradas WHERE expira IS NOT NULL AND expira <= ?",
+                (agora,),
+            )
+            self._despejar(con)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.escritas += 1
+            self.bytes_escritos += tamanho
+
+    def _despejar(self, con: sqlite3.Connection) -> None:
+        # dentro da transação de escrita
+        (total,) = con.execute("SELECT bytes FROM totais").fetchone()
+        if total > self.max_bytes:
+            con.execute(_EVICCAO, (self.max_bytes,))
+
+    def remover(self, chave: str) -> None:
+        self._conexao().execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+
+    def limpar(self) -> None:
+        self._conexao().execute("DELETE FROM entradas")
+        with self._lock:
+            self._acessos.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        itens, total = (
+            self._conexao()
+            .execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entradas")
+            .fetchone()
+        )
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "backend": "sqlite",
+                "caminho": str(self.caminho),
+                "itens": itens,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_segundos": self.ttl_segundos,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "expirados": self.expirados,
+                "escritas": self.escritas,
+                "bytes_lidos": self.bytes_lidos,
+                "bytes_escritos": self.bytes_escritos,
+            }
+
+    def migrar_diretorio(self, diretorio: Path) -> int:
+        """
+        Importa o cache antigo (um `<sha256>.json` por resposta) e apaga os
+        arquivos importados. Arquivos ilegíveis ficam onde estão.
+        """
+        arquivos = sorted(Path(diretorio).glob("*.json"))
+        if not arquivos:
+            return 0
+        agora = time.time()
+        expira = agora + self.ttl_segundos if self.ttl_segundos else None
+        linhas: List[Tuple[str, str, int, float, float, Optional[float]]] = []
+        importados: List[Path] = []
+        for arquivo in arquivos:
+            try:
+                resposta = json.loads(arquivo.read_text(encoding="utf-8"))["resposta"]
+                # mais antigos primeiro no LRU, pela data de modificação (outro
+                # processo migrando ao mesmo tempo pode já ter apagado o arquivo)
+                acesso = arquivo.stat().st_mtime
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"⚠️ Cache antigo ignorado ({arquivo.name}): {e}")
+                continue
+            if not isinstance(resposta, str):
+                continue
+            tamanho = len(resposta.encode("utf-8"))
+            linhas.append((arquivo.stem, resposta, tamanho, acesso, acesso, expira))
+            importados.append(arquivo)
+
+        con = self._conexao()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.executemany(
+                "INSERT OR IGNORE INTO entradas VALUES (?, ?, ?, ?, ?, ?)", linhas
+            )
+            self._despejar(con)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+        for arquivo in importados:
+            arquivo.unlink(missing_ok=True)
+        try:
+            Path(diretorio).rmdir()
+        except OSError:
+            pass  # sobrou algo (arquivos ilegíveis ou de outra origem)
+        logger.info(f"📦 {len(importados)} respostas migradas de {diretorio}.")
+        return len(importados)
+
+
+class CacheEmCamadas:
+    """
+    L1 em memória (LRU limitado em bytes) na frente de um cache persistente.
+
+    Acertos no disco são promovidos ao L1 com a mesma expiração do disco.
+    Escritas entram no L1 na hora e vão para o disco por uma thread
+    (write-behind): a requisição nunca espera o disco. `descarregar()`
+    aguarda as escritas pendentes. Acertos no L1 são repassados ao disco
+    para que o LRU de lá não despeje justamente as respostas mais lidas.
+    """
+
+    def __init__(
+        self, disco: BackendCache, max_bytes: int = LLM_CACHE_L1_MB * 1024 * 1024
+    ) -> None:
+        self.disco = disco
+        self.max_bytes = max_bytes
+        # chave → (valor, expira em epoch ou None)
+        self._itens: OrderedDict[str, Tuple[str, Optional[float]]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._fila: queue.Queue[Tuple[str, str, Optional[float]]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.acertos_l1 = 0
+        self.expirados_l1 = 0
+        self.promocoes = 0
+        self.falhas_escrita = 0
+
+    @staticmethod
+    def _tamanho(chave: str, valor: str) -> int:
+        return len(chave) + len(valor.encode("utf-8"))
+
+    def _remover_l1(self, chave: str) -> None:
+        # chamado com o lock adquirido
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self._bytes -= self._tamanho(chave, item[0])
+
+    def _inserir_l1(self, chave: str, valor: str, expira: Optional[float]) -> None:
+        # chamado com o lock adquirido
+        self._remover_l1(chave)
+        tamanho = self._tamanho(chave, valor)
+        if tamanho > self.max_bytes:
+            return
+        self._itens[chave] = (valor, expira)
+        self._bytes += tamanho
+        while self._bytes > self.max_bytes:
+            velha, (removido, _) = self._itens.popitem(last=False)
+            self._bytes -= self._tamanho(velha, removido)
+
+    def obter(self, chave: str) -> Optional[str]:
+        return self.obter_com_camada(chave)[0]
+
+    def obter_com_expiracao(self, chave: str) -> Tuple[Optional[str], Optional[float]]:
+        valor, expira, _ = self._obter(chave)
+        return valor, expira
+
+    def obter_com_camada(self, chave: str) -> Tuple[Optional[str], Optional[str]]:
+        valor, _, camada = self._obter(chave)
+        return valor, camada
+
+    def _obter(
+        self, chave: str
+    ) -> Tuple[Optional[str], Optional[float], Optional[str]]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[1] is not None and item[1] <= time.time():
+                # expirada: miss no L1 (o disco também já a descarta)
+                self._remover_l1(chave)
+                self.expirados_l1 += 1
+                item = None
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos_l1 += 1
+        if item is not None:
+            self.disco.registrar_acesso(chave)
+            return item[0], item[1], "l1"
+
+        valor_disco, expira_disco = self.disco.obter_com_expiracao(chave)
+        if valor_disco is None:
+            return None, None, None
+        with self._lock:
+            self._inserir_l1(chave, valor_disco, expira_disco)
+            self.promocoes += 1
+        return valor_disco, expira_disco, "sqlite"
+
+    def registrar_acesso(self, chave: str) -> None:
+        self.disco.registrar_acesso(chave)
+
+    def _escrever(self) -> None:
+        while True:
+            chave, valor, ttl = self._fila.get()
+            try:
+                self.disco.guardar(chave, valor, ttl)
+            except Exception as e:
+                self.falhas_escrita += 1
+                logger.warning(f"⚠️ Erro ao gravar resposta no cache em disco: {e}")
+            finally:
+                self._fila.task_done()
+
+    def guardar(self, chave: str, valor: str, ttl: Optional[float] = None) -> None:
+        # mesmo TTL que o disco vai aplicar (o padrão dele quando None)
+        ttl = ttl if ttl is not None else getattr(self.disco, "ttl_segundos", None)
+        expira = time.time() + ttl if ttl else None
+        with self._lock:
+            self._inserir_l1(chave, valor, expira)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._escrever, name="cache-llm-escrita", daemon=True
+                )
+                self._thread.start()
+        self._fila.put((chave, valor, ttl))
+
+    def descarregar(self) -> None:
+        """Espera as escritas pendentes chegarem ao disco."""
+        if self._thread is not None:
+            self._fila.join()
+
+    def remover(self, chave: str) -> None:
+        self.descarregar()
+        with self._lock:
+            self._remover_l1(chave)
+        self.disco.remover(chave)
+
+    def limpar(self) -> None:
+        self.descarregar()
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+        self.disco.limpar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        disco = self.disco.estatisticas()
+        with self._lock:
+            l1 = {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos_l1,
+                "expirados": self.expirados_l1,
+                "promocoes": self.promocoes,
+                "escritas_pendentes": self._fila.qsize(),
+                "falhas_escrita": self.falhas_escrita,
+            }
+        # toda consulta passa pelo L1; só as que ele não atende chegam ao disco
+        acertos = l1["acertos"] + disco["acertos"]
+        consultas = acertos + disco["falhas"]
+        return {
+            **disco,
+            "acertos": acertos,
+            "taxa_acerto": round(acertos / consultas, 4) if consultas else 0.0,
+            "acertos_disco": disco["acertos"],
+            "taxa_acerto_disco": disco["taxa_acerto"],
+            "l1": l1,
+        }
+
+
+_cache: Optional[BackendCache] = None
+_lock_cache = threading.Lock()
+
+
+def obter_cache_llm() -> BackendCache:
+    """Cache de respostas do LLM do processo (criado e migrado no 1º uso)."""
+    global _cache
+    if _cache is None:
+        with _lock_cache:
+            if _cache is None:
+                disco = CacheSQLite()
+                if LLM_CACHE_LEGACY_DIR.is_dir():
+                    disco.migrar_diretorio(LLM_CACHE_LEGACY_DIR)
+                if LLM_CACHE_L1_MB > 0:
+                    camadas = CacheEmCamadas(disco)
+                    # não perde respostas ainda na fila ao encerrar o processo
+                    atexit.register(camadas.descarregar)
+                    _cache = camadas
+                else:
+                    _cache = disco
+    return _cache
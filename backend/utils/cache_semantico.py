@@ -0,0 +1,210 @@
+# chatbot-llm/backend/utils/cache_semantico.py
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from config.config import (
+    LOGS_DIR,
+    SEMANTIC_CACHE_MAX_BUCKETS,
+    SEMANTIC_CACHE_MAX_PER_BUCKET,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+from config.dicionarios import DIRECAO_POR_TERMO
+from core.router.semantic_metric import extrair_metricas
+from utils.logger import get_logger
+from utils.model_provider import modelo_cidades
+from utils.parser import normalizar
+
+logger = get_logger(__name__)
+
+AUDITORIA_PATH = LOGS_DIR / "cache_semantico.jsonl"
+
+# Métricas citadas e direção da comparação ("maior"/"menor")
+Assinatura = Tuple[FrozenSet[str], FrozenSet[str]]
+
+
+def assinatura(pergunta: str, metricas: Optional[Iterable[str]] = None) -> Assinatura:
+    """
+    O que o cosseno não separa: "maior PIB" e "menor PIB" sobre a mesma
+    tabela ficam muito próximas. Só há reuso entre perguntas com as mesmas
+    métricas e a mesma direção. `metricas`: colunas já extraídas pela
+    análise da pergunta (sem elas, extrai de novo).
+    """
+    if metricas is None:
+        metricas = (m.coluna for m in extrair_metricas(pergunta))
+    palavras = re.findall(r"\w+", normalizar(pergunta))
+    direcoes = frozenset(
+        DIRECAO_POR_TERMO[p] for p in palavras if p in DIRECAO_POR_TERMO
+    )
+    return frozenset(metricas), direcoes
+
+
+class PerguntaCacheada(NamedTuple):
+    pergunta: str
+    chave: str  # chave exata da resposta no cache do LLM
+    embedding: np.ndarray
+    assinatura: Assinatura
+
+
+class BuscaSemantica(NamedTuple):
+    chave: Optional[str]  # resposta reaproveitável (None: chamar o LLM)
+    similaridade: float
+    embedding: Optional[np.ndarray]  # da pergunta atual, para `registrar`
+
+
+def _logger_auditoria() -> logging.Logger:
+    # Uma decisão por linha (JSON), em arquivo próprio com rotação
+    auditoria = logging.getLogger("auditoria.cache_semantico")
+    if not auditoria.handlers:
+        handler = RotatingFileHandler(
+            str(AUDITORIA_PATH),
+            maxBytes=5 * 1024 * 1024,
+            backupCount=3,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        auditoria.addHandler(handler)
+        auditoria.setLevel(logging.INFO)
+        auditoria.propagate = False
+    return auditoria
+
+
+class CacheSemantico:
+    """
+    Reaproveita respostas para paráfrases sobre exatamente os mesmos dados.
+
+    As perguntas já respondidas são agrupadas em baldes pelo hash dos dados
+    (template + tabela + fontes); dentro do balde, a pergunta nova é comparada
+    por cosseno com as anteriores usando o modelo local, mas só com as de
+    mesma `assinatura` (métricas e direção). Acima do limiar, a resposta da
+    mais parecida é reutilizada. Toda decisão vai para a auditoria.
+    """
+
+    def __init__(
+        self,
+        limiar: float = SEMANTIC_CACHE_THRESHOLD,
+        max_baldes: int = SEMANTIC_CACHE_MAX_BUCKETS,
+        max_por_balde: int = SEMANTIC_CACHE_MAX_PER_BUCKET,
+    ) -> None:
+        self.limiar = limiar
+        self.max_baldes = max_baldes
+        self.max_por_balde = max_por_balde
+        self._baldes: OrderedDict[str, List[PerguntaCacheada]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.reusos = 0
+        self.recusas = 0
+        self.assinatura_diferente = 0
+        self.sem_modelo = 0
+
+    def _auditar(self, decisao: str, **campos: Any) -> None:
+        registro = {"ts": round(time.time(), 3), "decisao": decisao, **campos}
+        _logger_auditoria().info(json.dumps(registro, ensure_ascii=False))
+
+    def buscar(
+        self, pergunta: str, balde: str, metricas: Optional[Iterable[str]] = None
+    ) -> BuscaSemantica:
+        modelo_local = modelo_cidades.obter()
+        if modelo_local is None:
+            with self._lock:
+                self.sem_modelo += 1
+            return BuscaSemantica(None, 0.0, None)
+
+        embedding = np.asarray(
+            modelo_local.encode(normalizar(pergunta), normalize_embeddings=True),
+            dtype=np.float32,
+        )
+        with self._lock:
+            no_balde = list(self._baldes.get(balde, ()))
+            if no_balde:
+                self._baldes.move_to_end(balde)
+        if not no_balde:
+            return BuscaSemantica(None, 0.0, embedding)
+
+        atual = assinatura(pergunta, metricas)
+        candidatas = [c for c in no_balde if c.assinatura == atual]
+        if not candidatas:
+            with self._lock:
+                self.assinatura_diferente += 1
+            self._auditar(
+                "assinatura_diferente",
+                balde=balde[:16],
+                pergunta=pergunta,
+                metricas=sorted(atual[0]),
+                direcoes=sorted(atual[1]),
+            )
+            return BuscaSemantica(None, 0.0, embedding)
+
+        sims = np.stack([c.embedding for c in candidatas]) @ embedding
+        melhor = int(np.argmax(sims))
+        similaridade = float(sims[melhor])
+        escolhida = candidatas[melhor]
+        reuso = similaridade >= self.limiar
+        with self._lock:
+            if reuso:
+                self.reusos += 1
+            else:
+                self.recusas += 1
+        self._auditar(
+            "reuso" if reuso else "abaixo_do_limiar",
+            balde=balde[:16],
+            pergunta=pergunta,
+            pergunta_cacheada=escolhida.pergunta,
+            similaridade=round(similaridade, 4),
+            limiar=self.limiar,
+        )
+        if reuso:
+            logger.info(
+                f"♻️ Resposta reaproveitada por similaridade {similaridade:.3f}: "
+                f"'{escolhida.pergunta}'"
+            )
+            return BuscaSemantica(escolhida.chave, similaridade, embedding)
+        return BuscaSemantica(None, similaridade, embedding)
+
+    def registrar(
+        self,
+        pergunta: str,
+        balde: str,
+        chave: str,
+        embedding: np.ndarray,
+        metricas: Optional[Iterable[str]] = None,
+    ) -> None:
+        atual = assinatura(pergunta, metricas)
+        with self._lock:
+            perguntas = self._baldes.setdefault(balde, [])
+            self._baldes.move_to_end(balde)
+            perguntas.append(PerguntaCacheada(pergunta, chave, embedding, atual))
+            del perguntas[: -self.max_por_balde]
+            while len(self._baldes) > self.max_baldes:
+                self._baldes.popitem(last=False)
+
+    def esquecer(self, balde: str, chave: str) -> None:
+        """Remove uma pergunta cuja resposta não está mais no cache do LLM."""
+        with self._lock:
+            perguntas = self._baldes.get(balde)
+            if perguntas:
+                perguntas[:] = [p for p in perguntas if p.chave != chave]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limiar": self.limiar,
+                "baldes": len(self._baldes),
+                "perguntas": sum(len(p) for p in self._baldes.values()),
+                "reusos": self.reusos,
+                "abaixo_do_limiar": self.recusas,
+                "assinatura_diferente": self.assinatura_diferente,
+                "sem_modelo": self.sem_modelo,
+                "auditoria": str(AUDITORIA_PATH),
+            }
+
+
+cache_semantico = CacheSemantico()
@@ -0,0 +1,198 @@
+# chatbot-llm/backend/utils/chamada_unica.py
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _Voo(Generic[T]):
+    def __init__(self) -> None:
+        self.concluido = threading.Event()
+        self.resultado: Optional[T] = None
+        self.erro: Optional[BaseException] = None
+        self.aguardando = 0
+        self.abandonado = False  # transmissão do líder interrompida
+
+
+class ChamadaUnica(Generic[T]):
+    """
+    Single-flight: chamadas simultâneas com a mesma chave executam a função
+    uma única vez. A primeira thread (líder) executa; as demais esperam e
+    recebem o mesmo resultado ou a mesma exceção. Quem espera além de
+    `timeout` recebe TimeoutError, sem afetar o líder.
+
+    `executar_em_partes` é a versão para geradores (streaming): o líder
+    repassa as partes à medida que saem e quem espera recebe o resultado
+    final de uma vez. Coalesce com `executar` pela mesma chave.
+
+    `aexecutar` é o equivalente para corrotinas (espera sem bloquear o
+    event loop). A função roda numa tarefa própria: se a requisição líder for
+    cancelada (cliente desconectou), a chamada continua e quem espera recebe
+    o resultado. Chamadas síncronas e assíncronas não se coalescem entre si.
+    """
+
+    def __init__(self, nome: str, timeout: Optional[float] = None) -> None:
+        self.nome = nome
+        self.timeout = timeout
+        self._voos: Dict[str, _Voo[T]] = {}
+        self._voos_async: Dict[str, asyncio.Future[T]] = {}
+        self._lock = threading.Lock()
+        self.lideres = 0
+        self.coalescidas = 0
+        self.timeouts = 0
+
+    def _entrar(self, chave: str) -> Tuple[_Voo[T], bool]:
+        with self._lock:
+            voo = self._voos.get(chave)
+            if voo is None:
+                voo = self._voos[chave] = _Voo()
+                self.lideres += 1
+                return voo, True
+            voo.aguardando += 1
+            self.coalescidas += 1
+            return voo, False
+
+    def _esperar(self, voo: _Voo[T]) -> bool:
+        """True com o resultado pronto; False se o líder abandonou a chamada."""
+        logger.debug(f"🛬 '{self.nome}': aguardando chamada em andamento.")
+        if not voo.concluido.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(
+                f"Chamada '{self.nome}' em andamento não terminou em "
+                f"{self.timeout}s."
+            )
+        if voo.erro is not None:
+            raise voo.erro
+        return not voo.abandonado
+
+    def _encerrar(self, chave: str, voo: _Voo[T]) -> None:
+        with self._lock:
+            del self._voos[chave]
+        voo.concluido.set()
+        if voo.aguardando and not voo.abandonado:
+            logger.info(
+                f"🛫 '{self.nome}': 1 chamada atendeu {voo.aguardando + 1} "
+                "requisições simultâneas."
+            )
+
+    def executar(self, chave: str, funcao: Callable[[], T]) -> T:
+        while True:
+            voo, lider = self._entrar(chave)
+            if lider:
+                break
+            if self._esperar(voo):
+                return voo.resultado  # type: ignore[return-value]
+            # líder abandonou a transmissão: tenta de novo (talvez como líder)
+
+        try:
+            voo.resultado = funcao()
+            return voo.resultado
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            self._encerrar(chave, voo)
+
+    def executar_em_partes(
+        self,
+        chave: str,
+        funcao: Callable[[], Generator[T, None, None]],
+        juntar: Callable[[List[T]], T],
+    ) -> Iterator[T]:
+        """
+        O líder repassa as partes de `funcao()` e publica `juntar(partes)`;
+        quem espera recebe esse resultado numa parte só. Se o consumidor do
+        líder abandonar o gerador, quem espera tenta de novo.
+        """
+        while True:
+            voo, lider = self._entrar(chave)
+            if lider:
+                break
+            if self._esperar(voo):
+                yield voo.resultado  # type: ignore[misc]
+                return
+
+        partes: List[T] = []
+        gerador = funcao()
+        try:
+            for parte in gerador:
+                partes.append(parte)
+                yield parte
+            voo.resultado = juntar(partes)
+        except GeneratorExit:
+            voo.abandonado = True
+            raise
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            gerador.close()
+            self._encerrar(chave, voo)
+
+    async def aexecutar(self, chave: str, funcao: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            tarefa = self._voos_async.get(chave)
+            lider = tarefa is None
+            if tarefa is None:
+                # a chamada roda numa tarefa que não pertence a nenhuma
+                # requisição: cancelar o líder não derruba quem espera
+                tarefa = asyncio.ensure_future(funcao())
+                self._voos_async[chave] = tarefa
+                tarefa.add_done_callback(
+                    lambda concluida: self._encerrar_async(chave, concluida)
+                )
+                self.lideres += 1
+            else:
+                self.coalescidas += 1
+
+        if lider:
+            return await asyncio.shield(tarefa)
+
+        logger.debug(f"🛬 '{self.nome}': aguardando chamada em andamento.")
+        try:
+            # shield: o timeout de quem espera não cancela a chamada
+            return await asyncio.wait_for(asyncio.shield(tarefa), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(
+                f"Chamada '{self.nome}' em andamento não terminou em "
+                f"{self.timeout}s."
+            ) from None
+
+    def _encerrar_async(self, chave: str, tarefa: asyncio.Future[T]) -> None:
+        with self._lock:
+            if self._voos_async.get(chave) is tarefa:
+                del self._voos_async[chave]
+        if not tarefa.cancelled():
+            tarefa.exception()  # sem aviso de exceção não lida se ninguém esperava
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "em_andamento": len(self._voos) + len(self._voos_async),
+                "lideres": self.lideres,
+                "coalescidas": self.coalescidas,
+                "timeouts": self.timeouts,
+                "timeout_segundos": self.timeout,
+            }
@@ -1,5 +1,5 @@
 # chatbot-llm/backend/utils/embedder.py
-from typing import Any
+from typing import Any, List
 from pinecone import Pinecone, Index
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.embeddings import Embeddings
@@ -10,16 +10,45 @@ from config.config import (
     PINECONE_API_KEY,
     PINECONE_INDEX,
     EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
 )
 from utils.logger import get_logger
+from utils.onnx_encoder import criar_encoder
 
 logger = get_logger(__name__)
 
 
+class EmbeddingsLocais(Embeddings):  # type: ignore[misc]
+    """
+    Adapta um encoder com `.encode()` (ONNX ou SentenceTransformer) à
+    interface de embeddings do LangChain.
+    """
+
+    def __init__(self, encoder: Any) -> None:
+        self.encoder = encoder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        emb = self.encoder.encode(texts, normalize_embeddings=True)
+        return [list(map(float, vetor)) for vetor in emb]
+
+    def embed_query(self, text: str) -> List[float]:
+        return list(map(float, self.encoder.encode(text, normalize_embeddings=True)))
+
+
 def get_embedder() -> Embeddings:
     """
     Inicializa o embedder HuggingFace para português-inglês.
+    Com EMBEDDING_BACKEND=onnx | onnx-int8, usa o encoder via onnxruntime.
     """
+    if EMBEDDING_BACKEND != "torch" and EMBEDDING_MODEL:
+        try:
+            encoder = criar_encoder(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+            logger.info(f"✅ Embedder local ({type(encoder).__name__}) carregado.")
+            return EmbeddingsLocais(encoder)
+        except Exception as e:
+            logger.critical(f"❌ Erro ao carregar embedder {EMBEDDING_BACKEND}: {e}")
+            raise RuntimeError(f"Falha ao inicializar o modelo de embeddings: {e}")
+
     try:
         logger.debug(
             f"🧠 Carregando modelo de embeddings HuggingFace: {EMBEDDING_MODEL}"
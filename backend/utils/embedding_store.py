@@ -0,0 +1,253 @@
+# chatbot-llm/backend/utils/embedding_store.py
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# === Formato em disco ===
+# [cabeçalho 128B][vetores][escala+deslocamento (int8)][offsets nomes][nomes utf-8]
+# Todos os blocos alinhados em 64 bytes para permitir np.memmap direto.
+MAGIC = b"CTEMB\x00\x00\x01"
+VERSAO = 1
+_CABECALHO = struct.Struct("<8sHHII5Q32s")
+_TAM_CABECALHO = 128
+_ALINHAMENTO = 64
+
+PRECISOES = {"float32": 0, "float16": 1, "int8": 2}
+_DTYPES = {0: np.float32, 1: np.float16, 2: np.int8}
+
+# linhas por bloco ao converter para float32 durante o produto
+_BLOCO = 4096
+
+
+def impressao_digital(modelo: str, dim: int) -> bytes:
+    """Fingerprint do modelo que gerou os vetores (nome + dimensão)."""
+    return hashlib.sha256(f"{modelo}|{dim}|normalized".encode("utf-8")).digest()
+
+
+def _alinhar(pos: int) -> int:
+    return (pos + _ALINHAMENTO - 1) // _ALINHAMENTO * _ALINHAMENTO
+
+
+class MatrizEmbeddings:
+    """
+    Matriz (n, dim) possivelmente quantizada, lida direto do memmap.
+
+    Para int8, cada dimensão d é reconstruída como `q[:, d] * escala[d] +
+    deslocamento[d]`; o produto com a consulta é feito sem materializar a
+    matriz em float32: `q @ (escala * c) + deslocamento @ c`.
+    """
+
+    def __init__(
+        self,
+        dados: np.ndarray,
+        escala: Optional[np.ndarray] = None,
+        deslocamento: Optional[np.ndarray] = None,
+    ) -> None:
+        self.dados = dados
+        self.escala = escala
+        self.deslocamento = deslocamento
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(self.dados.shape)
+
+    @property
+    def nbytes(self) -> int:
+        extra = 0 if self.escala is None else self.escala.nbytes * 2
+        return int(self.dados.nbytes) + extra
+
+    def __len__(self) -> int:
+        return len(self.dados)
+
+    def __getitem__(self, linhas: Any) -> MatrizEmbeddings:
+        return MatrizEmbeddings(self.dados[linhas], self.escala, self.deslocamento)
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        return (
+            self.para_float32() if dtype is None else self.para_float32().astype(dtype)
+        )
+
+    def para_float32(self) -> np.ndarray:
+        vetores = np.asarray(self.dados, dtype=np.float32)
+        if self.escala is not None and self.deslocamento is not None:
+            vetores = vetores * self.escala + self.deslocamento
+        return vetores
+
+    def __matmul__(self, outro: np.ndarray) -> np.ndarray:
+        outro = np.asarray(outro, dtype=np.float32)
+        if self.escala is not None and self.deslocamento is not None:
+            ajustado = outro * (
+                self.escala if outro.ndim == 1 else self.escala[:, None]
+            )
+            base = self.deslocamento @ outro
+        else:
+            ajustado, base = outro, None
+
+        if self.dados.dtype == np.float32:
+            scores = np.asarray(self.dados @ ajustado)
+        else:
+            # converte em blocos para não alocar a matriz inteira em float32
+            partes = [
+                np.asarray(self.dados[i : i + _BLOCO], dtype=np.float32) @ ajustado
+                for i in range(0, len(self.dados), _BLOCO)
+            ]
+            if partes:
+                scores = np.concatenate(partes)
+            else:
+                scores = np.empty((0,) + ajustado.shape[1:], dtype=np.float32)
+        return scores + base if base is not None else scores
+
+
+class EmbeddingsCidades:
+    """Store aberto: nomes decodificados + vetores em memmap (zero-copy)."""
+
+    def __init__(
+        self, nomes: List[str], vetores: MatrizEmbeddings, precisao: str
+    ) -> None:
+        self.nomes = nomes
+        self.vetores = vetores
+        self.precisao = precisao
+
+
+def quantizar(
+    emb: np.ndarray, precisao: str
+) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """Converte float32 para a precisão pedida (int8 com escala+deslocamento)."""
+    emb = np.asarray(emb, dtype=np.float32)
+    if precisao == "float32":
+        return emb, None, None
+    if precisao == "float16":
+        return emb.astype(np.float16), None, None
+    if precisao == "int8":
+        minimo = emb.min(axis=0) if len(emb) else np.zeros(emb.shape[1], np.float32)
+        maximo = emb.max(axis=0) if len(emb) else np.ones(emb.shape[1], np.float32)
+        escala = np.maximum((maximo - minimo) / 255.0, 1e-12).astype(np.float32)
+        deslocamento = (minimo + 128.0 * escala).astype(np.float32)
+        q = np.clip(np.round((emb - deslocamento) / escala), -128, 127)
+        return q.astype(np.int8), escala, deslocamento
+    raise ValueError(f"Precisão de embeddings desconhecida: {precisao}")
+
+
+def salvar_embeddings(
+    path: Union[str, Path],
+    nomes: Sequence[str],
+    emb: np.ndarray,
+    modelo: str,
+    precisao: str = "float32",
+) -> None:
+    """
+    Grava o store de forma atômica (arquivo temporário + os.replace).
+    """
+    if precisao not in PRECISOES:
+        raise ValueError(f"Precisão de embeddings desconhecida: {precisao}")
+
+    emb = np.asarray(emb, dtype=np.float32)
+    if emb.ndim != 2 or len(emb) != len(nomes):
+        raise ValueError("Embeddings devem ser uma matriz (n_nomes, dim).")
+    n, dim = emb.shape
+    dados, escala, deslocamento = quantizar(emb, precisao)
+
+    nomes_bytes = [nome.encode("utf-8") for nome in nomes]
+    offsets = np.zeros(n + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(b) for b in nomes_bytes], dtype=np.uint64)
+    blob = b"".join(nomes_bytes)
+
+    off_vetores = _alinhar(_TAM_CABECALHO)
+    off_quant = _alinhar(off_vetores + dados.nbytes)
+    tam_quant = 0 if escala is None else dim * 4 * 2
+    off_offsets = _alinhar(off_quant + tam_quant)
+    off_nomes = _alinhar(off_offsets + offsets.nbytes)
+
+    cabecalho = _CABECALHO.pack(
+        MAGIC,
+        VERSAO,
+        PRECISOES[precisao],
+        n,
+        dim,
+        off_vetores,
+        off_quant,
+        off_offsets,
+        off_nomes,
+        len(blob),
+        impressao_digital(modelo, dim),
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(cabecalho.ljust(_TAM_CABECALHO, b"\x00"))
+        f.seek(off_vetores)
+        f.write(np.ascontiguousarray(dados).tobytes())
+        if escala is not None and deslocamento is not None:
+            f.seek(off_quant)
+            f.write(escala.tobytes())
+            f.write(deslocamento.tobytes())
+        f.seek(off_offsets)
+        f.write(offsets.tobytes())
+        f.seek(off_nomes)
+        f.write(blob)
+    os.replace(tmp, path)
+
+
+def abrir_embeddings(
+    path: Union[str, Path], modelo: Optional[str] = None
+) -> EmbeddingsCidades:
+    """
+    Abre o store via np.memmap. Se `modelo` for informado, valida o
+    fingerprint e levanta ValueError quando o arquivo foi gerado por outro
+    modelo (o chamador deve regenerar).
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        bruto = f.read(_CABECALHO.size)
+    if len(bruto) < _CABECALHO.size:
+        raise ValueError(f"Store de embeddings truncado: {path}")
+
+    (
+        magic,
+        versao,
+        codigo,
+        n,
+        dim,
+        off_vetores,
+        off_quant,
+        off_offsets,
+        off_nomes,
+        tam_nomes,
+        digital,
+    ) = _CABECALHO.unpack(bruto)
+    if magic != MAGIC or versao != VERSAO or codigo not in _DTYPES:
+        raise ValueError(f"Formato de store de embeddings inválido: {path}")
+    if modelo is not None and digital != impressao_digital(modelo, dim):
+        raise ValueError(f"Embeddings em {path} não correspondem ao modelo {modelo}.")
+
+    dtype = _DTYPES[codigo]
+    dados: np.ndarray = (
+        np.memmap(path, dtype=dtype, mode="r", offset=off_vetores, shape=(n, dim))
+        if n
+        else np.empty((0, dim), dtype=dtype)
+    )
+    escala = deslocamento = None
+    if dtype == np.int8:
+        quant = np.fromfile(path, dtype=np.float32, count=dim * 2, offset=off_quant)
+        escala, deslocamento = quant[:dim], quant[dim:]
+
+    offsets = np.fromfile(path, dtype=np.uint64, count=n + 1, offset=off_offsets)
+    with open(path, "rb") as f:
+        f.seek(off_nomes)
+        blob = f.read(tam_nomes)
+    nomes = [
+        blob[int(offsets[i]) : int(offsets[i + 1])].decode("utf-8") for i in range(n)
+    ]
+
+    precisao = next(p for p, c in PRECISOES.items() if c == codigo)
+    return EmbeddingsCidades(
+        nomes, MatrizEmbeddings(dados, escala, deslocamento), precisao
+    )
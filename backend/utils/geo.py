@@ -1,28 +1,85 @@
 # chatbot-llm/backend/utils/geo.py
 import re
-from typing import Optional, cast
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
+from config.dicionarios import ESTADOS
+from utils.aho_corasick import AutomatoAhoCorasick
 from utils.parser import normalizar
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def detectar_uf(texto: str) -> Optional[str]:
-    """
-    Detecta a sigla de UF (estado) a partir de sinônimos ou menções no texto.
-    Retorna a sigla (ex: "SP") ou None se não encontrar.
-    """
-    texto_norm: str = normalizar(texto)
+class MencaoUF(NamedTuple):
+    uf: str
+    termo: str
+    inicio: int  # posições no texto normalizado
+    fim: int
 
-    # importa ESTADOS só quando a função é chamada, quebrando o ciclo
-    from config.dicionarios import ESTADOS
 
+def _compilar_ufs() -> Dict[str, str]:
+    # termo normalizado → sigla (o primeiro estado a declarar o termo vence)
+    ufs: Dict[str, str] = {}
     for sigla, termos in ESTADOS.items():
         for termo in termos:
-            if re.search(rf"\b{re.escape(termo)}\b", texto_norm):
-                logger.debug(f"🌎 UF detectada: {sigla} via termo '{termo}'")
-                return cast(str, sigla)
+            ufs.setdefault(normalizar(termo), sigla)
+    return ufs
+
+
+# Compilado uma vez no import: uma passada por texto, sem laço de regex
+UF_POR_TERMO = _compilar_ufs()
+_automato_ufs = AutomatoAhoCorasick(UF_POR_TERMO)
+
+# Siglas soltas também são palavras comuns ("se", "to", "pa", "es"): só contam
+# logo depois de uma cidade ("campinas sp", "palmas (to)") ou de um conector
+# ("campinas - sp", "campinas/sp", "em se", "de to")
+_CONECTOR_ANTES_SIGLA = re.compile(r"(?:[-/]|\b(?:em|de))\s*$")
+_ENTRE_CIDADE_E_SIGLA = re.compile(r"[\s,(]*")
+
+
+def sigla_em_contexto(
+    texto_norm: str, mencao: MencaoUF, cidades: Sequence[Tuple[int, int]] = ()
+) -> bool:
+    """
+    Nomes de estado valem sempre; a sigla de duas letras só vale ao lado de
+    uma cidade (`cidades`: posições inicio/fim no texto normalizado) ou
+    depois de "-", "/", "em" ou "de".
+    """
+    if len(mencao.termo) > 2:
+        return True
+    if _CONECTOR_ANTES_SIGLA.search(texto_norm, 0, mencao.inicio):
+        return True
+    return any(
+        fim <= mencao.inicio
+        and _ENTRE_CIDADE_E_SIGLA.fullmatch(texto_norm, fim, mencao.inicio)
+        for _, fim in cidades
+    )
+
+
+def detectar_ufs(texto: str) -> List[MencaoUF]:
+    """
+    Todas as menções a UFs (nomes, siglas e sinônimos), em ordem no texto.
+    Termos sobrepostos resolvem pelo mais longo ("rio grande do sul" não
+    gera também "rio grande do norte" nem a sigla de outro estado). Sem
+    posições de cidades, a sigla solta só conta depois de um conector.
+    """
+    texto_norm = normalizar(texto)
+    mencoes = (
+        MencaoUF(UF_POR_TERMO[oc.chave], oc.chave, oc.inicio, oc.fim)
+        for oc in _automato_ufs.buscar(texto_norm)
+    )
+    return [m for m in mencoes if sigla_em_contexto(texto_norm, m)]
+
+
+def detectar_uf(texto: str) -> Optional[str]:
+    """
+    Detecta a sigla de UF (estado) a partir de sinônimos ou menções no texto.
+    Retorna a sigla da primeira menção (ex: "SP") ou None se não encontrar.
+    """
+    mencoes = detectar_ufs(texto)
+    if mencoes:
+        logger.debug(f"🌎 UF detectada: {mencoes[0].uf} via termo '{mencoes[0].termo}'")
+        return mencoes[0].uf
 
     logger.debug("🌎 Nenhuma UF detectada.")
     return None
@@ -0,0 +1,203 @@
+# chatbot-llm/backend/utils/model_provider.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from config.config import (
+    CITY_EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    PERFORMANCE_LEVEL,
+    RESOURCE_RETRY_SECONDS,
+)
+from utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStore
+    from sentence_transformers import SentenceTransformer
+
+    from utils.onnx_encoder import EncoderOnnx
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+PENDENTE = "pendente"
+CARREGANDO = "carregando"
+PRONTO = "pronto"
+DESATIVADO = "desativado"
+ERRO = "erro"
+
+# teto da espera entre tentativas depois de falhas seguidas
+ESPERA_MAXIMA_SEGUNDOS = 600.0
+
+
+class RecursoSobDemanda(Generic[T]):
+    """
+    Recurso caro (modelo, conexão remota) criado uma única vez, sob demanda
+    ou em uma thread de aquecimento, sem bloquear o import dos módulos.
+
+    `obter()` não bloqueia: devolve None enquanto o recurso não está pronto
+    (e dispara o aquecimento). `obter(bloquear=True)` espera a criação.
+    Um erro (rede, download) não é definitivo: passado o intervalo de espera,
+    que dobra a cada falha seguida, o próximo `obter()`/`aquecer()` tenta de
+    novo.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        fabrica: Callable[[], Optional[T]],
+        espera_erro: float = RESOURCE_RETRY_SECONDS,
+    ) -> None:
+        self.nome = nome
+        self._fabrica = fabrica
+        self._valor: Optional[T] = None
+        self.estado = PENDENTE
+        self.erro: Optional[str] = None
+        self.segundos: Optional[float] = None
+        self._lock = threading.Lock()
+        self._lock_thread = threading.Lock()
+        self._concluido = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.espera_erro = espera_erro
+        self.falhas = 0
+        self._proxima_tentativa = 0.0
+
+    @property
+    def pronto(self) -> bool:
+        return self._concluido.is_set() and self.estado == PRONTO
+
+    def _carregar(self) -> None:
+        with self._lock:
+            if self._concluido.is_set():
+                return
+            self.estado = CARREGANDO
+            inicio = time.perf_counter()
+            try:
+                self._valor = self._fabrica()
+                self.estado = PRONTO if self._valor is not None else DESATIVADO
+                self.erro = None
+                self.falhas = 0
+                self.segundos = time.perf_counter() - inicio
+                logger.info(
+                    f"📌 Recurso '{self.nome}' {self.estado} em {self.segundos:.2f}s."
+                )
+            except Exception as e:
+                self.erro = str(e)
+                self.estado = ERRO
+                self.falhas += 1
+                espera = min(
+                    self.espera_erro * 2 ** (self.falhas - 1), ESPERA_MAXIMA_SEGUNDOS
+                )
+                self._proxima_tentativa = time.monotonic() + espera
+                logger.warning(
+                    f"⚠️ Erro ao carregar recurso '{self.nome}': {e} "
+                    f"(nova tentativa em {espera:.0f}s)"
+                )
+            finally:
+                self._concluido.set()
+
+    def _reabrir_apos_erro(self) -> None:
+        # passado o intervalo, libera uma nova tentativa de carregamento
+        if self.estado != ERRO or time.monotonic() < self._proxima_tentativa:
+            return
+        with self._lock_thread:
+            if (
+                self.estado == ERRO
+                and self._concluido.is_set()
+                and time.monotonic() >= self._proxima_tentativa
+            ):
+                self.estado = PENDENTE
+                self._thread = None
+                self._concluido.clear()
+
+    def aquecer(self) -> None:
+        """Inicia a criação em uma thread daemon (uma vez, ou de novo após erro)."""
+        self._reabrir_apos_erro()
+        if self._concluido.is_set():
+            return
+        with self._lock_thread:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._carregar, name=f"aquecer-{self.nome}", daemon=True
+                )
+                self._thread.start()
+
+    def obter(self, bloquear: bool = False) -> Optional[T]:
+        self._reabrir_apos_erro()
+        if self._concluido.is_set():
+            return self._valor
+        if not bloquear:
+            self.aquecer()
+            return None
+        # se a thread de aquecimento estiver carregando, espera pelo mesmo lock
+        self._carregar()
+        return self._valor
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"estado": self.estado}
+        if self.segundos is not None:
+            status["segundos"] = round(self.segundos, 3)
+        if self.erro:
+            status["erro"] = self.erro
+            status["falhas"] = self.falhas
+        return status
+
+
+def _criar_modelo_cidades() -> Optional[Union[SentenceTransformer, EncoderOnnx]]:
+    # Modelo local opcional, usado na etapa de embeddings da detecção de cidades
+    if PERFORMANCE_LEVEL not in ("auto", "turbo"):
+        return None
+    from utils.onnx_encoder import criar_encoder
+
+    return cast(
+        Union["SentenceTransformer", "EncoderOnnx"],
+        criar_encoder(CITY_EMBEDDING_MODEL, EMBEDDING_BACKEND),
+    )
+
+
+def _criar_vectorstore() -> Optional[VectorStore]:
+    from utils.embedder import get_vectorstore
+
+    return get_vectorstore()
+
+
+modelo_cidades: RecursoSobDemanda[Union[SentenceTransformer, EncoderOnnx]] = (
+    RecursoSobDemanda("modelo_cidades", _criar_modelo_cidades)
+)
+vectorstore_institucional: RecursoSobDemanda[VectorStore] = RecursoSobDemanda(
+    "vectorstore", _criar_vectorstore
+)
+
+_RECURSOS: List[RecursoSobDemanda[Any]] = [modelo_cidades, vectorstore_institucional]
+
+
+def registrar_recurso(recurso: RecursoSobDemanda[Any]) -> None:
+    """Inclui um recurso no relatório de prontidão (`status_recursos`)."""
+    if recurso not in _RECURSOS:
+        _RECURSOS.append(recurso)
+
+
+def status_recursos() -> Dict[str, Dict[str, Any]]:
+    return {recurso.nome: recurso.status() for recurso in _RECURSOS}
+
+
+def recursos_prontos() -> bool:
+    # "desativado" (ex.: PERFORMANCE_LEVEL=eco) não impede a prontidão
+    for recurso in _RECURSOS:
+        if recurso.estado == ERRO:
+            recurso.aquecer()  # nova tentativa, se o intervalo já passou
+    return all(r.estado in (PRONTO, DESATIVADO) for r in _RECURSOS)
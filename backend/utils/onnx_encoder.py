@@ -0,0 +1,283 @@
+# chatbot-llm/backend/utils/onnx_encoder.py
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union, cast
+
+import numpy as np
+
+from config.config import ONNX_DIR, ONNX_THREADS
+from utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = get_logger(__name__)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Cosseno mínimo entre os vetores ONNX e PyTorch para aceitar o backend
+LIMIAR_PARIDADE = {"onnx": 0.999, "onnx-int8": 0.98}
+
+TEXTOS_PARIDADE = [
+    "qual a população de são paulo?",
+    "compare o pib de campinas e ribeirão preto",
+    "quantas escolas existem em recife",
+    "matrículas no ensino médio em belo horizonte",
+    "o que é uma parceria público-privada?",
+    "saneamento básico em cidades do nordeste",
+    "rio de janeiro",
+    "são josé dos campos",
+    "florianópolis",
+    "porto alegre x curitiba",
+]
+
+
+def diretorio_modelo(modelo: str) -> Path:
+    """Pasta com o grafo ONNX, tokenizer e metadados de um modelo."""
+    return ONNX_DIR / re.sub(r"[^\w.-]+", "__", modelo)
+
+
+def _arquivo_backend(backend: str) -> str:
+    return "model.int8.onnx" if backend == "onnx-int8" else "model.onnx"
+
+
+def _pooling(saida: np.ndarray, mascara: np.ndarray, modo: str) -> np.ndarray:
+    if modo == "cls":
+        return np.asarray(saida[:, 0], dtype=np.float32)
+    # mean pooling ponderado pela máscara de atenção
+    pesos = mascara[..., None].astype(np.float32)
+    soma = (saida * pesos).sum(axis=1)
+    return np.asarray(soma / np.clip(pesos.sum(axis=1), 1e-9, None), dtype=np.float32)
+
+
+class EncoderOnnx:
+    """
+    Encoder de sentenças via onnxruntime (CPU), com a mesma assinatura de
+    `SentenceTransformer.encode` usada no projeto.
+    """
+
+    def __init__(
+        self,
+        diretorio: Union[str, Path],
+        arquivo: str = "model.onnx",
+        threads: int = ONNX_THREADS,
+    ) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        # `tokenizers` puro: evita importar transformers/torch no worker
+        diretorio = Path(diretorio)
+        meta = json.loads((diretorio / "meta.json").read_text(encoding="utf-8"))
+        self.pooling: str = meta["pooling"]
+        self.dim: int = meta["dim"]
+        self.tokenizer = Tokenizer.from_file(str(diretorio / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=meta["max_length"])
+        self.tokenizer.enable_padding(
+            pad_id=meta["pad_id"], pad_token=meta["pad_token"]
+        )
+
+        opcoes = ort.SessionOptions()
+        opcoes.intra_op_num_threads = threads
+        opcoes.inter_op_num_threads = 1
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sessao = ort.InferenceSession(
+            str(diretorio / arquivo), opcoes, providers=["CPUExecutionProvider"]
+        )
+        self._entradas = {entrada.name for entrada in self.sessao.get_inputs()}
+
+    def encode(
+        self,
+        textos: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **_: Any,
+    ) -> np.ndarray:
+        unico = isinstance(textos, str)
+        lista = [textos] if isinstance(textos, str) else list(textos)
+
+        partes: List[np.ndarray] = []
+        for i in range(0, len(lista), batch_size):
+            codificados = self.tokenizer.encode_batch(lista[i : i + batch_size])
+            mascara = np.asarray(
+                [c.attention_mask for c in codificados], dtype=np.int64
+            )
+            colunas = {
+                "input_ids": [c.ids for c in codificados],
+                "attention_mask": mascara,
+                "token_type_ids": [c.type_ids for c in codificados],
+            }
+            feeds = {
+                nome: np.asarray(valor, dtype=np.int64)
+                for nome, valor in colunas.items()
+                if nome in self._entradas
+            }
+            saida = self.sessao.run(None, feeds)[0]
+            partes.append(_pooling(saida, mascara, self.pooling))
+
+        emb = (
+            np.concatenate(partes)
+            if partes
+            else np.empty((0, self.dim), dtype=np.float32)
+        )
+        if normalize_embeddings:
+            emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+        return emb[0] if unico else emb
+
+
+def _modo_pooling(referencia: SentenceTransformer) -> str:
+    # `pooling_mode` nas versões novas do sentence-transformers; flags nas antigas
+    pooling = referencia[1] if len(referencia) > 1 else None
+    modo = getattr(pooling, "pooling_mode", None)
+    if modo is None and getattr(pooling, "pooling_mode_cls_token", False):
+        modo = "cls"
+    return "cls" if modo == "cls" else "mean"
+
+
+def _exportar(referencia: SentenceTransformer, diretorio: Path) -> None:
+    """Exporta o transformer (sem pooling) para ONNX com eixos dinâmicos."""
+    import torch
+
+    transformer: Any = referencia[0]
+    tokenizer = transformer.tokenizer
+    modelo = transformer.auto_model.eval()
+    exemplo = tokenizer(["exemplo de exportação"], return_tensors="pt")
+    nomes = list(exemplo.keys())
+
+    class _Saida(torch.nn.Module):
+        # entradas posicionais → apenas o último estado oculto
+        def __init__(self) -> None:
+            super().__init__()
+            self.modelo = modelo
+
+        def forward(self, *entradas: torch.Tensor) -> torch.Tensor:
+            return cast(torch.Tensor, self.modelo(**dict(zip(nomes, entradas)))[0])
+
+    eixos: Dict[str, Dict[int, str]] = {
+        nome: {0: "lote", 1: "tokens"} for nome in nomes
+    }
+    eixos["ultimo_estado"] = {0: "lote", 1: "tokens"}
+
+    diretorio.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            _Saida(),
+            tuple(exemplo[nome] for nome in nomes),
+            str(diretorio / "model.onnx"),
+            input_names=nomes,
+            output_names=["ultimo_estado"],
+            dynamic_axes=eixos,
+            opset_version=17,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(str(diretorio))
+
+    meta = {
+        "pooling": _modo_pooling(referencia),
+        "max_length": int(referencia.max_seq_length or 512),
+        "pad_id": int(tokenizer.pad_token_id or 0),
+        "pad_token": str(tokenizer.pad_token or "[PAD]"),
+        "dim": int(referencia.get_sentence_embedding_dimension() or 0),
+        "paridade": {},
+    }
+    (diretorio / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+
+def _quantizar(diretorio: Path) -> None:
+    # int8 dinâmico: pesos quantizados, ativações quantizadas em tempo de execução
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        str(diretorio / "model.onnx"),
+        str(diretorio / "model.int8.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def verificar_paridade(
+    encoder: Any, referencia: Any, textos: Optional[Sequence[str]] = None
+) -> Dict[str, float]:
+    """
+    Compara os vetores normalizados de `encoder` com os da `referencia`
+    (PyTorch): cosseno por texto e diferença máxima na matriz de scores.
+    """
+    textos = list(textos or TEXTOS_PARIDADE)
+    a = np.asarray(referencia.encode(textos, normalize_embeddings=True))
+    b = np.asarray(encoder.encode(textos, normalize_embeddings=True))
+    cossenos = np.sum(a * b, axis=1)
+    return {
+        "cosseno_min": float(cossenos.min()),
+        "cosseno_medio": float(cossenos.mean()),
+        "erro_max_scores": float(np.abs(a @ a.T - b @ b.T).max()),
+    }
+
+
+def carregar_meta(diretorio: Path) -> Dict[str, Any]:
+    path = diretorio / "meta.json"
+    if not path.exists():
+        return {}
+    return dict(json.loads(path.read_text(encoding="utf-8")))
+
+
+def criar_encoder(modelo: str, backend: str = "torch") -> Any:
+    """
+    Retorna um encoder com `.encode()` para o backend pedido.
+
+    Para 'onnx' e 'onnx-int8', exporta (e quantiza) o modelo na primeira vez,
+    mede a paridade contra o PyTorch e grava o resultado em `meta.json`.
+    Se a paridade ficar abaixo do limiar, volta para o SentenceTransformer.
+    """
+    usar_torch = backend == "torch"
+    if backend not in BACKENDS:
+        logger.warning(
+            f"⚠️ Backend de inferência '{backend}' desconhecido. Usando torch."
+        )
+        usar_torch = True
+
+    if not usar_torch:
+        diretorio = diretorio_modelo(modelo)
+        arquivo = _arquivo_backend(backend)
+        paridade = carregar_meta(diretorio).get("paridade", {}).get(backend)
+
+        if (diretorio / arquivo).exists() and paridade:
+            if paridade["cosseno_min"] >= LIMIAR_PARIDADE[backend]:
+                logger.info(f"⚡ Encoder {backend} carregado para {modelo}.")
+                return EncoderOnnx(diretorio, arquivo)
+            logger.warning(
+                f"⚠️ {backend} reprovado na paridade ({paridade['cosseno_min']:.4f}). "
+                "Usando torch."
+            )
+            usar_torch = True
+
+    from sentence_transformers import SentenceTransformer
+
+    referencia = SentenceTransformer(modelo, device="cpu")
+    if usar_torch:
+        return referencia
+
+    try:
+        if not (diretorio / "meta.json").exists():
+            logger.info(f"📦 Exportando {modelo} para ONNX...")
+            _exportar(referencia, diretorio)
+        if backend == "onnx-int8" and not (diretorio / arquivo).exists():
+            _quantizar(diretorio)
+
+        encoder = EncoderOnnx(diretorio, arquivo)
+        paridade = verificar_paridade(encoder, referencia)
+        meta = carregar_meta(diretorio)
+        meta.setdefault("paridade", {})[backend] = paridade
+        (diretorio / "meta.json").write_text(
+            json.dumps(meta, indent=2), encoding="utf-8"
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao preparar backend {backend}: {e}. Usando torch.")
+        return referencia
+
+    logger.info(f"🧪 Paridade {backend} vs torch: {paridade}")
+    if paridade["cosseno_min"] < LIMIAR_PARIDADE[backend]:
+        logger.warning(f"⚠️ {backend} reprovado na paridade. Usando torch.")
+        return referencia
+    # o modelo PyTorch sai de escopo: só o grafo ONNX fica em memória
+    return encoder
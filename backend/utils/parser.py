@@ -1,10 +1,13 @@
 # chatbot-llm/backend/utils/parser.py
-from typing import Optional, List, Tuple, Dict, Any, Union
-import unicodedata
+from typing import Optional, List, Tuple, Dict, Any, Mapping, Union
 import re
+import unicodedata
 from functools import lru_cache
 from rapidfuzz import fuzz
 
+from utils.aho_corasick import AutomatoAhoCorasick
+from utils.trigramas import IndiceTrigramas
+
 
 @lru_cache(maxsize=64)
 def normalizar(texto: str) -> str:
@@ -16,6 +19,26 @@ def normalizar(texto: str) -> str:
     )
 
 
+# Pontuação que não altera a rota (vírgula e hífen ficam: mudam a detecção)
+_PONTUACAO_NEUTRA = re.compile(r"[?!.;:\"'()\[\]{}*]+")
+# Expressões de cortesia/preenchimento, já normalizadas
+_EXPRESSOES_VAZIAS = re.compile(
+    r"\b(?:por favor|por gentileza|pfv|pf|me diga|me diz|me fala|me fale|"
+    r"me informe|me mostre|gostaria de saber|queria saber|quero saber|"
+    r"voce sabe|voce poderia|poderia|ola|oi|bom dia|boa tarde|boa noite|"
+    r"obrigad[oa]|valeu)\b"
+)
+
+
+def forma_canonica(texto: str) -> str:
+    """
+    Forma canônica de uma pergunta para chaves de cache: sem acentos e
+    caixa, sem pontuação neutra e expressões de cortesia, espaços colapsados.
+    """
+    texto = _PONTUACAO_NEUTRA.sub(" ", normalizar(texto or ""))
+    return " ".join(_EXPRESSOES_VAZIAS.sub(" ", texto).split())
+
+
 def extrair_nome_uf(
     cidade_info: Union[Dict[str, Any], List[Dict[str, Any]]],
 ) -> Tuple[Optional[str], Optional[str]]:
@@ -42,19 +65,34 @@ def extrair_cidades_uf(
 
 
 def extrair_cidades_explicitamente(
-    texto: str, cidades_index: Dict[str, Dict[str, Any]], max_cidades: int = 10
+    texto: str,
+    cidades_index: Mapping[str, Dict[str, Any]],
+    max_cidades: int = 10,
+    automato: Optional[AutomatoAhoCorasick] = None,
+    indice: Optional[IndiceTrigramas] = None,
 ) -> List[Dict[str, Any]]:
     texto_norm = normalizar(texto)
+    if automato is None:
+        automato = AutomatoAhoCorasick(cidades_index.keys())
+    if indice is None:
+        indice = IndiceTrigramas(cidades_index.keys())
+
     encontradas: List[Dict[str, Any]] = []
-    for nome, dados in cidades_index.items():
-        nome_norm = normalizar(nome)
-        padrao = rf"\b{re.escape(nome_norm)}\b"
-        if (
-            re.search(padrao, texto_norm)
-            or fuzz.partial_ratio(nome_norm, texto_norm) >= 90
-        ):
-            if dados not in encontradas:
-                encontradas.append(dados)
+    # 1️⃣ Matches literais em uma única passada pelo automato
+    for oc in automato.buscar(texto_norm, manter_sobrepostas=True):
+        dados = cidades_index.get(oc.chave)
+        if dados is not None and dados not in encontradas:
+            encontradas.append(dados)
+        if len(encontradas) >= max_cidades:
+            return encontradas
+
+    # 2️⃣ Matches aproximados, apenas sobre os candidatos do índice de trigramas
+    for nome in indice.candidatos(texto_norm):
+        dados = cidades_index.get(nome)
+        if dados is None or dados in encontradas:
+            continue
+        if fuzz.partial_ratio(normalizar(nome), texto_norm) >= 90:
+            encontradas.append(dados)
         if len(encontradas) >= max_cidades:
             break
     return encontradas
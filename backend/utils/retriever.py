@@ -1,10 +1,9 @@
 # chatbot-llm/backend/utils/retriever.py
 from typing import List, Tuple, Dict, Any
 from utils.logger import get_logger
-from utils.embedder import get_vectorstore
+from utils.model_provider import vectorstore_institucional
 
 logger = get_logger(__name__)
-vectorstore = get_vectorstore()
 
 
 def buscar_contexto(
@@ -19,6 +18,12 @@ def buscar_contexto(
     """
     try:
         logger.debug(f"🔍 Iniciando busca semântica para: '{pergunta}' (top_k={top_k})")
+        # Conecta ao Pinecone na primeira busca (ou reaproveita o aquecimento)
+        vectorstore = vectorstore_institucional.obter(bloquear=True)
+        if vectorstore is None:
+            raise RuntimeError(
+                vectorstore_institucional.erro or "Vectorstore indisponível."
+            )
         resultados = vectorstore.similarity_search_with_score(pergunta, k=top_k)
 
         documentos: List[str] = [doc.page_content for doc, _ in resultados]
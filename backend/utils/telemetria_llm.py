@@ -0,0 +1,336 @@
+# chatbot-llm/backend/utils/telemetria_llm.py
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import config.dicionarios as dicionarios
+from config.config import (
+    LLM_PRICE_INPUT_PER_MTOK,
+    LLM_PRICE_OUTPUT_PER_MTOK,
+    LLM_TELEMETRY_LEDGER,
+    LOGS_DIR,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LEDGER_PATH = LOGS_DIR / "telemetria_llm.jsonl"
+
+# Camadas de cache que respondem sem chamar o LLM (coalescidas contam à parte)
+CAMADAS_CACHE = ("l1", "sqlite", "semantico")
+
+# Limites superiores dos baldes dos histogramas (o último é +inf)
+LIMITES_LATENCIA_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+LIMITES_TOKENS = (64, 128, 256, 512, 1024, 2048, 4096)
+
+# Nome de cada template pelo texto (os agentes passam o texto, não o nome)
+NOMES_TEMPLATES: Dict[str, str] = {
+    valor: nome
+    for nome, valor in vars(dicionarios).items()
+    if nome.startswith("TEMPLATE_") and isinstance(valor, str)
+}
+
+
+def nome_template(template: str) -> str:
+    nome = NOMES_TEMPLATES.get(template)
+    if nome is None:
+        sufixo = hashlib.sha256(template.encode("utf-8")).hexdigest()[:8]
+        nome = f"TEMPLATE_{sufixo}"
+    return nome
+
+
+def tokens_informados(mensagem: Any) -> Optional[Tuple[int, int]]:
+    """(prompt, resposta) informados pelo provedor em `usage_metadata`."""
+    uso = getattr(mensagem, "usage_metadata", None)
+    if not uso:
+        return None
+    return int(uso.get("input_tokens", 0)), int(uso.get("output_tokens", 0))
+
+
+class Histograma:
+    """Contagens por balde fixo, com soma, mínimo, máximo e percentis aproximados."""
+
+    def __init__(self, limites: Sequence[float]) -> None:
+        self.limites = tuple(limites)
+        self.baldes = [0] * (len(self.limites) + 1)
+        self.contagem = 0
+        self.soma = 0.0
+        self.minimo = float("inf")
+        self.maximo = 0.0
+
+    def observar(self, valor: float) -> None:
+        self.baldes[bisect.bisect_left(self.limites, valor)] += 1
+        self.contagem += 1
+        self.soma += valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p: float) -> float:
+        # limite superior do balde que contém o percentil (máximo no último)
+        if not self.contagem:
+            return 0.0
+        alvo = p * self.contagem
+        acumulado = 0
+        for i, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                limite = self.limites[i] if i < len(self.limites) else self.maximo
+                return float(min(limite, self.maximo))
+        return self.maximo
+
+    def resumo(self) -> Dict[str, Any]:
+        rotulos = [f"<={limite}" for limite in self.limites] + [f">{self.limites[-1]}"]
+        return {
+            "contagem": self.contagem,
+            "soma": round(self.soma, 3),
+            "media": round(self.soma / self.contagem, 3) if self.contagem else 0.0,
+            "min": round(self.minimo, 3) if self.contagem else 0.0,
+            "max": round(self.maximo, 3),
+            "p50": self.percentil(0.50),
+            "p95": self.percentil(0.95),
+            "p99": self.percentil(0.99),
+            "baldes": dict(zip(rotulos, self.baldes)),
+        }
+
+
+class Medicao:
+    """
+    Uma chamada a `gerar_resposta` (ou ao streaming), preenchida pelo engine.
+    Com `requisicao=False`, mede só a chamada compartilhada do single-flight
+    assíncrono: entra nos números do LLM, não na contagem de requisições.
+    """
+
+    def __init__(
+        self,
+        agente: str,
+        template: str,
+        modo: str,
+        chave: str = "",
+        requisicao: bool = True,
+    ) -> None:
+        self.agente = agente
+        self.template = template
+        self.modo = modo  # invoke | ainvoke | stream
+        self.chave = chave
+        self.requisicao = requisicao
+        # camada que respondeu: l1 | sqlite | semantico | llm; sem nenhuma,
+        # outra requisição idêntica (ou a tarefa compartilhada) chamou o LLM
+        # (coalescida)
+        self.cache: Optional[str] = None
+        self.tokens_prompt = 0
+        self.tokens_resposta = 0
+        self.tokens_estimados = False  # provedor não informou o uso
+        self.latencia_llm_ms = 0.0
+        self.latencia_total_ms = 0.0
+        self.tentativas = 0
+        self.erro: Optional[str] = None
+        self.adiada = False  # streaming: medida depois, em `transmitir_resposta`
+
+    @property
+    def custo_usd(self) -> float:
+        return (
+            self.tokens_prompt * LLM_PRICE_INPUT_PER_MTOK
+            + self.tokens_resposta * LLM_PRICE_OUTPUT_PER_MTOK
+        ) / 1_000_000
+
+    def registro(self) -> Dict[str, Any]:
+        return {
+            "ts": round(time.time(), 3),
+            "agente": self.agente,
+            "template": self.template,
+            "modo": self.modo,
+            "chave": self.chave[:16],
+            "requisicao": self.requisicao,
+            "cache": self.cache,
+            "tokens_prompt": self.tokens_prompt,
+            "tokens_resposta": self.tokens_resposta,
+            "tokens_estimados": self.tokens_estimados,
+            "latencia_llm_ms": round(self.latencia_llm_ms, 2),
+            "latencia_total_ms": round(self.latencia_total_ms, 2),
+            "tentativas": self.tentativas,
+            "erro": self.erro,
+            "custo_usd": round(self.custo_usd, 8),
+        }
+
+
+class _PorTemplate:
+    def __init__(self) -> None:
+        self.chamadas = 0
+        self.latencia_llm_ms = Histograma(LIMITES_LATENCIA_MS)
+        self.tokens_prompt = Histograma(LIMITES_TOKENS)
+        self.tokens_resposta = Histograma(LIMITES_TOKENS)
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "chamadas_llm": self.chamadas,
+            "latencia_llm_ms": self.latencia_llm_ms.resumo(),
+            "tokens_prompt": self.tokens_prompt.resumo(),
+            "tokens_resposta": self.tokens_resposta.resumo(),
+        }
+
+
+def _logger_ledger() -> logging.Logger:
+    # Uma chamada por linha (JSON), só acrescentada: base para custo e capacidade
+    ledger = logging.getLogger("ledger.telemetria_llm")
+    if not ledger.handlers:
+        handler = logging.FileHandler(str(LEDGER_PATH), mode="a", encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        ledger.addHandler(handler)
+        ledger.setLevel(logging.INFO)
+        ledger.propagate = False
+    return ledger
+
+
+class TelemetriaLLM:
+    """
+    Agrega, no processo, cada resposta pedida ao engine: de onde veio (cache
+    por camada, chamada coalescida ou LLM), tokens, tempo no LLM versus tempo
+    total, retentativas, erros e custo estimado. Com o ledger ativo, cada
+    medição também vai, como JSON, para um arquivo só de acréscimos.
+    """
+
+    def __init__(self, ledger: bool = LLM_TELEMETRY_LEDGER) -> None:
+        self.ledger = ledger
+        self._lock = threading.Lock()
+        self._zerar()
+
+    def _zerar(self) -> None:
+        self.inicio = time.time()
+        self.requisicoes = 0
+        self.cache: Counter[str] = Counter()
+        self.agentes: Counter[str] = Counter()
+        self.erros: Counter[str] = Counter()
+        self.retentativas = 0
+        self.tokens_prompt = 0
+        self.tokens_resposta = 0
+        self.tokens_estimados = 0
+        self.custo_usd = 0.0
+        self.latencia_llm_ms = Histograma(LIMITES_LATENCIA_MS)
+        self.latencia_total_ms = Histograma(LIMITES_LATENCIA_MS)
+        self.overhead_ms = Histograma(LIMITES_LATENCIA_MS)
+        self.por_template: Dict[str, _PorTemplate] = {}
+
+    @contextmanager
+    def medir(
+        self,
+        agente: str,
+        template: str,
+        modo: str,
+        chave: str = "",
+        requisicao: bool = True,
+    ) -> Iterator[Medicao]:
+        """Mede o bloco e registra a medição ao sair (também em caso de erro)."""
+        medicao = Medicao(
+            agente=agente,
+            template=template,
+            modo=modo,
+            chave=chave,
+            requisicao=requisicao,
+        )
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        except BaseException as e:
+            medicao.erro = medicao.erro or type(e).__name__
+            raise
+        finally:
+            medicao.latencia_total_ms = (time.perf_counter() - inicio) * 1000
+            if not medicao.adiada:
+                self.registrar(medicao)
+
+    def registrar(self, medicao: Medicao) -> None:
+        if medicao.cache is None:
+            medicao.cache = "coalescida" if medicao.erro is None else "nenhum"
+        with self._lock:
+            # a chamada compartilhada não é requisição: seu erro já chega,
+            # como exceção, a cada requisição que a esperava
+            if medicao.requisicao:
+                self.requisicoes += 1
+                self.cache[medicao.cache] += 1
+                self.agentes[medicao.agente] += 1
+                self.latencia_total_ms.observar(medicao.latencia_total_ms)
+                if medicao.erro is not None:
+                    self.erros[medicao.erro] += 1
+            if medicao.tentativas:
+                self.retentativas += medicao.tentativas - 1
+                por_template = self.por_template.setdefault(
+                    medicao.template, _PorTemplate()
+                )
+                por_template.chamadas += 1
+                por_template.latencia_llm_ms.observar(medicao.latencia_llm_ms)
+                por_template.tokens_prompt.observar(medicao.tokens_prompt)
+                por_template.tokens_resposta.observar(medicao.tokens_resposta)
+                self.latencia_llm_ms.observar(medicao.latencia_llm_ms)
+                self.overhead_ms.observar(
+                    max(medicao.latencia_total_ms - medicao.latencia_llm_ms, 0.0)
+                )
+                self.tokens_prompt += medicao.tokens_prompt
+                self.tokens_resposta += medicao.tokens_resposta
+                self.tokens_estimados += int(medicao.tokens_estimados)
+                self.custo_usd += medicao.custo_usd
+
+        if medicao.erro is not None and medicao.tentativas:
+            logger.warning(
+                f"⚠️ LLM ({medicao.template}, {medicao.agente}): {medicao.erro} "
+                f"após {medicao.tentativas} tentativa(s)."
+            )
+        if self.ledger:
+            try:
+                _logger_ledger().info(
+                    json.dumps(medicao.registro(), ensure_ascii=False)
+                )
+            except OSError as e:
+                logger.warning(f"⚠️ Erro ao gravar o ledger de telemetria: {e}")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            chamadas = sum(p.chamadas for p in self.por_template.values())
+            respondidas_cache = sum(self.cache[camada] for camada in CAMADAS_CACHE)
+            coalescidas = self.cache["coalescida"]
+            return {
+                "desde": round(self.inicio, 3),
+                "requisicoes": self.requisicoes,
+                "chamadas_llm": chamadas,
+                "cache": dict(self.cache),
+                "taxa_acerto_cache": (
+                    round(respondidas_cache / self.requisicoes, 4)
+                    if self.requisicoes
+                    else 0.0
+                ),
+                "taxa_coalescidas": (
+                    round(coalescidas / self.requisicoes, 4)
+                    if self.requisicoes
+                    else 0.0
+                ),
+                "agentes": dict(self.agentes),
+                "erros": dict(self.erros),
+                "retentativas": self.retentativas,
+                "tokens": {
+                    "prompt": self.tokens_prompt,
+                    "resposta": self.tokens_resposta,
+                    "chamadas_estimadas": self.tokens_estimados,
+                },
+                "custo_usd": round(self.custo_usd, 6),
+                "latencia_llm_ms": self.latencia_llm_ms.resumo(),
+                "latencia_total_ms": self.latencia_total_ms.resumo(),
+                "overhead_ms": self.overhead_ms.resumo(),
+                "templates": {
+                    nome: p.resumo() for nome, p in sorted(self.por_template.items())
+                },
+                "ledger": str(LEDGER_PATH) if self.ledger else None,
+            }
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._zerar()
+
+
+telemetria_llm = TelemetriaLLM()
@@ -0,0 +1,97 @@
+# chatbot-llm/backend/utils/trigramas.py
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+import numpy as np
+
+
+def extrair_trigramas(texto: str) -> Set[str]:
+    """
+    Trigramas de caracteres por palavra, no estilo do pg_trgm:
+    cada palavra é acolchoada com dois espaços à esquerda e um à direita.
+    """
+    trigramas: Set[str] = set()
+    for palavra in texto.split():
+        acolchoada = f"  {palavra} "
+        for i in range(len(acolchoada) - 2):
+            trigramas.add(acolchoada[i : i + 3])
+    return trigramas
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido trigrama → nomes, usado para pré-selecionar poucas
+    dezenas de candidatos antes dos scorers do rapidfuzz.
+
+    O score de candidato é a fração dos trigramas do nome presentes no texto,
+    o que favorece nomes contidos (com erros de digitação) na pergunta.
+    """
+
+    def __init__(
+        self,
+        nomes: Iterable[str],
+        ufs_por_nome: Optional[Mapping[str, Iterable[str]]] = None,
+    ) -> None:
+        self.nomes: List[str] = list(nomes)
+        listas: Dict[str, List[int]] = {}
+        tamanhos = np.zeros(len(self.nomes), dtype=np.float32)
+        for idx, nome in enumerate(self.nomes):
+            trigramas = extrair_trigramas(nome)
+            tamanhos[idx] = max(len(trigramas), 1)
+            for tg in trigramas:
+                listas.setdefault(tg, []).append(idx)
+
+        self._postings: Dict[str, np.ndarray] = {
+            tg: np.asarray(ids, dtype=np.int32) for tg, ids in listas.items()
+        }
+        self._tamanhos = tamanhos
+
+        # Partição opcional por UF: ids de cada estado (homônimos em várias UFs)
+        self._ids_por_uf: Dict[str, np.ndarray] = {}
+        if ufs_por_nome:
+            por_uf: Dict[str, List[int]] = {}
+            for idx, nome in enumerate(self.nomes):
+                for uf in set(ufs_por_nome.get(nome, ())):
+                    por_uf.setdefault(uf.upper(), []).append(idx)
+            self._ids_por_uf = {
+                uf: np.asarray(ids, dtype=np.int32) for uf, ids in por_uf.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def candidatos(
+        self, texto: str, limite: int = 40, uf: Optional[str] = None
+    ) -> List[str]:
+        """
+        Retorna até `limite` nomes com maior sobreposição de trigramas com o
+        texto, do mais para o menos provável. Se `uf` for informada, restringe
+        a busca aos nomes daquele estado.
+        """
+        postings = [
+            self._postings[tg]
+            for tg in extrair_trigramas(texto)
+            if tg in self._postings
+        ]
+        if not postings:
+            return []
+
+        contagem = np.bincount(np.concatenate(postings), minlength=len(self.nomes))
+        scores = contagem / self._tamanhos
+
+        if uf is not None:
+            ids = self._ids_por_uf.get(uf.upper())
+            if ids is None:
+                return []
+            scores_uf = scores[ids]
+        else:
+            ids = np.arange(len(self.nomes))
+            scores_uf = scores
+
+        validos = np.flatnonzero(scores_uf > 0)
+        if validos.size > limite:
+            topo = np.argpartition(scores_uf[validos], -limite)[-limite:]
+            validos = validos[topo]
+        ordem = validos[np.argsort(-scores_uf[validos], kind="stable")]
+        return [self.nomes[i] for i in ids[ordem]]
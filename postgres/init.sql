@@ -155,6 +155,19 @@ CREATE TABLE public.municipios (
 
 ALTER TABLE public.municipios OWNER TO postgres;
 
+--
+-- Name: versao_dados; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.versao_dados (
+    conjunto text NOT NULL,
+    versao bigint NOT NULL,
+    atualizado_em timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.versao_dados OWNER TO postgres;
+
 --
 -- Name: educacao_tecnica id; Type: DEFAULT; Schema: public; Owner: postgres
 --
@@ -22509,6 +22522,15 @@ COPY public.municipios (codigo_ibge, sigla_estado, cidade, populacao_total, ano_
 \.
 
 
+--
+-- Data for Name: versao_dados; Type: TABLE DATA; Schema: public; Owner: postgres
+--
+
+COPY public.versao_dados (conjunto, versao, atualizado_em) FROM stdin;
+municipios	1	2025-01-01 00:00:00+00
+\.
+
+
 --
 -- Name: educacao_tecnica_id_seq; Type: SEQUENCE SET; Schema: public; Owner: postgres
 --
@@ -22564,6 +22586,14 @@ ALTER TABLE ONLY public.municipios
     ADD CONSTRAINT municipios_pkey PRIMARY KEY (codigo_ibge);
 
 
+--
+-- Name: versao_dados versao_dados_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.versao_dados
+    ADD CONSTRAINT versao_dados_pkey PRIMARY KEY (conjunto);
+
+
 --
 -- Name: educacao_basica educacao_basica_codigo_ibge_fkey; Type: FK CONSTRAINT; Schema: public; Owner: postgres
 --
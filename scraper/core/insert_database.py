@@ -2,7 +2,7 @@
 import pandas as pd
 from pathlib import Path
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 from utils.connection import get_engine
 from utils.logger import get_logger
 
@@ -74,9 +74,40 @@ def inserir_estados_municipios(engine: Engine) -> None:
             municipios,
         )
 
+        # Marca d'água lida pelo backend para reconstruir os índices de cidades
+        registrar_versao_dados(conn, "municipios")
+
     logger.info("🗺️ Estados e municípios inseridos/atualizados com sucesso.")
 
 
+def registrar_versao_dados(conn: Connection, conjunto: str) -> None:
+    conn.execute(
+        text(
+            """
+        CREATE TABLE IF NOT EXISTS public.versao_dados (
+            conjunto      text PRIMARY KEY,
+            versao        bigint NOT NULL,
+            atualizado_em timestamptz NOT NULL DEFAULT now()
+        )
+    """
+        )
+    )
+    versao = conn.execute(
+        text(
+            """
+        INSERT INTO public.versao_dados (conjunto, versao, atualizado_em)
+        VALUES (:conjunto, 1, now())
+        ON CONFLICT (conjunto) DO UPDATE SET
+            versao        = versao_dados.versao + 1,
+            atualizado_em = now()
+        RETURNING versao
+    """
+        ),
+        {"conjunto": conjunto},
+    ).scalar()
+    logger.info(f"🔖 Versão dos dados '{conjunto}' atualizada para {versao}.")
+
+
 def inserir_educacao_basica(engine: Engine) -> None:
     logger = get_logger(__name__)
 